@@ -1,12 +1,33 @@
-from flask import Flask
+from flask import Flask, Request, current_app
 from flask_cors import CORS
 from config import Config
+from app.services.ingestion import SniffedUpload, UploadRejected, allowed_formats
+from app.services.metrics import UPLOAD_REJECTIONS
 import os
 
+class UploadRequest(Request):
+    """Request whose file uploads are checked while they stream in (see services/ingestion.py)"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not filename: # empty file input, reported by the route
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        # refuse a wrong extension before a single byte of the file is read
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if extension not in current_app.config['ALLOWED_EXTENSIONS']:
+            UPLOAD_REJECTIONS.inc(reason='extension')
+            raise UploadRejected("Invalid file type. Please upload PNG, JPG, or JPEG.")
+
+        return SniffedUpload(formats=allowed_formats(current_app.config['ALLOWED_EXTENSIONS']),
+                             max_pixels=current_app.config['UPLOAD_MAX_PIXELS'],
+                             max_side=current_app.config['UPLOAD_MAX_SIDE'],
+                             sniff_bytes=current_app.config['UPLOAD_SNIFF_BYTES'])
+
 def create_app(config_class=Config):
     """Application pattern"""
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.request_class = UploadRequest
 
     CORS(app)
 
@@ -14,5 +35,5 @@ def create_app(config_class=Config):
 
     from app import routes
     app.register_blueprint(routes.bp) # register route(s)
-    
+
     return app
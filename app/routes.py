@@ -1,103 +1,372 @@
-from flask import Blueprint, render_template, request, jsonify, current_app
+from flask import Blueprint, render_template, request, jsonify, current_app, make_response, Response, url_for, g
 from werkzeug.utils import secure_filename
-import os
+from werkzeug.exceptions import RequestEntityTooLarge
+import json
+import time
 
+from config import Config
 from app.services.ocr_service import OCRService
 from app.services.validator import LabelValidator
+from app.services.verification import VerificationService
+from app.services.job_queue import JobQueue
+from app.services import metrics, serialization
+from app.services.ingestion import UploadRejected
+from app.services.metrics import timed
 
 bp = Blueprint('main', __name__) # main blueprint
 
 # Initialize services
 ocr_service = OCRService()
 validator = LabelValidator()
+verification_service = VerificationService(ocr_service, validator)
+job_queue = JobQueue()
+
+# Load Tesseract and its language data now rather than on the first label (see /health/ready)
+if Config.READINESS_WARM_UP:
+    ocr_service.start_warm_up()
+else:
+    ocr_service.warm_up_state = {'status': 'disabled'} # nothing to wait for, ready from the start
+
+# Polled by load balancers and scrapers, not worth a log line each
+QUIET_ENDPOINTS = {'main.metrics_endpoint', 'main.health_check', 'main.readiness_check'}
+
+FORM_FIELDS = ('brand_name', 'product_type', 'alcohol_content', 'net_contents')
 
 def allowed_file(filename):
     """Check if file extension is in allowable list"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']\
 
+def parse_form_data(source):
+    """Get form data from a dict-like source (request.form or a JSON item) and parse it into correct format"""
+    return {field: str(source.get(field, '') or '').strip() for field in FORM_FIELDS}
+
+def missing_fields(form_data):
+    """List required fields that were left empty"""
+    return [field for field in FORM_FIELDS if not form_data[field]]
+
+@timed('upload_read')
+def read_upload(file):
+    """Read uploaded file into memory (decoded and OCR'd from there, nothing is written to disk)"""
+    return secure_filename(file.filename), file.read()
+
+def wants_async():
+    """Client asked to submit the verification as a job (?async=1, async form field or Prefer: respond-async)"""
+    return request.args.get('async') == '1' or request.form.get('async') == '1' or \
+           'respond-async' in request.headers.get('Prefer', '')
+
+@bp.before_request
+def start_request_metrics():
+    """Count the request as in flight and start collecting its stage timings"""
+    g.metrics_start = time.perf_counter()
+    g.metrics_stages = metrics.start_trace()
+    metrics.REQUESTS_IN_FLIGHT.inc(endpoint=request.endpoint)
+
+@bp.after_request
+def remember_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+@bp.teardown_request
+def finish_request_metrics(exc):
+    """Record the request duration and write one structured log line with its stage timings"""
+    if 'metrics_start' not in g:
+        return
+    duration = time.perf_counter() - g.metrics_start
+    status = g.get('metrics_status', 500)
+    metrics.REQUESTS_IN_FLIGHT.dec(endpoint=request.endpoint)
+    metrics.REQUEST_SECONDS.observe(duration, endpoint=request.endpoint, status=status)
+    metrics.end_trace()
+
+    if current_app.config['METRICS_LOG_REQUESTS'] and request.endpoint not in QUIET_ENDPOINTS:
+        current_app.logger.info(json.dumps({
+            'event': 'request',
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'stages_ms': {stage: round(ms, 2) for stage, ms in g.metrics_stages.items()},
+        }))
+
 @bp.route('/')
 def index():
     """ Main form page rendering"""
     return render_template('index.html')
 
+def wants_json():
+    """
+    Client asked for the JSON API: /api/verify, ?format=json, or an Accept header preferring JSON over HTML
+    (browsers and plain curl still get the results page)
+    """
+    if request.path.startswith('/api/') or request.args.get('format') == 'json':
+        return True
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+def requested_list(name, allowed):
+    """Comma separated query/form option (e.g. ?fields=brand_name,net_contents), None when not given"""
+    value = request.args.get(name) or request.form.get(name)
+    if not value:
+        return None
+    values = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in values if item not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {name}: {', '.join(unknown)} (choose from {', '.join(allowed)})")
+    return values
+
+def json_response(payload, status=200):
+    """Compact JSON response (orjson when installed), gzipped when the client accepts it and it is worth it"""
+    body = serialization.dumps(payload)
+    response = Response(body, status=status, mimetype='application/json')
+    if len(body) >= current_app.config['API_GZIP_MIN_BYTES'] and request.accept_encodings['gzip']:
+        response.set_data(serialization.gzip_body(body))
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def verify_error(message, status):
+    """Error in the format the client asked for (JSON or the results page)"""
+    if wants_json():
+        return json_response({'error': message}, status)
+    return render_template('results.html', error=message), status
+
+@bp.errorhandler(UploadRejected)
+def upload_rejected(e):
+    """Upload refused while streaming in (wrong type, too many pixels), the rest of the body was never read"""
+    current_app.logger.warning(f"Upload rejected: {e}")
+    return verify_error(str(e), e.status)
+
+@bp.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return verify_error(f"Upload too large (max {current_app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024):g} MB)", 413)
+
 @bp.route('/verify', methods=['POST'])
+@bp.route('/api/verify', methods=['POST'])
 def verify_label():
-    """Form submission handling and label verifying"""
+    """
+    Form submission handling and label verifying
+
+    Answers with the results page, or the compact JSON schema (serialization.compact_results) for /api/verify,
+    ?format=json or Accept: application/json. JSON clients can narrow it down with ?fields=brand_name,...
+    and add parts with ?include=messages,raw_text,candidates,panels,ladder
+    """
 
     # Validate that file exists (to avoid someone submitting without file)
     if 'label_image' not in request.files:
-        return render_template('results.html', 
-                             error="No image file provided"), 400
-    
-    file = request.files['label_image']
+        return verify_error("No image file provided", 400)
+
+    # Several images make one label set (front, back, neck... of the same product)
+    files = [file for file in request.files.getlist('label_image') if file.filename != '']
 
     # Check if file name is empty
-    if file.filename == '':
-        return render_template('results.html', 
-                             error="No image file selected"), 400
-    
+    if not files:
+        return verify_error("No image file selected", 400)
+
+    if len(files) > current_app.config['LABEL_SET_MAX_IMAGES']:
+        return verify_error(f"Too many images (max {current_app.config['LABEL_SET_MAX_IMAGES']} per product)", 400)
+
     # Validate file type with function above
-    if not allowed_file(file.filename):
-        return render_template('results.html', 
-                             error="Invalid file type. Please upload PNG, JPG, or JPEG."), 400
-    
-    # Get form data and parse it into correct format
-    form_data = {
-        'brand_name': request.form.get('brand_name', '').strip(),
-        'product_type': request.form.get('product_type', '').strip(),
-        'alcohol_content': request.form.get('alcohol_content', '').strip(),
-        'net_contents': request.form.get('net_contents', '').strip()
-    }
+    if not all(allowed_file(file.filename) for file in files):
+        return verify_error("Invalid file type. Please upload PNG, JPG, or JPEG.", 400)
+
+    form_data = parse_form_data(request.form)
 
     # Basic check to see if required fields are inputted in form
-    if not form_data['brand_name'] or not form_data['product_type'] or not form_data['alcohol_content'] or not form_data['net_contents']:
-        return render_template('results.html', 
-                             error="Please fill in all required fields"), 400
-    
-    filepath = None
-    # Save file temporarily
+    if missing_fields(form_data):
+        return verify_error("Please fill in all required fields", 400)
+
+    as_json = wants_json()
+    if as_json:
+        try:
+            fields = requested_list('fields', FORM_FIELDS + ('government_warning',))
+            include = requested_list('include', serialization.INCLUDE_OPTIONS) or ()
+        except ValueError as e:
+            return json_response({'error': str(e)}, 400)
+
+    panels = [(name or f'image {index}', image_bytes)
+              for index, (name, image_bytes) in enumerate(map(read_upload, files), 1)]
+    filename = ', '.join(name for name, _ in panels)
+
+    # One image goes straight through the pipeline, a label set is OCR'd panel by panel and merged
+    if len(panels) == 1:
+        verify, args = verification_service.verify, (panels[0][1], form_data)
+    else:
+        verify, args = verification_service.verify_set, (panels, form_data)
+
+    if wants_async():
+        # Hand the upload over to the job queue and answer right away
+        job_id = job_queue.submit(verify, *args)
+        current_app.logger.info(f"Queued image {filename} as job {job_id}")
+        return jsonify({
+            'job_id': job_id,
+            'status': JobQueue.QUEUED,
+            'status_url': url_for('main.job_status', job_id=job_id),
+            'stream_url': url_for('main.job_stream', job_id=job_id),
+            'queue': job_queue.stats(),
+        }), 202
+
+    current_app.logger.info(f"Processing image: {filename}")
+
+    # Extract text from image using OCR and validate it (single pass through the pipeline per request)
+    verification = verify(*args)
+
+    if not verification['success']:
+        error_msg = verification['error']
+        current_app.logger.error(f"OCR failed: {error_msg}")
+        return verify_error(f"Could not read text from label image. {error_msg}", 500)
+
+    validation_results = verification['results']
+    ocr_data = validation_results['ocr_data']
+    current_app.logger.info(f"OCR completed. Success: {ocr_data.get('success')}, "
+                            f"Tesseract passes: {ocr_data.get('ocr_passes', 0)}, "
+                            f"cache hit: {ocr_data.get('cache_hit', False)}")
+    current_app.logger.info(f"OCR extracted text (first 200 chars): {ocr_data.get('raw_text', '')[:200]}")
+
+    with timed('render'):
+        if as_json:
+            response = json_response(serialization.compact_results(validation_results, form_data, fields, include))
+        else:
+            response = make_response(render_template('results.html',
+                                                     results=validation_results,
+                                                     form_data=form_data))
+    response.headers['X-OCR-Cache'] = 'hit' if ocr_data.get('cache_hit') else 'miss'
+    response.vary.add('Accept')
+    return response
+
+@bp.route('/api/verify/batch', methods=['POST'])
+def verify_batch():
+    """
+    Verify a whole submission package in one request (JSON, compact and gzipped like /api/verify)
+
+    Expects multipart form data with the images under 'label_images' and an 'items'
+    field holding a JSON list of form data, one entry per image in the same order
+    """
+    files = request.files.getlist('label_images')
+    if not files:
+        return json_response({'error': 'No image files provided'}, 400)
+
     try:
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-
-        ocr_data = ocr_service.extract_all_info(filepath)
-        
-        current_app.logger.info(f"Processing image: {filename}")
-        
-        # Extract text from image using OCR
-        ocr_data = ocr_service.extract_all_info(filepath)
-        current_app.logger.info(f"OCR completed. Success: {ocr_data.get('success')}")
-        
-        if not ocr_data.get('success'):
-            error_msg = ocr_data.get('error', 'Unknown error')
-            current_app.logger.error(f"OCR failed: {error_msg}")
-            return render_template('results.html', 
-                                 error=f"Could not read text from label image. {error_msg}"), 500
-        
-        current_app.logger.info(f"OCR extracted text (first 200 chars): {ocr_data.get('raw_text', '')[:200]}")
-        
-        # Validate extracted data against form inputs
-        validation_results = validator.validate_all(form_data, ocr_data)
-        
-        return render_template('results.html', 
-                             results=validation_results, 
-                             form_data=form_data)
-     
-    finally: # always deletes file no matter what
-        # Clean up by removing uploaded file
-        if filepath and os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-                current_app.logger.info(f"Cleaned up temporary file: {filename}")
-            except Exception as e:
-                current_app.logger.warning(f"Could not remove temporary file: {str(e)}")
-    
+        items = json.loads(request.form.get('items', ''))
+    except ValueError:
+        return json_response({'error': "'items' must be a JSON list of form data"}, 400)
+
+    if not isinstance(items, list) or len(items) != len(files):
+        return json_response({'error': f"Expected {len(files)} entries in 'items', one per image"}, 400)
+
+    if len(files) > current_app.config['BATCH_MAX_ITEMS']:
+        return json_response({'error': f"Batch too large (max {current_app.config['BATCH_MAX_ITEMS']} images)"}, 400)
+
+    # Check every item before running any OCR
+    batch = []
+    for index, (file, item) in enumerate(zip(files, items)):
+        if not isinstance(item, dict):
+            return json_response({'error': f"Item {index} must be an object"}, 400)
+        if file.filename == '' or not allowed_file(file.filename):
+            return json_response({'error': f"Item {index}: invalid file type. Please upload PNG, JPG, or JPEG."}, 400)
+        form_data = parse_form_data(item)
+        missing = missing_fields(form_data)
+        if missing:
+            return json_response({'error': f"Item {index}: missing required fields: {', '.join(missing)}"}, 400)
+        batch.append((file, form_data))
+
+    jobs = [(read_upload(file)[1], form_data) for file, form_data in batch]
+
+    current_app.logger.info(f"Processing batch of {len(jobs)} images")
+    batch_results = verification_service.verify_batch(jobs)
+    current_app.logger.info(f"Batch completed in {batch_results['timing']['wall_ms']:.0f} ms")
+
+    for result, (file, form_data) in zip(batch_results['items'], batch):
+        result['filename'] = file.filename
+        result['form_data'] = form_data
+
+    return json_response(batch_results)
+
+@bp.route('/jobs')
+def job_stats():
+    """Queue depth for queued verification jobs"""
+    return jsonify(job_queue.stats()), 200
+
+@bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Poll a queued verification job, includes the result once it is done"""
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify(job), 200
+
+@bp.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    """Server-Sent Events stream of a job's status changes, ends once the result is delivered"""
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+
+    def events(job):
+        last_status = None
+        while True:
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: {last_status}\ndata: {json.dumps(job)}\n\n"
+                if last_status in JobQueue.FINISHED:
+                    return
+            else:
+                yield ": keep-alive\n\n" # stops proxies from closing an idle stream
+            job = job_queue.wait(job_id, last_status)
+            if job is None:
+                return
+
+    return Response(events(job), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint (counters and histograms of this worker process)"""
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @bp.route('/health')
+@bp.route('/health/live')
 def health_check():
-    """Basic health check"""
+    """Liveness: the worker is up and answering (says nothing about Tesseract, see /health/ready)"""
     return jsonify({'status': 'healthy'}), 200
 
+@bp.route('/health/ready')
+def readiness_check():
+    """
+    Readiness: Tesseract is warmed up and working, and the worker has room for more labels.
+    Answers 503 with the reasons otherwise, so load balancers route away from cold or saturated workers
+    """
+    warm_up = ocr_service.warm_up_state
+    ocr_workers = current_app.config['OCR_MAX_WORKERS']
+    in_flight = metrics.OCR_IN_FLIGHT.value()
+    utilization = in_flight / ocr_workers
+    try:
+        queue = job_queue.stats()
+    except Exception as e:
+        queue = {'error': str(e)}
+
+    reasons = []
+    if warm_up['status'] not in ('ready', 'disabled'):
+        reasons.append(f"OCR engine {warm_up['status']}" + (f": {warm_up['error']}" if 'error' in warm_up else ''))
+    if utilization >= current_app.config['READINESS_MAX_UTILIZATION']:
+        reasons.append(f"OCR saturated ({in_flight} images on {ocr_workers} workers)")
+    if 'error' in queue:
+        reasons.append(f"Job store unavailable: {queue['error']}")
+    elif queue['queued'] > current_app.config['READINESS_MAX_QUEUED']:
+        reasons.append(f"{queue['queued']} jobs queued")
+
+    return jsonify({
+        'status': 'not ready' if reasons else 'ready',
+        'reasons': reasons,
+        'ocr_engine': {'name': ocr_service.engine.name, **warm_up},
+        'capacity': {
+            'ocr_in_flight': in_flight,
+            'ocr_workers': ocr_workers,
+            'utilization': utilization,
+        },
+        'queue': queue,
+        'recent_latency': verification_service.recent_latency(),
+    }), 503 if reasons else 200
+
 
 
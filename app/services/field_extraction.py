@@ -0,0 +1,189 @@
+import re
+from bisect import bisect_right
+
+from app.services.quantities import UNITS, UNIT_PATTERN, parse_number, standard_of_fill, unit_info
+
+# Words associated with product type or other label fields (lines with these are not the brand)
+PRODUCT_TYPE_WORDS = frozenset([
+    'warning', 'government', 'alcohol', 'vol', 'proof', 'alc',
+    'whiskey', 'bourbon', 'vodka', 'wine', 'beer', 'gin', 'rum',
+    'tequila', 'scotch', 'rye', 'cognac', 'brandy',
+    'distilled', 'bottled', 'ml', 'oz', 'liter', 'litre',
+    'straight', 'kentucky', 'tennessee', 'single', 'double',
+    'premium', 'craft', 'aged', 'reserve', 'special',
+    'pale', 'ale', 'lager', 'stout', 'porter', 'ipa',
+    'red', 'white', 'rose', 'sparkling', 'champagne',
+    'cabernet', 'sauvignon', 'merlot', 'chardonnay', 'pinot',
+    'small', 'batch', 'barrel', 'cask', 'oak',
+    'spiced', 'flavored', 'infused', 'blended',
+])
+UNIT_WORDS = frozenset(['ml', 'oz', 'liter', 'litre', 'liters', 'litres', 'cl'])
+
+WORD = re.compile(r'[a-z]+')
+
+# Every numeric field in one alternation over the lowercased text, so it is scanned once.
+# The number is matched once and what follows decides the field: ABV "45% alc", proof
+# "90 proof" or volume "750 ml". Decimal commas count ("0,75 l", "12,5% vol"). Numbers only start at the
+# first digit of a run (lookbehind), so a run is not tried again from each of its digits, and the "5" of
+# "1,5 l" is never a number of its own. Every alternative after the number starts
+# with a letter or "%", so giving digits back can never make a shorter number match
+# (plain quantifiers, possessive ones need Python 3.11)
+FIELD_PATTERN = re.compile(rf'''
+      (?P<number>\d(?<![\d.,]\d)\d*(?:\.\d*|,\d+)?)\s*
+      (?: %\s*(?P<abv_ctx>alcohol|alc|abv|by\s*vol|vol)                       # "45% alc", "45% abv", "45% vol"
+        | (?P<proof>proof)                                                    # "90 proof" (divide by 2 for ABV)
+        | (?P<net_unit>{UNIT_PATTERN})(?![a-z])                               # "750 ml", "75 cl", "12 fl oz" (see quantities.UNITS)
+      )
+    | a(?:lcohol|lc|bv)\s*(?P<abv_pre>\d+(?:\.\d*|,\d+)?)\s*%                 # "alc 45%", "abv 45%"
+''', re.VERBOSE)
+
+FIELD_PATTERN_IGNORECASE = re.compile(FIELD_PATTERN.pattern, re.VERBOSE | re.IGNORECASE)
+
+# Used on single line crops read with a digit whitelist (layout mode)
+PERCENT_VALUE = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+# Preference when several candidates are found (lower wins, then earliest in the text)
+ABV_RANK = {'alc': 0, 'alcohol': 0, 'abv': 0, 'pre': 1, 'vol': 2, 'proof': 3}
+
+def could_be_brand(line):
+    """
+    Check if a line of label text could be the brand name
+
+    Args:
+        line: One line of OCR text
+
+    Returns:
+        Boolean
+    """
+    line = line.strip()
+    words = line.split()
+
+    # Skip empty lines
+    if not line or len(line) <= 5:
+        return False
+
+    # Filter out common words that wouldn't be brand names (whole words, plurals count too)
+    # and lines with percentages or volume measurements
+    if '%' in line:
+        return False
+    for word in WORD.findall(line.lower()):
+        if word in PRODUCT_TYPE_WORDS or word in UNIT_WORDS or word.rstrip('s') in PRODUCT_TYPE_WORDS:
+            return False
+
+    # Brand names are typically 2-5 words OR a single distinctive word
+    return (2 <= len(words) <= 5) or (len(words) == 1 and len(line) > 8)
+
+def scan_fields(text, brand_lines=10):
+    """
+    Find every field candidate in OCR text in a single scan
+
+    Args:
+        text: OCR extracted text
+        brand_lines: How many lines from the top may hold the brand
+
+    Returns:
+        Dict of field name -> list of candidates ('value', 'start', 'end', 'rank', 'match', and 'ml'
+        for net contents), in text order. Fields: brand_name, alcohol_content, net_contents
+        (the government warning is checked against its full text, see government_warning.WarningChecker)
+    """
+    found = {'brand_name': [], 'alcohol_content': [], 'net_contents': []}
+
+    # Brand name: line based, so only the first few lines are looked at
+    offset = 0
+    for index, line in enumerate(text.split('\n')):
+        if index >= brand_lines:
+            break
+        if could_be_brand(line):
+            stripped = line.strip()
+            start = offset + line.index(stripped)
+            found['brand_name'].append({
+                'value': stripped, 'start': start, 'end': start + len(stripped), 'rank': index, 'match': stripped
+            })
+        offset += len(line) + 1
+
+    # Scan lowercased text and slice values out of the original. lower() can change the
+    # length of some (non label) unicode text, in which case offsets would drift
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        field_matches = FIELD_PATTERN.finditer(lowered)
+    else:
+        field_matches = FIELD_PATTERN_IGNORECASE.finditer(text)
+
+    for match in field_matches:
+        kind = match.lastgroup
+        start, end = match.span()
+        candidate = {'start': start, 'end': end, 'match': text[start:end]}
+
+        if kind == 'net_unit':
+            unit = text[match.start('net_unit'):match.end('net_unit')]
+            _, per_unit, unit_index = unit_info(unit)
+            ml = parse_number(match.group('number')) * per_unit
+            # standard container sizes first (a misread "75 ml" is not one), then by unit: mL, cL, L, fl oz...
+            rank = unit_index if standard_of_fill(ml) else len(UNITS) + unit_index
+            found['net_contents'].append(dict(candidate, value=f"{match.group('number')} {unit}", ml=ml, rank=rank))
+            continue
+
+        if kind == 'abv_ctx':
+            value = parse_number(match.group('number'))
+            context = match.group('abv_ctx').lower()
+            rank = ABV_RANK['vol'] if context.endswith('vol') else ABV_RANK[context]
+        elif kind == 'abv_pre':
+            value, rank = parse_number(match.group('abv_pre')), ABV_RANK['pre']
+        else:
+            value, rank = parse_number(match.group('number')) / 2, ABV_RANK['proof']
+        # Needs to be 0-100 (would not make sense o.w.)
+        if 0 <= value <= 100:
+            found['alcohol_content'].append(dict(candidate, value=value, rank=rank))
+
+    return found
+
+def score_candidates(found, spans):
+    """
+    Attach Tesseract word confidences and positions to candidates (in place)
+
+    Args:
+        found: Dict from scan_fields
+        spans: Word spans of the same text (layout.text_with_spans)
+
+    Returns:
+        found, every candidate with 'confidence' (mean of the words it covers, 0-100)
+        and 'box' (left, top, width, height) on the preprocessed image
+    """
+    starts = [span['start'] for span in spans]
+    for candidates in found.values():
+        for candidate in candidates:
+            index = max(bisect_right(starts, candidate['start']) - 1, 0)
+            words = []
+            while index < len(spans) and spans[index]['start'] < candidate['end']:
+                if spans[index]['end'] > candidate['start']:
+                    words.append(spans[index])
+                index += 1
+            if not words:
+                continue
+            left = min(w['left'] for w in words)
+            top = min(w['top'] for w in words)
+            candidate['confidence'] = round(sum(w['conf'] for w in words) / len(words), 1)
+            candidate['box'] = [left, top,
+                                max(w['left'] + w['width'] for w in words) - left,
+                                max(w['top'] + w['height'] for w in words) - top]
+    return found
+
+def rank_candidates(candidates, min_confidence=0):
+    """
+    Order candidates best first: confident ones before ones under min_confidence,
+    then by rank, then by confidence, then earliest in the text
+
+    Args:
+        candidates: List from scan_fields (with or without confidences)
+        min_confidence: Candidates below this are only used when nothing better is found
+
+    Returns:
+        New sorted list
+    """
+    def key(candidate):
+        confidence = candidate.get('confidence')
+        if confidence is None:
+            return (False, candidate['rank'], 0, candidate['start'])
+        return (confidence < min_confidence, candidate['rank'], -confidence, candidate['start'])
+    return sorted(candidates, key=key)
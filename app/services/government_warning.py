@@ -0,0 +1,187 @@
+from itertools import repeat
+
+from config import Config
+
+# Health warning statement every alcohol beverage label must carry, word for word (27 CFR 16.21)
+WARNING_TEXT = ('GOVERNMENT WARNING: (1) According to the Surgeon General, women should not drink alcoholic '
+                'beverages during pregnancy because of the risk of birth defects. (2) Consumption of alcoholic '
+                'beverages impairs your ability to drive a car or operate machinery, and may cause health problems.')
+
+# The statement in the clauses reported as missing. The "(1)"/"(2)" numbering is left out of the
+# matched text, OCR mostly loses the parentheses and a lone digit says nothing about the wording
+CLAUSES = (
+    ('heading', 'GOVERNMENT WARNING'),
+    ('surgeon_general', 'According to the Surgeon General, women should not drink alcoholic beverages '
+                        'during pregnancy because of the risk of birth defects'),
+    ('impairment', 'Consumption of alcoholic beverages impairs your ability to drive a car or operate machinery'),
+    ('health_problems', 'and may cause health problems'),
+)
+CLAUSE_NAMES = {
+    'heading': '"GOVERNMENT WARNING" heading',
+    'surgeon_general': '(1) Surgeon General / pregnancy clause',
+    'impairment': '(2) driving / machinery clause',
+    'health_problems': '"may cause health problems" clause',
+}
+
+# byte -> lowercase letter or digit, anything else (punctuation, line breaks) a space
+NORMALIZE_TABLE = bytes(byte + 32 if 65 <= byte <= 90 else byte if 48 <= byte <= 57 or 97 <= byte <= 122 else 32
+                        for byte in range(256))
+
+def normalize(text):
+    """
+    Lowercase ASCII letters and digits with single spaces between words, as bytes
+    (the warning is plain ASCII, bytes translate and search several times faster than str)
+    """
+    return b' '.join(text.encode('ascii', 'ignore').translate(NORMALIZE_TABLE).split())
+
+def myers_search(masks, length, text, start=0, end=None):
+    """
+    Best approximate occurrence of a pattern anywhere in text[start:end], Myers' bit-parallel
+    edit distance: one column of the dynamic programming table is a pair of bit vectors, so each
+    text character costs a handful of integer operations instead of len(pattern) cell updates
+
+    Args:
+        masks: Byte -> bit mask of the positions it has in the pattern (see Clause)
+        length: Pattern length
+        text: Normalized text to search
+        start, end: Part of the text to search
+
+    Returns:
+        (edit distance, index in text right after the best occurrence)
+    """
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    plus, minus = full, 0  # vertical deltas of the current column
+    score, best, best_end = length, length, start
+    # Bits above the pattern never carry down into it, so only the vector kept for the next column is masked
+    window = text[start:end]
+    for index, eq in enumerate(map(masks.get, window, repeat(0, len(window))), start + 1):
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        hplus = minus | ~(xh | plus)
+        hminus = plus & xh
+        if hplus & last:
+            score += 1
+        elif hminus & last:
+            score -= 1
+        # a match may start anywhere in the text, so nothing is shifted in at the top row
+        hplus <<= 1
+        hminus <<= 1
+        plus = (hminus | ~(xv | hplus)) & full
+        minus = hplus & xv
+        if score < best:
+            best, best_end = score, index
+    return best, best_end
+
+class Clause:
+    """One clause of the warning, prepared for searching (bit masks and exact seed pieces)"""
+
+    def __init__(self, name, text, max_error_rate):
+        self.name = name
+        self.pattern = normalize(text)
+        self.length = len(self.pattern)
+        self.max_errors = int(self.length * max_error_rate)
+
+        self.masks = {}
+        for position, byte in enumerate(self.pattern):
+            self.masks[byte] = self.masks.get(byte, 0) | (1 << position)
+
+        # Pigeonhole: cut into max_errors + 1 pieces, an occurrence with at most max_errors
+        # edits leaves at least one piece untouched, so exact finds of the pieces locate it
+        size = max(self.length // (self.max_errors + 1), 1)
+        self.pieces = [(offset, self.pattern[offset:offset + size])
+                       for offset in range(0, self.length - size + 1, size)]
+
+    def candidates(self, text, limit=3):
+        """
+        Where the clause may start in the text: the diagonals (text position - pattern offset)
+        of exact piece hits, grouped when they are within max_errors of each other (indels shift them)
+
+        Returns:
+            Up to `limit` (first, last) diagonal ranges, most piece hits first
+        """
+        diagonals = []
+        for offset, piece in self.pieces:
+            found = text.find(piece)
+            while found != -1:
+                diagonals.append(found - offset)
+                found = text.find(piece, found + 1)
+        diagonals.sort()
+
+        groups = []
+        for diagonal in diagonals:
+            if groups and diagonal - groups[-1][1] <= self.max_errors:
+                groups[-1][1] = diagonal
+                groups[-1][2] += 1
+            else:
+                groups.append([diagonal, diagonal, 1])
+        groups.sort(key=lambda group: -group[2])
+        return [(first, last) for first, last, _ in groups[:limit]]
+
+    def search(self, text):
+        """
+        Closest occurrence of the clause in normalized text
+
+        Returns:
+            Edit distance (may be over max_errors), or None when no piece of it was found at all
+        """
+        if self.pattern in text: # clean reads, no alignment needed
+            return 0
+        best = None
+        for first, last in self.candidates(text):
+            start = max(first - self.max_errors, 0)
+            errors, _ = myers_search(self.masks, self.length, text, start, last + self.length + self.max_errors)
+            if best is None or errors < best:
+                best = errors
+            if best <= self.max_errors:
+                break
+        return best
+
+class WarningChecker:
+    """
+    Checks OCR text against the full statutory warning (27 CFR 16.21), clause by clause
+
+    Each clause is located with exact finds of its seed pieces and only that window is aligned
+    with Myers' algorithm, so a whole label (even the text of several OCR passes joined) takes
+    a fraction of a millisecond. Every clause is looked for on its own: OCR passes that read
+    the warning's lines in a different order still count, and the best read of each clause wins
+    """
+
+    def __init__(self, max_error_rate=None):
+        """
+        Args:
+            max_error_rate: Edits allowed per clause character for OCR noise (defaults to Config.WARNING_MAX_ERROR_RATE)
+        """
+        self.max_error_rate = max_error_rate if max_error_rate is not None else Config.WARNING_MAX_ERROR_RATE
+        self.clauses = [Clause(name, text, self.max_error_rate) for name, text in CLAUSES]
+
+    def check(self, text):
+        """
+        Align OCR text against the warning
+
+        Args:
+            text: OCR extracted text
+
+        Returns:
+            Dict with 'complete' (every clause read within its error allowance), 'found' (some of the
+            warning is on the label), 'missing' (clause keys of CLAUSES), 'similarity' (0-1, over the
+            whole statement) and per clause 'clauses' (key -> edit distance, None when not found at all)
+        """
+        normalized = normalize(text)
+        clauses, missing = {}, []
+        errors = 0
+        for clause in self.clauses:
+            distance = clause.search(normalized)
+            clauses[clause.name] = distance
+            if distance is None or distance > clause.max_errors:
+                missing.append(clause.name)
+            errors += clause.length if distance is None else min(distance, clause.length)
+
+        total = sum(clause.length for clause in self.clauses)
+        return {
+            'complete': not missing,
+            'found': len(missing) < len(self.clauses),
+            'missing': missing,
+            'similarity': round(1 - errors / total, 3),
+            'clauses': clauses,
+        }
@@ -0,0 +1,152 @@
+import io
+import struct
+import tempfile
+
+from PIL import Image
+
+from config import Config
+from app.services.metrics import UPLOAD_REJECTIONS
+
+# Magic bytes of the image types uploads may be (checked against the content, not the filename)
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+EXTENSION_FORMATS = {'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'gif': 'GIF', 'webp': 'WEBP'}
+
+class UploadRejected(Exception):
+    """Upload refused while it was streaming in ('status' is the HTTP status to answer with)"""
+
+    def __init__(self, message, status=415, reason='type'):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+def allowed_formats(extensions=None):
+    """PIL format names of the allowed file extensions (defaults to Config.ALLOWED_EXTENSIONS)"""
+    extensions = extensions if extensions is not None else Config.ALLOWED_EXTENSIONS
+    return {EXTENSION_FORMATS[ext] for ext in extensions if ext in EXTENSION_FORMATS}
+
+def sniff_format(head):
+    """Image type from the magic bytes at the start of a file, None if it is none of the known ones"""
+    for signature, image_format in SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+def webp_size(head):
+    """
+    Canvas size from the first chunk of a WebP file (PIL only opens WebP once it has the whole file)
+
+    Returns:
+        (width, height), or None while the header is not complete
+    """
+    if len(head) < 30:
+        return None
+    chunk, data = head[12:16], head[20:30]
+    if chunk == b'VP8X': # extended format: 24 bit canvas width - 1 and height - 1
+        return (int.from_bytes(data[4:7], 'little') + 1, int.from_bytes(data[7:10], 'little') + 1)
+    if chunk == b'VP8L' and data[0] == 0x2f: # lossless: 14 bit width - 1 and height - 1
+        bits = int.from_bytes(data[1:5], 'little')
+        return ((bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1)
+    if chunk == b'VP8 ' and data[3:6] == b'\x9d\x01\x2a': # lossy: key frame start code, then 14 bit sizes
+        width, height = struct.unpack('<HH', data[6:10])
+        return (width & 0x3fff, height & 0x3fff)
+    raise UploadRejected("Could not read the WebP image header")
+
+def inspect_header(head, complete=False, formats=None, max_pixels=None, max_side=None, sniff_bytes=None):
+    """
+    Check an upload from its first bytes: the type from the magic bytes, the dimensions from
+    the header (PIL's lazy Image.open, nothing is decoded)
+
+    Args:
+        head: First bytes of the file
+        complete: head is the whole file (no more bytes are coming)
+        formats: Allowed PIL formats (defaults to allowed_formats())
+        max_pixels: Largest width * height (defaults to Config.UPLOAD_MAX_PIXELS), stops decompression bombs
+        max_side: Largest width or height (defaults to Config.UPLOAD_MAX_SIDE)
+        sniff_bytes: Header bytes to give up after (defaults to Config.UPLOAD_SNIFF_BYTES)
+
+    Returns:
+        Dict with 'format' and 'size', or None while more bytes are needed
+
+    Raises:
+        UploadRejected: Not an allowed image type, unreadable header or too many pixels
+    """
+    formats = formats if formats is not None else allowed_formats()
+    max_pixels = max_pixels or Config.UPLOAD_MAX_PIXELS
+    max_side = max_side or Config.UPLOAD_MAX_SIDE
+    sniff_bytes = sniff_bytes or Config.UPLOAD_SNIFF_BYTES
+    out_of_bytes = complete or len(head) >= sniff_bytes
+
+    if len(head) < 12 and not complete:
+        return None
+    image_format = sniff_format(head)
+    if image_format not in formats:
+        names = sorted(formats)
+        raise UploadRejected(f"File is not a {', '.join(names[:-1])} or {names[-1]} image" if len(names) > 1
+                             else f"File is not a {names[0]} image")
+
+    if image_format == 'WEBP':
+        size = webp_size(head)
+    else:
+        try:
+            size = Image.open(io.BytesIO(head)).size
+        except Image.DecompressionBombError: # PIL's own limit, far past ours
+            raise UploadRejected(f"Image too large (over {max_pixels / 1_000_000:g} megapixels)",
+                                 status=413, reason='dimensions')
+        except Exception: # header cut off (JPEG metadata can run long) or broken
+            size = None
+    if size is None:
+        if out_of_bytes:
+            raise UploadRejected(f"Could not read the {image_format} image header")
+        return None
+
+    width, height = size
+    if max(width, height) > max_side or width * height > max_pixels:
+        raise UploadRejected(f"Image too large ({width}x{height} px, at most {max_side} px per side and "
+                             f"{max_pixels / 1_000_000:g} megapixels)", status=413, reason='dimensions')
+    return {'format': image_format, 'size': size}
+
+class SniffedUpload(tempfile.SpooledTemporaryFile):
+    """
+    Upload stream the multipart parser writes a file into: the first bytes are checked with
+    inspect_header as they arrive, so a wrong type or bomb stops the request before the rest is read.
+    Like werkzeug's default it spills to disk past max_size, memory per upload stays bounded
+    """
+
+    def __init__(self, max_size=500 * 1024, **limits):
+        """
+        Args:
+            max_size: Bytes kept in memory before spilling to a temporary file
+            limits: formats, max_pixels, max_side, sniff_bytes (see inspect_header)
+        """
+        super().__init__(max_size=max_size, mode='w+b')
+        self.limits = limits
+        self.header = None
+        self._head = b''
+
+    def _inspect(self, complete=False):
+        try:
+            self.header = inspect_header(self._head, complete=complete, **self.limits)
+        except UploadRejected as e:
+            UPLOAD_REJECTIONS.inc(reason=e.reason)
+            raise
+        if self.header is not None:
+            self._head = b''
+
+    def write(self, data):
+        if self.header is None:
+            self._head += data
+            self._inspect()
+        return super().write(data)
+
+    def seek(self, *args):
+        # the parser rewinds the file once it has all of it, last chance for a header that never completed
+        if self.header is None:
+            self._inspect(complete=True)
+        return super().seek(*args)
@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+class JobQueue:
+    """
+    Local job queue for verifications that run outside the request
+
+    Jobs run on a worker pool inside the gunicorn worker that accepted them.
+    Job state is written to a sqlite file so any worker can answer status polls
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    FINISHED = (DONE, FAILED)
+
+    # Seconds between purges of one worker (status polls and queue stats purge too, not only submissions)
+    PURGE_INTERVAL = 5.0
+
+    def __init__(self, db_path=None, max_workers=None, result_ttl=None, job_timeout=None):
+        self.db_path = db_path if db_path is not None else Config.JOB_STORE_PATH
+        self.max_workers = max_workers or Config.JOB_MAX_WORKERS
+        self.result_ttl = result_ttl if result_ttl is not None else Config.JOB_RESULT_TTL
+        self.job_timeout = job_timeout if job_timeout is not None else Config.JOB_TIMEOUT
+        self._last_purge = 0.0
+
+        self._executor = None
+        self._futures = {} # job id -> future of the jobs this worker submitted and hasn't finished
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock) # wakes up waiters on jobs started by this worker
+        self._local = threading.local()
+
+    @property
+    def executor(self):
+        """Worker pool, only started when the first job comes in"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='verify-job')
+            return self._executor
+
+    def _connection(self):
+        """Get (or open) the sqlite connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            folder = os.path.dirname(self.db_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, status TEXT NOT NULL, result TEXT, error TEXT, '
+                'created REAL NOT NULL, started REAL, finished REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)')
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _update(self, job_id, expected=None, **fields):
+        """
+        Write job fields and wake up anyone waiting on this worker
+
+        Args:
+            job_id: Id from submit
+            expected: Only write when the job still has this status (None = always)
+            **fields: Columns to set
+
+        Returns:
+            True if the job was updated
+        """
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        conn = self._connection()
+        if expected is None:
+            cursor = conn.execute(f'UPDATE jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+        else:
+            cursor = conn.execute(f'UPDATE jobs SET {columns} WHERE id = ? AND status = ?',
+                                  (*fields.values(), job_id, expected))
+        conn.commit()
+        with self._changed:
+            self._changed.notify_all()
+        return cursor.rowcount > 0
+
+    def submit(self, fn, *args):
+        """
+        Queue a job
+
+        Args:
+            fn: Function to run, its return value (JSON serializable) becomes the job result
+            *args: Arguments for fn
+
+        Returns:
+            Job id string
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        conn = self._connection()
+        self._purge(now)
+        conn.execute('INSERT INTO jobs (id, status, created) VALUES (?, ?, ?)', (job_id, self.QUEUED, now))
+        conn.commit()
+
+        future = self.executor.submit(self._run, job_id, fn, args)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id, fn, args):
+        """Run a job on the pool and record its outcome (finished jobs never change again)"""
+        if not self._update(job_id, expected=self.QUEUED, status=self.RUNNING, started=time.time()):
+            return # failed by _purge while it waited for the pool
+        try:
+            outcome = {'status': self.DONE, 'result': json.dumps(fn(*args))}
+        except Exception as e:
+            outcome = {'status': self.FAILED, 'error': str(e)}
+
+        # dropped if the job ran past job_timeout and _purge already failed it
+        self._update(job_id, expected=self.RUNNING, finished=time.time(), **outcome)
+
+    def _purge(self, now=None):
+        """
+        Fail jobs that will never finish and forget finished jobs older than result_ttl.
+        Runs at most every PURGE_INTERVAL seconds per worker
+
+        A job running for longer than job_timeout is failed (its worker was killed or restarted), a result
+        it still delivers is dropped. A job queued for longer than job_timeout is failed and never runs:
+        _run only starts jobs that are still queued, and this worker also cancels its own pending ones
+        """
+        now = now if now is not None else time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+
+        conn = self._connection()
+        cutoff = now - self.job_timeout
+        conn.execute(
+            'UPDATE jobs SET status = ?, error = ?, finished = ? WHERE status = ? AND started < ?',
+            (self.FAILED, f'Job abandoned: still running after {self.job_timeout:g} seconds '
+                          f'(the worker running it stopped)', now, self.RUNNING, cutoff)
+        )
+        expired = [job_id for job_id, in conn.execute(
+            'SELECT id FROM jobs WHERE status = ? AND created < ?', (self.QUEUED, cutoff))]
+        for job_id in expired:
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ? AND status = ?',
+                (self.FAILED, f'Job abandoned: not started within {self.job_timeout:g} seconds',
+                 now, job_id, self.QUEUED)
+            )
+            with self._lock:
+                future = self._futures.pop(job_id, None)
+            if future is not None:
+                future.cancel() # frees its place in the pool (_run would skip it anyway)
+        conn.execute('DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?', (now - self.result_ttl,))
+        conn.commit()
+
+    def status(self, job_id):
+        """
+        Get current state of a job
+
+        Args:
+            job_id: Id from submit
+
+        Returns:
+            Dict with 'id', 'status', timings and 'result'/'error' once finished, or None if unknown
+        """
+        self._purge()
+        row = self._connection().execute(
+            'SELECT id, status, result, error, created, started, finished FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job_id, status, result, error, created, started, finished = row
+        job = {'id': job_id, 'status': status, 'created': created, 'started': started, 'finished': finished}
+        if status == self.QUEUED:
+            job['position'] = self._connection().execute(
+                'SELECT COUNT(*) FROM jobs WHERE status = ? AND created < ?', (self.QUEUED, created)
+            ).fetchone()[0]
+        if result is not None:
+            job['result'] = json.loads(result)
+        if error is not None:
+            job['error'] = error
+        return job
+
+    def wait(self, job_id, last_status=None, timeout=15.0):
+        """
+        Block until a job's status differs from last_status (or timeout)
+
+        Args:
+            job_id: Id from submit
+            last_status: Status the caller already knows about
+            timeout: Seconds to wait at most
+
+        Returns:
+            Job dict from status (may be unchanged on timeout), or None if unknown
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.status(job_id)
+            if job is None or job['status'] != last_status:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            # Jobs from this worker notify us, jobs from other workers are picked up by re-polling
+            with self._changed:
+                self._changed.wait(min(remaining, Config.JOB_POLL_INTERVAL))
+
+    def stats(self):
+        """Queue depth across all workers sharing the job store"""
+        self._purge()
+        counts = dict(self._connection().execute(
+            'SELECT status, COUNT(*) FROM jobs GROUP BY status'
+        ).fetchall())
+        return {
+            'queued': counts.get(self.QUEUED, 0),
+            'running': counts.get(self.RUNNING, 0),
+            'done': counts.get(self.DONE, 0),
+            'failed': counts.get(self.FAILED, 0),
+            'workers': self.max_workers,
+        }
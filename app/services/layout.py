@@ -0,0 +1,114 @@
+import re
+
+from app.services.quantities import UNIT_PATTERN
+
+# Lines worth a closer look for each field
+ABV_LINE = re.compile(r'%|\bproof\b|\balc\b|\babv\b', re.IGNORECASE)
+NET_CONTENTS_LINE = re.compile(rf'\d\s*(?:{UNIT_PATTERN}|fl)\b', re.IGNORECASE)
+
+def group_lines(words):
+    """
+    Group OCR words (from an image_to_data pass) into text lines
+
+    Args:
+        words: List of word dicts from an engine's image_to_data
+
+    Returns:
+        List of line dicts ('text', 'conf', 'left', 'top', 'right', 'bottom', 'height', 'words'), top to bottom
+    """
+    grouped = {}
+    for word in words:
+        grouped.setdefault(word['line'], []).append(word)
+
+    lines = []
+    for line_words in grouped.values():
+        line_words.sort(key=lambda w: w['left'])
+        lines.append({
+            'text': ' '.join(w['text'] for w in line_words),
+            'conf': sum(w['conf'] for w in line_words) / len(line_words),
+            'left': min(w['left'] for w in line_words),
+            'top': min(w['top'] for w in line_words),
+            'right': max(w['left'] + w['width'] for w in line_words),
+            'bottom': max(w['top'] + w['height'] for w in line_words),
+            'height': max(w['height'] for w in line_words),
+            'words': line_words,
+        })
+
+    lines.sort(key=lambda line: (line['top'], line['left']))
+    return lines
+
+def lines_to_text(lines):
+    """Rebuild plain OCR text from lines (one per row, like image_to_string)"""
+    return '\n'.join(line['text'] for line in lines)
+
+def text_with_spans(lines, offset=0):
+    """
+    Rebuild plain OCR text from lines and remember where each word ended up in it
+
+    Args:
+        lines: Lines from group_lines
+        offset: Added to every span (when the text is appended to other text)
+
+    Returns:
+        (text, spans) where spans is a list of word dicts ('start', 'end', 'conf', 'left', 'top',
+        'width', 'height') in text order
+    """
+    spans = []
+    position = offset
+    for line in lines:
+        for word in line['words']:
+            spans.append({
+                'start': position,
+                'end': position + len(word['text']),
+                'conf': word['conf'],
+                'left': word['left'],
+                'top': word['top'],
+                'width': word['width'],
+                'height': word['height'],
+            })
+            position += len(word['text']) + 1 # joined with a space, or the newline after the line
+    return lines_to_text(lines), spans
+
+def find_regions(lines, image_height, could_be_brand):
+    """
+    Pick out the lines each field should be read from
+
+    Args:
+        lines: Lines from group_lines
+        image_height: Height of the image the lines came from
+        could_be_brand: Function telling if a line of text could be the brand name
+
+    Returns:
+        Dict of field name -> list of lines (best first)
+    """
+    # Brand: the largest text in the top half of the label
+    brand = [line for line in lines
+             if line['top'] < image_height / 2 and could_be_brand(line['text'])]
+    brand.sort(key=lambda line: (-line['height'], line['top']))
+
+    return {
+        'brand_name': brand[:1],
+        'alcohol_content': [line for line in lines if ABV_LINE.search(line['text'])],
+        'net_contents': [line for line in lines if NET_CONTENTS_LINE.search(line['text'])],
+    }
+
+def crop_line(img, line, padding=0.25):
+    """
+    Crop a line out of an image with a margin around it (Tesseract needs some white space)
+
+    Args:
+        img: PIL Image the line was found on
+        line: Line dict from group_lines
+        padding: Margin as a fraction of the line height
+
+    Returns:
+        PIL Image
+    """
+    pad = max(4, int(line['height'] * padding))
+    box = (
+        max(0, line['left'] - pad),
+        max(0, line['top'] - pad),
+        min(img.width, line['right'] + pad),
+        min(img.height, line['bottom'] + pad),
+    )
+    return img.crop(box)
@@ -0,0 +1,285 @@
+import re
+from collections import defaultdict
+
+TOKEN = re.compile(r'\w+')
+
+def tokens(text):
+    """Lowercase word tokens (punctuation and spacing differences from OCR are dropped)"""
+    return TOKEN.findall(text.lower())
+
+def normalize(text):
+    return ' '.join(tokens(text))
+
+def levenshtein(a, b, max_distance=None):
+    """
+    Edit distance, only computing the diagonal band that can stay under max_distance
+    (O(len * max_distance) instead of O(len * len), and stops as soon as a row is over it)
+
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Largest distance of interest (None = no limit)
+
+    Returns:
+        Distance, or max_distance + 1 if it is larger than max_distance
+    """
+    if a == b:
+        return 0
+    # shared start and end cost nothing, only the middle needs the table (near matches are mostly shared)
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is None:
+        max_distance = len(a)
+    over = max_distance + 1
+    if len(a) - len(b) > max_distance:
+        return over
+    if not b:
+        return len(a)
+
+    previous = [j if j <= max_distance else over for j in range(len(b) + 1)]
+    for i, char in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= max_distance else over
+        row_min = current[0]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = 0 if char == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost, over)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return over
+        previous = current
+    return previous[len(b)]
+
+def levenshtein_ratio(a, b, cutoff=0.0):
+    """
+    Similarity from edit distance (1.0 = identical)
+
+    Args:
+        a: First string
+        b: Second string
+        cutoff: Scores under this are returned as 0.0 (narrows the band, so low cutoffs cost more)
+
+    Returns:
+        Float between 0 and 1
+    """
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    max_distance = int(longest * (1 - cutoff))
+    distance = levenshtein(a, b, max_distance)
+    if distance > max_distance:
+        return 0.0
+    return 1 - distance / longest
+
+def jaro_winkler(a, b, cutoff=0.0, prefix_scale=0.1):
+    """
+    Jaro-Winkler similarity (rewards a shared start, forgiving of transposed letters)
+
+    Args:
+        a: First string
+        b: Second string
+        cutoff: Scores under this are returned as 0.0
+        prefix_scale: Boost per shared leading character (up to 4)
+
+    Returns:
+        Float between 0 and 1
+    """
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    a_matched = [False] * len(a)
+    b_matched = [False] * len(b)
+    matches = 0
+    for i, char in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not b_matched[j] and b[j] == char:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    b_chars = [char for char, matched in zip(b, b_matched) if matched]
+    a_chars = [char for char, matched in zip(a, a_matched) if matched]
+    transpositions = sum(x != y for x, y in zip(a_chars, b_chars)) / 2
+
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    score = jaro + prefix * prefix_scale * (1 - jaro)
+    return score if score >= cutoff else 0.0
+
+SCORERS = {
+    'levenshtein': levenshtein_ratio,
+    'jaro_winkler': jaro_winkler,
+}
+
+def token_set_ratio(a, b, scorer=levenshtein_ratio, cutoff=0.0):
+    """
+    Compare the sets of words, so order and words repeated by OCR passes don't matter
+    ("Distillery Old Tom" = "OLD TOM DISTILLERY OLD TOM")
+
+    Unlike fuzzywuzzy's token_set_ratio, a name contained in a longer one does not score 1.0
+    (a form saying "Tom" should not match "Old Tom Distillery")
+
+    Args:
+        a: First string
+        b: Second string
+        scorer: levenshtein_ratio or jaro_winkler
+        cutoff: Scores under this are returned as 0.0
+
+    Returns:
+        Float between 0 and 1
+    """
+    return scorer(' '.join(sorted(set(tokens(a)))), ' '.join(sorted(set(tokens(b)))), cutoff)
+
+def similarity(a, b, scorer=levenshtein_ratio, cutoff=0.0):
+    """
+    Best of the character level score (normalized text) and the token set score
+
+    Args:
+        a: First string
+        b: Second string
+        scorer: levenshtein_ratio or jaro_winkler
+        cutoff: Scores under this are returned as 0.0 (lets the banded distance stop early)
+
+    Returns:
+        Float between 0 and 1
+    """
+    if not a or not b:
+        return 0.0
+    a_tokens, b_tokens = tokens(a), tokens(b)
+    a_text, b_text = ' '.join(a_tokens), ' '.join(b_tokens)
+    score = scorer(a_text, b_text, cutoff)
+    if score == 1.0:
+        return score
+
+    # token set score (same as token_set_ratio), only when it compares something different
+    a_set, b_set = ' '.join(sorted(set(a_tokens))), ' '.join(sorted(set(b_tokens)))
+    if (a_set, b_set) != (a_text, b_text):
+        score = max(score, scorer(a_set, b_set, max(cutoff, score)))
+    return score
+
+def best_window(needle, text, scorer=levenshtein_ratio, cutoff=0.0):
+    """
+    Find the run of words in a text that looks most like needle. Windows with one word
+    fewer to one word more than needle are tried at every position, and windows whose
+    length already rules them out are skipped before scoring, so this is about linear in the text
+
+    Args:
+        needle: What to look for (e.g. the brand name from the form)
+        text: Text to look in (e.g. the raw OCR text)
+        scorer: levenshtein_ratio or jaro_winkler
+        cutoff: Lowest score of interest
+
+    Returns:
+        (score, window text), (0.0, None) when nothing reaches the cutoff
+    """
+    words = tokens(text)
+    target = normalize(needle)
+    if not words or not target:
+        return 0.0, None
+
+    size = len(target.split())
+    max_length_gap = len(target) * (1 - cutoff) if scorer is levenshtein_ratio else None
+    best = (0.0, None)
+    for start in range(len(words)):
+        for count in range(max(1, size - 1), size + 2):
+            if start + count > len(words):
+                break
+            window = ' '.join(words[start:start + count])
+            if max_length_gap is not None and abs(len(window) - len(target)) > max_length_gap:
+                continue
+            score = similarity(target, window, scorer, max(cutoff, best[0]))
+            if score > best[0]:
+                best = (score, window)
+                if score == 1.0:
+                    return best
+    return best
+
+class KnownBrandIndex:
+    """
+    Trigram index over a list of registered brand names, so the closest ones to an OCR read
+    are found without scoring every brand: brands sharing the most trigrams are shortlisted,
+    then only those are scored properly
+    """
+
+    def __init__(self, brands, scorer=levenshtein_ratio):
+        """
+        Args:
+            brands: Iterable of brand names
+            scorer: levenshtein_ratio or jaro_winkler (for the final scoring)
+        """
+        self.brands = []
+        self.scorer = scorer
+        self._trigram_counts = []
+        self._index = defaultdict(list)
+        for brand in dict.fromkeys(b.strip() for b in brands): # keep order, drop duplicates
+            if not brand:
+                continue
+            grams = self._trigrams(brand)
+            brand_id = len(self.brands)
+            self.brands.append(brand)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._index[gram].append(brand_id)
+
+    @classmethod
+    def load(cls, path, scorer=levenshtein_ratio):
+        """Build the index from a text file with one brand per line"""
+        with open(path, encoding='utf-8') as f:
+            return cls(f, scorer)
+
+    def __len__(self):
+        return len(self.brands)
+
+    @staticmethod
+    def _trigrams(text):
+        padded = f'  {normalize(text)} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def lookup(self, name, cutoff=0.0, limit=5, shortlist=50):
+        """
+        Registered brands closest to a name
+
+        Args:
+            name: Brand name as read (or typed)
+            cutoff: Lowest similarity returned
+            limit: Most results returned
+            shortlist: Brands (most shared trigrams first) that get scored
+
+        Returns:
+            List of (brand, score), best first
+        """
+        grams = self._trigrams(name)
+        shared = defaultdict(int)
+        for gram in grams:
+            for brand_id in self._index.get(gram, ()):
+                shared[brand_id] += 1
+
+        # Dice coefficient on trigrams to shortlist, real similarity to rank
+        dice = sorted(shared, key=lambda i: -2 * shared[i] / (len(grams) + self._trigram_counts[i]))
+        results = []
+        for brand_id in dice[:shortlist]:
+            score = similarity(name, self.brands[brand_id], self.scorer, cutoff)
+            if score >= cutoff and score > 0:
+                results.append((self.brands[brand_id], score))
+        results.sort(key=lambda item: -item[1])
+        return results[:limit]
@@ -0,0 +1,244 @@
+"""
+Small in-process metrics registry with Prometheus text output
+
+    with timed('preprocess'):          # per stage histogram (+ the current request's trace)
+        ...
+
+    @timed('validation')               # same thing as a decorator
+    def validate_all(...): ...
+
+    FIELD_CHECKS.inc(field='brand_name', result='match')
+
+Metrics are kept per process (each gunicorn worker answers /metrics with its own numbers)
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} needs labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}']
+
+class Counter(_Metric):
+    """Only goes up (calls, hits, matches...)"""
+
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """Goes up and down (requests in flight, queue depth...)"""
+
+    type_name = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count a block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    """Distribution of observed values (cumulative buckets, sum and count, as Prometheus expects)"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def time(self, **labels):
+        """Time a block (context manager) or every call of a function (decorator), in seconds"""
+        return _Timer(lambda elapsed: self.observe(elapsed, **labels))
+
+    def snapshot(self, **labels):
+        """Dict with 'count' and 'sum' of one label set"""
+        state = self._values.get(self._key(labels))
+        return {'count': state['count'], 'sum': state['sum']} if state else {'count': 0, 'sum': 0.0}
+
+    def _samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['counts']):
+            cumulative += count
+            labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labels, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+        lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+class _Timer:
+    """Context manager and decorator calling `record(seconds)` when the block/function finishes"""
+
+    def __init__(self, record):
+        self.record = record
+        self._starts = threading.local()
+
+    def __enter__(self):
+        starts = getattr(self._starts, 'stack', None)
+        if starts is None:
+            starts = self._starts.stack = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        self.record(time.perf_counter() - self._starts.stack.pop())
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self:
+                return fn(*args, **kwargs)
+        return wrapper
+
+class Registry:
+    """Every metric of the process, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'label_stage_seconds', 'Time spent in each stage of label verification', labels=('stage',)))
+TESSERACT_CALLS = REGISTRY.register(Counter(
+    'tesseract_calls_total', 'Tesseract invocations', labels=('engine', 'kind')))
+TESSERACT_ERRORS = REGISTRY.register(Counter(
+    'tesseract_errors_total', 'Tesseract invocations that raised', labels=('engine', 'kind')))
+TESSERACT_SECONDS = REGISTRY.register(Histogram(
+    'tesseract_call_seconds', 'Duration of single Tesseract invocations', labels=('engine', 'kind', 'psm')))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'cache_lookups_total', 'Cache lookups by result (memory hit, disk hit or miss)', labels=('cache', 'result')))
+FIELD_CHECKS = REGISTRY.register(Counter(
+    'field_checks_total', 'Field validations by outcome', labels=('field', 'result')))
+OCR_IN_FLIGHT = REGISTRY.register(Gauge(
+    'ocr_images_in_flight', 'Label images being OCR\'d right now'))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'http_requests_in_flight', 'Requests being handled right now', labels=('endpoint',)))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'http_request_seconds', 'Request duration by endpoint and status', labels=('endpoint', 'status')))
+UPLOAD_REJECTIONS = REGISTRY.register(Counter(
+    'upload_rejections_total', 'Uploads refused while streaming in (type, dimensions)', labels=('reason',)))
+
+# Stage timings of the request being handled in this context (see start_trace)
+_trace = contextvars.ContextVar('metrics_trace', default=None)
+
+def start_trace():
+    """Start collecting stage timings for the current request, returns the dict they go into"""
+    trace = {}
+    _trace.set(trace)
+    return trace
+
+def end_trace():
+    _trace.set(None)
+
+def _record_stage(stage, elapsed):
+    STAGE_SECONDS.observe(elapsed, stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace[stage] = trace.get(stage, 0.0) + elapsed * 1000
+
+def timed(stage):
+    """
+    Time a pipeline stage, as a context manager or decorator
+
+    Args:
+        stage: Stage name (label of label_stage_seconds)
+
+    Returns:
+        Timer usable with `with` or `@`
+    """
+    return _Timer(lambda elapsed: _record_stage(stage, elapsed))
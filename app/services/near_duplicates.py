@@ -0,0 +1,202 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from itertools import combinations
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+from app.services.metrics import CACHE_LOOKUPS
+
+def dhash(img, hash_size=16):
+    """
+    Difference hash of a (preprocessed) label: the image is cropped to its ink, shrunk to
+    hash_size x (hash_size + 1) and each bit says whether a cell is brighter than its left neighbour.
+    Re-exports, recompression and small scale changes keep almost every bit
+
+    Args:
+        img: PIL Image
+        hash_size: Bits per side (hash has hash_size ** 2 bits)
+
+    Returns:
+        Int
+    """
+    gray = img.convert('L')
+    box = gray.point(lambda value: 255 if value < 128 else 0).getbbox() # margins/padding should not shift the grid
+    if box:
+        gray = gray.crop(box)
+    cells = np.asarray(gray.resize((hash_size + 1, hash_size), Image.Resampling.BOX), dtype=np.int16)
+    bits = (cells[:, 1:] > cells[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+class NearDuplicateIndex:
+    """
+    Perceptual hashes of labels already OCR'd, pointing at their OCR cache entry
+
+    Multi-index hashing: each hash is cut into 16 bit chunks, indexed by (position, value).
+    Two hashes less than one chunk count of bits apart share at least one chunk exactly, so a
+    lookup is one indexed query per chunk plus a Hamming distance check on the few rows found,
+    however many labels are stored (sqlite file shared by workers, like the OCR cache)
+    """
+
+    CHUNK_BITS = 16
+
+    def __init__(self, db_path=None, max_distance=None, hash_size=16, max_entries=None):
+        """
+        Args:
+            db_path: sqlite file (defaults to Config.NEAR_DUPLICATE_PATH)
+            max_distance: Largest Hamming distance counted as the same artwork (defaults to Config.NEAR_DUPLICATE_MAX_DISTANCE)
+            hash_size: dhash size (bits = hash_size ** 2, a multiple of 16)
+            max_entries: Hashes kept, oldest dropped first (defaults to Config.OCR_CACHE_MAX_ENTRIES)
+        """
+        self.db_path = db_path if db_path is not None else Config.NEAR_DUPLICATE_PATH
+        self.max_distance = max_distance if max_distance is not None else Config.NEAR_DUPLICATE_MAX_DISTANCE
+        self.hash_size = hash_size
+        self.max_entries = max_entries if max_entries is not None else Config.OCR_CACHE_MAX_ENTRIES
+        self.chunks = hash_size ** 2 // self.CHUNK_BITS
+        self._local = threading.local()
+
+    def _connection(self):
+        """Get (or open) the sqlite connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            folder = os.path.dirname(self.db_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS images ('
+                'id INTEGER PRIMARY KEY, hash BLOB NOT NULL, fingerprint INTEGER NOT NULL, '
+                'cache_key BLOB NOT NULL UNIQUE, created REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS chunks ('
+                'position INTEGER NOT NULL, value INTEGER NOT NULL, image_id INTEGER NOT NULL, '
+                'PRIMARY KEY (position, value, image_id)) WITHOUT ROWID'
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _fingerprint_id(fingerprint):
+        """OCR settings string -> small int (hashes are only compared under the same settings)"""
+        return int(hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:15], 16)
+
+    def _split(self, image_hash):
+        mask = (1 << self.CHUNK_BITS) - 1
+        return [(position, (image_hash >> (position * self.CHUNK_BITS)) & mask) for position in range(self.chunks)]
+
+    def _probes(self, image_hash):
+        """
+        (position, values) to look up: chunks of blank areas (all 0 or all 1 bits) match nearly
+        every label, so they are skipped whenever enough other chunks are left for the pigeonhole
+        argument, and with fewer chunks than max_distance each one is probed with its close values too
+        """
+        mask = (1 << self.CHUNK_BITS) - 1
+        chunks = self._split(image_hash)
+        informative = [(position, value) for position, value in chunks if value not in (0, mask)]
+        if len(informative) > self.max_distance:
+            chunks = informative
+        radius = self.max_distance // len(chunks)
+
+        probes = []
+        for position, value in chunks:
+            values = {value}
+            for flips in range(1, radius + 1):
+                for bits in combinations(range(self.CHUNK_BITS), flips):
+                    values.add(value ^ sum(1 << bit for bit in bits))
+            probes.append((position, sorted(values)))
+        return probes
+
+    def lookup(self, image_hash, fingerprint):
+        """
+        Closest stored label within max_distance
+
+        Args:
+            image_hash: dhash of the preprocessed image
+            fingerprint: OCRService.cache_fingerprint()
+
+        Returns:
+            Dict with 'key' (OCR cache key) and 'distance', or None
+        """
+        try:
+            conn = self._connection()
+            ids = set()
+            for position, values in self._probes(image_hash):
+                marks = ','.join('?' * len(values))
+                ids.update(row[0] for row in conn.execute(
+                    f'SELECT image_id FROM chunks WHERE position = ? AND value IN ({marks})', (position, *values)))
+            if not ids:
+                CACHE_LOOKUPS.inc(cache='near_duplicate', result='miss')
+                return None
+
+            best = None
+            ids = list(ids)
+            for start in range(0, len(ids), 500): # stay under sqlite's variable limit
+                batch = ids[start:start + 500]
+                rows = conn.execute(
+                    f'SELECT hash, cache_key FROM images WHERE fingerprint = ? AND id IN ({",".join("?" * len(batch))})',
+                    (self._fingerprint_id(fingerprint), *batch))
+                for stored, cache_key in rows:
+                    distance = (int.from_bytes(stored, 'big') ^ image_hash).bit_count()
+                    if distance <= self.max_distance and (best is None or distance < best['distance']):
+                        best = {'key': cache_key.hex(), 'distance': distance}
+        except sqlite3.Error:
+            return None # like the OCR cache, problems here should never fail a verification
+
+        CACHE_LOOKUPS.inc(cache='near_duplicate', result='miss' if best is None else 'disk')
+        return best
+
+    def add(self, image_hash, fingerprint, cache_key):
+        """
+        Remember the hash of a label that was just OCR'd
+
+        Args:
+            image_hash: dhash of the preprocessed image
+            fingerprint: OCRService.cache_fingerprint()
+            cache_key: OCR cache key its extraction is stored under
+        """
+        try:
+            conn = self._connection()
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO images (hash, fingerprint, cache_key, created) VALUES (?, ?, ?, ?)',
+                (image_hash.to_bytes(self.hash_size ** 2 // 8, 'big'), self._fingerprint_id(fingerprint),
+                 bytes.fromhex(cache_key), time.time())
+            )
+            if cursor.rowcount:
+                image_id = cursor.lastrowid
+                conn.executemany('INSERT OR IGNORE INTO chunks (position, value, image_id) VALUES (?, ?, ?)',
+                                 [(position, value, image_id) for position, value in self._split(image_hash)])
+                if self.max_entries and image_id % 100 == 0: # trimming every insert is wasted work
+                    self._evict(conn, image_id)
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _delete(self, conn, rows):
+        """Delete (id, hash) rows, chunks by their primary key (chunks has no index on image_id to stay small)"""
+        conn.executemany('DELETE FROM chunks WHERE position = ? AND value = ? AND image_id = ?',
+                         [(position, value, image_id) for image_id, stored in rows
+                          for position, value in self._split(int.from_bytes(stored, 'big'))])
+        conn.executemany('DELETE FROM images WHERE id = ?', [(image_id,) for image_id, _ in rows])
+
+    def remove(self, cache_key):
+        """Forget a label (its OCR cache entry is gone)"""
+        try:
+            conn = self._connection()
+            self._delete(conn, conn.execute('SELECT id, hash FROM images WHERE cache_key = ?',
+                                            (bytes.fromhex(cache_key),)).fetchall())
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn, newest_id):
+        """Drop the oldest hashes beyond max_entries"""
+        cutoff = newest_id - self.max_entries
+        if cutoff > 0:
+            self._delete(conn, conn.execute('SELECT id, hash FROM images WHERE id <= ?', (cutoff,)).fetchall())
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from app.services.metrics import CACHE_LOOKUPS
+
+class OCRCache:
+    """
+    Content addressed cache for OCR results
+
+    Two tiers: a small in-process LRU (per gunicorn worker) in front of a
+    sqlite file that every worker on the machine shares
+    """
+
+    def __init__(self, db_path=None, memory_entries=None, max_entries=None, ttl=None):
+        self.db_path = db_path if db_path is not None else Config.OCR_CACHE_PATH
+        self.memory_entries = memory_entries if memory_entries is not None else Config.OCR_CACHE_MEMORY_ENTRIES
+        self.max_entries = max_entries if max_entries is not None else Config.OCR_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.OCR_CACHE_TTL
+
+        self._memory = OrderedDict() # key -> (created, value)
+        self._lock = threading.Lock()
+        self._local = threading.local() # sqlite connections can't be shared across threads
+
+    @staticmethod
+    def make_key(image_bytes, fingerprint=''):
+        """
+        Build cache key from the image content and the OCR settings used on it
+
+        Args:
+            image_bytes: Raw bytes of the uploaded image
+            fingerprint: String describing preprocessing/Tesseract settings
+
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.sha256(image_bytes)
+        digest.update(b'\0' + fingerprint.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _connection(self):
+        """Get (or open) the sqlite connection for the current thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            folder = os.path.dirname(self.db_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL') # lets workers read while another one writes
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ocr_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ocr_cache_accessed ON ocr_cache (accessed)')
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _expired(self, created, now):
+        return self.ttl and now - created > self.ttl
+
+    def _remember(self, key, created, value):
+        """Put entry in the memory tier, dropping least recently used ones"""
+        if not self.memory_entries:
+            return
+        with self._lock:
+            self._memory[key] = (created, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key, kind='ocr'):
+        """
+        Look up cached OCR result
+
+        Args:
+            key: Key from make_key
+            kind: What is being looked up ('ocr', 'ladder', 'orientation'), only labels the hit rate metrics
+
+        Returns:
+            Cached dict or None
+        """
+        value, result = self._get(key)
+        CACHE_LOOKUPS.inc(cache=kind, result=result)
+        return value
+
+    def _get(self, key):
+        """(cached dict or None, 'memory', 'disk' or 'miss')"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    return dict(entry[1]), 'memory'
+                del self._memory[key]
+
+        try:
+            conn = self._connection()
+            row = conn.execute('SELECT value, created FROM ocr_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None, 'miss'
+            value, created = row
+            if self._expired(created, now):
+                conn.execute('DELETE FROM ocr_cache WHERE key = ?', (key,))
+                conn.commit()
+                return None, 'miss'
+            conn.execute('UPDATE ocr_cache SET accessed = ? WHERE key = ?', (now, key))
+            conn.commit()
+        except sqlite3.Error:
+            return None, 'miss' # cache problems should never fail a verification
+
+        value = json.loads(value)
+        self._remember(key, created, value)
+        return dict(value), 'disk'
+
+    def set(self, key, value):
+        """
+        Store OCR result in both tiers
+
+        Args:
+            key: Key from make_key
+            value: JSON serializable dict
+        """
+        now = time.time()
+        self._remember(key, now, dict(value))
+
+        try:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO ocr_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn, now):
+        """Drop expired rows and trim the disk tier down to max_entries"""
+        if self.ttl:
+            conn.execute('DELETE FROM ocr_cache WHERE created < ?', (now - self.ttl,))
+        if self.max_entries:
+            conn.execute(
+                'DELETE FROM ocr_cache WHERE key IN ('
+                'SELECT key FROM ocr_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        """Remove everything from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        try:
+            conn = self._connection()
+            conn.execute('DELETE FROM ocr_cache')
+            conn.commit()
+        except sqlite3.Error:
+            pass
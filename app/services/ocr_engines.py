@@ -0,0 +1,276 @@
+import functools
+import logging
+import re
+import threading
+from contextlib import contextmanager
+
+import pytesseract
+from config import Config
+from app.services.metrics import TESSERACT_CALLS, TESSERACT_ERRORS, TESSERACT_SECONDS
+
+try:
+    import tesserocr
+except ImportError: # optional, needs libtesseract to build
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+PSM_PATTERN = re.compile(r'--psm\s+(\d+)')
+
+# What tesseract prints when osd.traineddata is not installed
+OSD_DATA_MISSING = re.compile(r"osd\.traineddata|loading language 'osd'|couldn't load any languages", re.IGNORECASE)
+
+class EngineUnavailable(RuntimeError):
+    """A call can't work in this process at all (binary or language data missing), rather than failing on one image"""
+
+def instrumented(kind):
+    """Count and time every call of an engine method (kind: 'text', 'data' or 'osd')"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, img, *args, **kwargs):
+            config = kwargs.get('config', args[0] if args else '')
+            psm = PSM_PATTERN.search(config)
+            labels = {'engine': self.name, 'kind': kind}
+            TESSERACT_CALLS.inc(**labels)
+            try:
+                with TESSERACT_SECONDS.time(**labels, psm=psm.group(1) if psm else ('0' if kind == 'osd' else 'default')):
+                    return method(self, img, *args, **kwargs)
+            except Exception:
+                TESSERACT_ERRORS.inc(**labels)
+                raise
+        return wrapper
+    return decorator
+
+class PytesseractEngine:
+    """Runs the tesseract binary through pytesseract (new process + model load on every call)"""
+
+    name = 'pytesseract'
+
+    def __init__(self):
+        if Config.TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_CMD
+
+    @instrumented('text')
+    def image_to_string(self, img, config=''):
+        """
+        Read text from an image
+
+        Args:
+            img: PIL Image
+            config: Tesseract command line config (e.g. '--oem 3 --psm 6')
+
+        Returns:
+            Text string
+        """
+        return pytesseract.image_to_string(img, config=config)
+
+    @instrumented('data')
+    def image_to_data(self, img, config=''):
+        """
+        Read words with their boxes and confidences
+
+        Args:
+            img: PIL Image
+            config: Tesseract command line config
+
+        Returns:
+            List of word dicts ('text', 'conf', 'left', 'top', 'width', 'height', 'line')
+        """
+        data = pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT)
+
+        words = []
+        for i, text in enumerate(data['text']):
+            if not text.strip():
+                continue
+            words.append({
+                'text': text,
+                'conf': float(data['conf'][i]),
+                'left': data['left'][i],
+                'top': data['top'][i],
+                'width': data['width'][i],
+                'height': data['height'][i],
+                'line': (data['block_num'][i], data['par_num'][i], data['line_num'][i]),
+            })
+        return words
+
+    @instrumented('osd')
+    def detect_orientation(self, img):
+        """
+        Tesseract orientation and script detection (needs osd.traineddata)
+
+        Args:
+            img: PIL Image
+
+        Returns:
+            Dict with 'rotate' (degrees clockwise that make the text upright) and 'confidence'
+
+        Raises:
+            EngineUnavailable: tesseract or osd.traineddata is missing (other errors are about this image,
+            e.g. "Too few characters" on a sparse label)
+        """
+        try:
+            osd = pytesseract.image_to_osd(img, config='--psm 0', output_type=pytesseract.Output.DICT)
+        except pytesseract.TesseractNotFoundError as e:
+            raise EngineUnavailable(str(e)) from e
+        except pytesseract.TesseractError as e:
+            if OSD_DATA_MISSING.search(str(e.message)):
+                raise EngineUnavailable(f'osd.traineddata not found: {e.message}') from e
+            raise
+        return {'rotate': osd['rotate'], 'confidence': osd['orientation_conf']}
+
+class TesserocrEngine:
+    """
+    Calls the Tesseract C++ API in process through tesserocr
+
+    Each thread keeps one initialized API (model loaded once) and reuses it for every call
+    """
+
+    name = 'tesserocr'
+
+    VARIABLE_PATTERN = re.compile(r'-c\s+(\w+)=(\S*)')
+
+    def __init__(self, lang='eng', tessdata=None):
+        if tesserocr is None:
+            raise RuntimeError('tesserocr is not installed')
+        self.lang = lang
+        self.tessdata = tessdata or Config.TESSDATA_PREFIX
+        self._local = threading.local()
+        self._api() # fail now (missing model etc.) rather than on the first label
+
+    def _api(self):
+        """Get (or create) this thread's API instance"""
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            kwargs = {'lang': self.lang}
+            if self.tessdata:
+                kwargs['path'] = self.tessdata
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            self._local.api = api
+        return api
+
+    @contextmanager
+    def _configured(self, img, config):
+        """Apply --psm and -c variables from a pytesseract style config string for one call"""
+        api = self._api()
+
+        psm = PSM_PATTERN.search(config)
+        api.SetPageSegMode(int(psm.group(1)) if psm else tesserocr.PSM.AUTO) # same default as the binary
+
+        # variables stick to the API, remember the old values to put them back for the next call
+        previous = {}
+        for name, value in self.VARIABLE_PATTERN.findall(config):
+            previous.setdefault(name, api.GetVariableAsString(name) or '')
+            api.SetVariable(name, value)
+
+        try:
+            api.SetImage(img)
+            yield api
+        finally:
+            for name, value in previous.items():
+                api.SetVariable(name, value)
+            api.Clear()
+
+    @instrumented('text')
+    def image_to_string(self, img, config=''):
+        """
+        Read text from an image (same config strings as pytesseract, --psm and -c are applied)
+
+        Args:
+            img: PIL Image
+            config: Tesseract command line config (e.g. '--oem 3 --psm 6')
+
+        Returns:
+            Text string
+        """
+        with self._configured(img, config) as api:
+            return api.GetUTF8Text()
+
+    @instrumented('data')
+    def image_to_data(self, img, config=''):
+        """
+        Read words with their boxes and confidences
+
+        Args:
+            img: PIL Image
+            config: Tesseract command line config
+
+        Returns:
+            List of word dicts ('text', 'conf', 'left', 'top', 'width', 'height', 'line')
+        """
+        level = tesserocr.RIL.WORD
+        words = []
+        with self._configured(img, config) as api:
+            api.Recognize()
+            line = 0
+            for word in tesserocr.iterate_level(api.GetIterator(), level):
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                text = word.GetUTF8Text(level)
+                if not text or not text.strip():
+                    continue
+                left, top, right, bottom = word.BoundingBox(level)
+                words.append({
+                    'text': text,
+                    'conf': word.Confidence(level),
+                    'left': left,
+                    'top': top,
+                    'width': right - left,
+                    'height': bottom - top,
+                    'line': (line,),
+                })
+        return words
+
+    @instrumented('osd')
+    def detect_orientation(self, img):
+        """
+        Tesseract orientation and script detection (needs osd.traineddata)
+
+        Args:
+            img: PIL Image
+
+        Returns:
+            Dict with 'rotate' (degrees clockwise that make the text upright) and 'confidence'
+
+        Raises:
+            EngineUnavailable: osd.traineddata is missing (RuntimeError when OSD only failed on this image)
+        """
+        with self._configured(img, '--psm 0') as api:
+            osd = api.DetectOrientationScript()
+        if not osd:
+            # tesserocr only says it failed, the installed languages tell why
+            if 'osd' not in tesserocr.get_languages(self.tessdata)[1]:
+                raise EngineUnavailable('osd.traineddata not found')
+            raise RuntimeError('orientation detection failed')
+        # orient_deg is how far the page is turned, undo it
+        return {'rotate': (360 - osd['orient_deg']) % 360, 'confidence': osd['orient_conf']}
+
+ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+def get_engine(name=None):
+    """
+    Build the OCR engine selected in Config.OCR_ENGINE
+
+    'auto' and 'tesserocr' use the in-process engine when tesserocr is available
+    and fall back to pytesseract otherwise
+
+    Args:
+        name: 'auto', 'tesserocr' or 'pytesseract' (defaults to Config.OCR_ENGINE)
+
+    Returns:
+        Engine instance
+    """
+    name = name or Config.OCR_ENGINE
+    if name not in ('auto', *ENGINES):
+        raise ValueError(f"Unknown OCR engine '{name}' (choose from auto, {', '.join(ENGINES)})")
+
+    if name in ('auto', TesserocrEngine.name):
+        try:
+            return TesserocrEngine()
+        except Exception as e:
+            if name == TesserocrEngine.name:
+                logger.warning(f"tesserocr engine unavailable, falling back to pytesseract: {e}")
+
+    return PytesseractEngine()
@@ -1,69 +1,289 @@
-import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image, ImageDraw, ImageFont
+import io
 import re
 import os 
+import time
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
+from app.services.ocr_cache import OCRCache
+from app.services.ocr_engines import get_engine
+from app.services.orientation import OrientationCorrector
+from app.services.near_duplicates import NearDuplicateIndex, dhash
+from app.services.layout import group_lines, text_with_spans, find_regions, crop_line
+from app.services.field_extraction import (scan_fields, score_candidates, rank_candidates, could_be_brand,
+                                           PERCENT_VALUE, NUMBER)
+from app.services.government_warning import WarningChecker
+from app.services.preprocessing import get_preprocessor, normalize_size
+from app.services.metrics import OCR_IN_FLIGHT, timed
+
+# Special characters that might throw an error in OCR (keep important punctuation such as %, ., -)
+SPECIAL_CHARACTERS = re.compile(r'[^\w\s\.\-%]')
+
+def warm_up_image():
+    """Tiny built-in label snippet OCR'd once at startup (loads the engine and language data)"""
+    img = Image.new('RGB', (360, 60), 'white')
+    ImageDraw.Draw(img).text((10, 15), '45% Alc./Vol. 750 mL', fill='black', font=ImageFont.load_default(size=24))
+    return img
 
 class OCRService:
     """Service for extracting text from alcohol label images"""
+
+    # Tesseract passes run on every label (combined in this order). Each one is run at most once per image.
+    # If the first pass already finds every field with high word confidence, the rest are never started
+    # (see OCR_EARLY_EXIT and OCR_CONFIDENT_SCORE in config); with early exit off they all run in parallel
+    # OEM 3: Using both Traditional and Neural Network based OCR
+    PSM_CONFIGS = (
+        r'--oem 3 --psm 6',  # PSM 6: Assume text is a single block
+        r'--oem 3 --psm 11',  # PSM 11: Good for scattered text when label is not written as block
+    )
     
-    def __init__(self):
-        """Initialize OCR service with Tesseract"""
-        if Config.TESSERACT_CMD:
-            pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_CMD
+    # Region of interest mode (OCR_STRATEGY = 'regions'): one layout pass finds the text lines,
+    # then only the lines holding brand, ABV and net contents are read again
+    LAYOUT_CONFIG = r'--oem 3 --psm 3'  # PSM 3: Fully automatic page segmentation
+    REGION_CONFIGS = {
+        'brand_name': r'--oem 3 --psm 7',  # PSM 7: Treat the image as a single text line
+        'alcohol_content': r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.%',
+        'net_contents': r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789.,mMlLcCfFoOzZ',
+    }
+
+    # Bump whenever preprocessing or field extraction changes so cached results are not reused
+    PIPELINE_VERSION = 7
+
+    def __init__(self, cache=None, preprocessor=None, engine=None, orientation=None, near_duplicates=None):
+        """
+        Initialize OCR service with Tesseract
+
+        Args:
+            cache: Optional OCRCache (one is created from Config when caching is enabled)
+            preprocessor: Optional preprocessing engine (defaults to Config.PREPROCESS_ENGINE)
+            engine: Optional OCR engine (defaults to Config.OCR_ENGINE)
+            orientation: Optional OrientationCorrector (defaults to Config.ORIENTATION_CHECK)
+            near_duplicates: Optional NearDuplicateIndex (one is created when Config.NEAR_DUPLICATE_ENABLED)
+        """
+        self.engine = engine or get_engine()
+
+        # Bounded pool shared by all requests in this worker for running PSM passes side by side
+        # (every Tesseract call goes through it, see submit)
+        self._executor = ThreadPoolExecutor(max_workers=Config.OCR_MAX_WORKERS,
+                                            thread_name_prefix='ocr-pass')
+
+        if cache is None and Config.OCR_CACHE_ENABLED:
+            cache = OCRCache()
+        self.cache = cache
+        self.preprocessor = preprocessor or get_preprocessor()
+        self.orientation = orientation or OrientationCorrector(self.engine, cache=self.cache, submit=self.submit)
+        # Near duplicates reuse the extraction stored in the cache, so they need one
+        if near_duplicates is None and Config.NEAR_DUPLICATE_ENABLED and self.cache is not None:
+            near_duplicates = NearDuplicateIndex()
+        self.near_duplicates = near_duplicates
+        self.early_exit = Config.OCR_EARLY_EXIT
+        self.confident_score = Config.OCR_CONFIDENT_SCORE
+        self.min_confidence = Config.OCR_MIN_CONFIDENCE
+        self.strategy = Config.OCR_STRATEGY
+        self.warning_checker = WarningChecker()
+        self.warm_up_state = {'status': 'pending'} # see warm_up, 'disabled' when READINESS_WARM_UP is off
+
+    def warm_up(self):
+        """
+        OCR a tiny built-in image so the first real label doesn't pay for starting Tesseract
+        (also tells whether the engine works at all, e.g. a missing binary or language data)
+
+        Returns:
+            Dict with 'status' ('ready' or 'failed'), 'ms' and 'error' when it failed
+        """
+        start = time.perf_counter()
+        try:
+            self.engine.image_to_data(self.preprocessor.process(warm_up_image()), config=self.PSM_CONFIGS[0])
+            state = {'status': 'ready'}
+        except Exception as e:
+            state = {'status': 'failed', 'error': str(e)}
+        state['ms'] = (time.perf_counter() - start) * 1000
+        self.warm_up_state = state
+        return state
+
+    def start_warm_up(self):
+        """Run warm_up on the OCR pool in the background (warm_up_state says when it is done)"""
+        self.warm_up_state = {'status': 'warming'}
+        return self.submit(self.warm_up)
+
+    def submit(self, fn, *args):
+        """
+        Run a Tesseract call on this worker's bounded OCR pool (shared by every request, see OCR_MAX_WORKERS)
+
+        Returns:
+            concurrent.futures.Future
+        """
+        return self._executor.submit(fn, *args)
+
+    def cache_fingerprint(self):
+        """String describing every setting that changes OCR output (part of the cache key)"""
+        size_limits = f'{Config.OCR_MAX_PIXELS}:{Config.OCR_DOWNSCALE_TEXT_HEIGHT}:{Config.OCR_MIN_LONG_SIDE}'
+        if self.strategy == 'regions':
+            configs = [self.LAYOUT_CONFIG, *self.REGION_CONFIGS.values()]
+        else:
+            configs = list(self.PSM_CONFIGS)
+        return '|'.join([f'v{self.PIPELINE_VERSION}', size_limits, self.orientation.fingerprint(),
+                         self.preprocessor.fingerprint(), self.engine.name, self.strategy,
+                         f'conf{self.min_confidence}', f'warn{self.warning_checker.max_error_rate}', *configs])
+
+    @staticmethod
+    def is_path(source):
+        """Image source is a file path (rather than bytes, a file-like object or a PIL Image)"""
+        return isinstance(source, (str, os.PathLike))
+
+    def image_bytes(self, source):
+        """
+        Get raw bytes of an image source (used for the cache key)
+        
+        Args:
+            source: Path, bytes, file-like object or PIL Image
+            
+        Returns:
+            Bytes
+        """
+        if isinstance(source, Image.Image):
+            return f'{source.mode}{source.size}'.encode() + source.tobytes()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return bytes(source)
+        if self.is_path(source):
+            with open(source, 'rb') as f:
+                return f.read()
+        # file-like object, read it and rewind so it can still be decoded
+        position = source.tell()
+        data = source.read()
+        source.seek(position)
+        return data
 
+    def _open_image(self, source):
+        """
+        Open an image from any supported source without touching the filesystem (unless given a path)
+        
+        Args:
+            source: Path, bytes, file-like object or PIL Image
+            
+        Returns:
+            PIL Image object
+        """
+        if isinstance(source, Image.Image):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return Image.open(io.BytesIO(source))
+        return Image.open(source)
+
+    @timed('preprocess')
     def preprocess_image(self, image_path):
         """
         Preprocess image to improve OCR accuracy
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file (or bytes, file-like object, PIL Image)
             
         Returns:
             PIL Image object (preprocessed)
         """
         try:
+            # Raw bytes identify the image for the orientation cache (decoded images are hashed by pixels)
+            image_bytes = None
+            if self.orientation.mode != 'off' and not isinstance(image_path, Image.Image):
+                image_bytes = self.image_bytes(image_path)
+
             # Open image
-            img = Image.open(image_path)
+            img = self._open_image(image_path)
+            # Shrink huge camera photos first (JPEGs are decoded at reduced scale)
+            img = normalize_size(img)
             # Convert to RGB, standardize formats such as png with transparency 
             if img.mode != 'RGB':
                 img = img.convert('RGB')
+
+            # Turn sideways, upside down or tilted photos upright (checked once per image)
+            img = self.orientation.correct(img, image_bytes)
             
-            # convert to grayscale (improves OCR)
-            img = img.convert('L')
-
-            # Increase contrast to improve 
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(2.0)
-
-            # Sharpen image
-            img = img.filter(ImageFilter.SHARPEN)
-
-            # Resize image if too small (should be around 300px for Tesseract to work best with)
-            width, height = img.size
-            if width < 300:
-                scale_factor = 300 / width
-                new_size = (int(width * scale_factor), int(height * scale_factor))
-                img = img.resize(new_size, Image.LANCZOS)
-            
+            # Grayscale, contrast, sharpen and rescale with the engine picked in config
+            img = self.preprocessor.process(img)
             return img
     
         except Exception as e:
             raise Exception(f"Error preprocessing image: {str(e)}")
         
-    def extract_text(self, image_path):
+    def _run_tesseract(self, img, config=''):
+        """
+        Read plain text from an already preprocessed image (region re-reads, full passes use
+        image_to_data in _run_pass to get word confidences)
+        
+        Args:
+            img: Preprocessed PIL Image
+            config: Tesseract config string
+            
+        Returns:
+            Text read by Tesseract
+        """
+        return self.engine.image_to_string(img, config=config)
+
+    def _run_pass(self, img, index, config):
+        """
+        Run one of the PSM_CONFIGS passes (executed on the OCR thread pool)
+        
+        Args:
+            img: Preprocessed PIL Image
+            index: Position of the pass in PSM_CONFIGS
+            config: Tesseract config string
+            
+        Returns:
+            Lines read by Tesseract (layout.group_lines, words carry their confidences),
+            or None if an extra pass failed
+        """
+        try:
+            return group_lines(self.engine.image_to_data(img, config=config))
+        except Exception:
+            if index > 0:
+                # extra passes are only there to improve results, skip if they fail
+                return None
+            # first pass failed, retry once with Tesseract's default settings (raises if that fails too)
+            return group_lines(self.engine.image_to_data(img))
+
+    def _is_confident(self, text, spans, expected=None):
+        """
+        Check if a single pass already found every field with high word confidence (or read exactly
+        the values of a near duplicate), so the other passes can be skipped
+        
+        Args:
+            text: OCR text from one pass
+            spans: Word spans of that text
+            expected: Optional extraction of a near duplicate of this image
+            
+        Returns:
+            Boolean
+        """
+        fields = self._extract_fields(text, spans) # untimed, the label's extraction is recorded once afterwards
+        if fields['alcohol_content'] is None or fields['net_contents'] is None or fields['brand_name'] is None \
+                or not fields['government_warning']['complete']:
+            return False
+
+        if expected and all(fields[field] == expected.get(field)
+                            for field in ('brand_name', 'alcohol_content', 'net_contents')):
+            return True
+
+        for field in ('brand_name', 'alcohol_content', 'net_contents'):
+            top = fields['candidates'][field][0] # ranked best first
+            if top.get('confidence', 0) < self.confident_score:
+                return False
+        return True
+
+    def extract_text(self, image_path, processed_img=None, expected=None):
         """
         Extract text from image using OCR
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file (or bytes, file-like object, PIL Image)
+            processed_img: Result of preprocess_image when it was already run on this image
+            expected: Optional extraction of a near duplicate, see _is_confident
             
         Returns:
-            dict with 'raw_text' and 'cleaned_text'
+            dict with 'raw_text', 'cleaned_text', 'word_spans' (confidence and box of every word) and 'ocr_passes'
         """
         try:
             # Check if file exists
-            if not os.path.exists(image_path):
+            if self.is_path(image_path) and not os.path.exists(image_path):
                 return {
                     'raw_text': '',
                     'cleaned_text': '',
@@ -71,8 +291,9 @@ class OCRService:
                     'error': f'Image file not found: {image_path}'
                 }
             
-            # Preprocess image using function above
-            processed_img = self.preprocess_image(image_path)
+            # Preprocess image using function above (only once, every pass reuses it)
+            if processed_img is None:
+                processed_img = self.preprocess_image(image_path)
             
             # Verify we have a valid image
             if processed_img is None:
@@ -82,30 +303,49 @@ class OCRService:
                     'success': False,
                     'error': 'Failed to preprocess image'
                 }
-                
-            # Extract text using Tesseract
-            custom_config = r'--oem 3 --psm 6' # OEM 3: Using both Traditional and Neural Network based OCR. PSM 6: Assume text is a single block
-            try:
-                raw_text = pytesseract.image_to_string(processed_img, config=custom_config)
-            except Exception as ocr_error:
-                try:
-                    raw_text = pytesseract.image_to_string(processed_img)
-                except Exception as e:
-                    return {
-                        'raw_text': '',
-                        'cleaned_text': '',
-                        'success': False,
-                        'error': f'Tesseract OCR failed: {str(e)}'
-                    }
-
-            # Alternative Config setting if above does not appear as single block of text
+
+            # Passes run on the pool (each pass is a subprocess or a tesserocr call that releases the GIL, so threads
+            # are enough). With early exit the extra passes are only started once the first one turns out not to be
+            # enough: a pass that has started can't be cancelled, so starting them alongside would not save their CPU
+            def submit(passes):
+                return [self.submit(self._run_pass, processed_img, i, config) for i, config in passes]
+
+            passes = list(enumerate(self.PSM_CONFIGS))
+            futures = submit(passes[:1] if self.early_exit else passes)
+
             try:
-                custom_config_alt = r'--oem 3 --psm 11'# PSM 11: Good for scattered text when label is not written as block
-                alt_text = pytesseract.image_to_string(processed_img, config=custom_config_alt)
-                # Combine both for best results
-                combined_text = raw_text + "\n" + alt_text
-            except:
-                combined_text = raw_text
+                first_lines = futures[0].result()
+            except Exception as e:
+                for future in futures[1:]:
+                    future.cancel()
+                return {
+                    'raw_text': '',
+                    'cleaned_text': '',
+                    'success': False,
+                    'error': f'Tesseract OCR failed: {str(e)}'
+                }
+
+            first_text, spans = text_with_spans(first_lines)
+            texts = [first_text]
+            early_exit = self.early_exit and self._is_confident(first_text, spans, expected)
+
+            # First pass already has everything we need otherwise, the slower ones are never run
+            if not early_exit:
+                if len(futures) == 1:
+                    futures += submit(passes[1:])
+                for future in futures[1:]:
+                    lines = future.result()
+                    if lines is not None:
+                        # passes are joined with newlines, keep the word spans in step with the combined text
+                        offset = sum(len(text) + 1 for text in texts)
+                        text, pass_spans = text_with_spans(lines, offset)
+                        texts.append(text)
+                        spans.extend(pass_spans)
+
+            ocr_passes = len(texts)
+
+            # Combine all passes for best results
+            combined_text = "\n".join(texts)
 
             # Clean up text 
             cleaned_text = self._clean_text(combined_text)
@@ -114,6 +354,9 @@ class OCRService:
             return {
                 'raw_text': combined_text,
                 'cleaned_text': cleaned_text,
+                'word_spans': spans,
+                'ocr_passes': ocr_passes,
+                'early_exit': early_exit,
                 'success': True
             }
         
@@ -126,6 +369,122 @@ class OCRService:
                 'error': str(e)
             }
         
+    def extract_text_regions(self, image_path, processed_img=None):
+        """
+        Extract text with a layout pass, then re-read only the lines that hold the fields
+        (cropped, single line mode, digit whitelists for ABV and net contents)
+        
+        Args:
+            image_path: Path to the image file (or bytes, file-like object, PIL Image)
+            processed_img: Result of preprocess_image when it was already run on this image
+            
+        Returns:
+            dict like extract_text, plus 'regions' (field -> value read from its own region)
+        """
+        try:
+            if self.is_path(image_path) and not os.path.exists(image_path):
+                return {
+                    'raw_text': '',
+                    'cleaned_text': '',
+                    'success': False,
+                    'error': f'Image file not found: {image_path}'
+                }
+
+            if processed_img is None:
+                processed_img = self.preprocess_image(image_path)
+
+            try:
+                words = self.submit(self.engine.image_to_data, processed_img, self.LAYOUT_CONFIG).result()
+            except Exception as e:
+                return {
+                    'raw_text': '',
+                    'cleaned_text': '',
+                    'success': False,
+                    'error': f'Tesseract OCR failed: {str(e)}'
+                }
+
+            lines = group_lines(words)
+            text, spans = text_with_spans(lines)
+            regions = find_regions(lines, processed_img.height, self._could_be_brand)
+
+            # Read every candidate line at once, small crops are quick
+            futures = {
+                field: [(line, self.submit(self._run_tesseract, crop_line(processed_img, line),
+                                                     self.REGION_CONFIGS[field]))
+                        for line in field_lines]
+                for field, field_lines in regions.items()
+            }
+
+            ocr_passes = 1
+            values = {}
+            for field, field_futures in futures.items():
+                for line, future in field_futures:
+                    if field in values:
+                        future.cancel() # already have this field from a better line
+                        continue
+                    try:
+                        read = future.result()
+                        ocr_passes += 1
+                    except Exception:
+                        continue
+                    value = self._parse_region(field, read, line['text'])
+                    if value is not None:
+                        values[field] = value
+
+            return {
+                'raw_text': text,
+                'cleaned_text': self._clean_text(text),
+                'regions': values,
+                'word_spans': spans,
+                'ocr_passes': ocr_passes,
+                'success': True
+            }
+
+        except Exception as e:
+            return {
+                'raw_text': '',
+                'cleaned_text': '',
+                'success': False,
+                'error': str(e)
+            }
+
+    def _parse_region(self, field, read, layout_text):
+        """
+        Turn the text read from a field's region into the field value
+        
+        Args:
+            field: Field name (key of REGION_CONFIGS)
+            read: Text Tesseract read from the cropped region
+            layout_text: Text of the same line from the layout pass (for context the whitelist removed)
+            
+        Returns:
+            Field value or None
+        """
+        read = ' '.join(read.split())
+        if not read:
+            return None
+
+        if field == 'brand_name':
+            return read
+
+        if field == 'alcohol_content':
+            match = PERCENT_VALUE.search(read)
+            if match:
+                value = float(match.group(1))
+            elif 'proof' in layout_text.lower():
+                match = NUMBER.search(read)
+                if not match:
+                    return None
+                value = float(match.group(0)) / 2
+            else:
+                return None
+            return value if 0 <= value <= 100 else None
+
+        if field == 'net_contents':
+            return self.extract_net_contents(read)
+
+        return None
+
     def _clean_text(self, text):
         """
         Clean and normalize OCR text
@@ -140,10 +499,45 @@ class OCRService:
         text = ' '.join(text.split())
 
         # Remove special characters that might throw an error in OCR (keep important punctuation such as %, ., -)
-        text = re.sub(r'[^\w\s\.\-%]', '', text)
+        text = SPECIAL_CHARACTERS.sub('', text)
 
         return text
 
+    def _could_be_brand(self, line):
+        """Check if a line of label text could be the brand name"""
+        return could_be_brand(line)
+
+    @timed('extraction')
+    def extract_fields(self, text, spans=None):
+        """
+        Extract every field from OCR text in one scan
+        
+        Args:
+            text: OCR extracted text
+            spans: Optional word spans of the text (adds Tesseract confidences and boxes to candidates)
+            
+        Returns:
+            Dict with the chosen 'brand_name', 'alcohol_content', 'net_contents', the
+            'government_warning' check (see WarningChecker.check) and all 'candidates' per field, ranked best first
+        """
+        return self._extract_fields(text, spans)
+
+    def _extract_fields(self, text, spans=None):
+        """extract_fields without the 'extraction' stage timer (for looking at a single pass)"""
+        candidates = scan_fields(text)
+        if spans:
+            score_candidates(candidates, spans)
+        chosen = {}
+        for field in ('brand_name', 'alcohol_content', 'net_contents'):
+            # ranked once with the confidence floor, the value is the top of that ranking
+            candidates[field] = rank_candidates(candidates[field], self.min_confidence)
+            chosen[field] = candidates[field][0]['value'] if candidates[field] else None
+        return {
+            **chosen,
+            'government_warning': self.warning_checker.check(text),
+            'candidates': candidates,
+        }
+
     def extract_brand_name(self, text):
         """
         Extract brand name from OCR text if available 
@@ -155,52 +549,7 @@ class OCRService:
         Returns:
             Extracted brand name or None
         """
-        # Split text into lines
-        lines = text.split('\n')
-
-        # words associated with product type or other label fields 
-        product_type_words = [
-            'warning', 'government', 'alcohol', 'vol', 'proof', 'alc',
-            'whiskey', 'bourbon', 'vodka', 'wine', 'beer', 'gin', 'rum', 
-            'tequila', 'scotch', 'rye', 'cognac', 'brandy',
-            'distilled', 'bottled', 'ml', 'oz', 'liter', 'litre',
-            'straight', 'kentucky', 'tennessee', 'single', 'double',
-            'premium', 'craft', 'aged', 'reserve', 'special',
-            'pale', 'ale', 'lager', 'stout', 'porter', 'ipa',
-            'red', 'white', 'rose', 'sparkling', 'champagne',
-            'cabernet', 'sauvignon', 'merlot', 'chardonnay', 'pinot',
-            'small', 'batch', 'barrel', 'cask', 'oak',
-            'spiced', 'flavored', 'infused', 'blended'
-        ]
-
-        candidates = []
-
-        # Look for Brand name in in the first few lines
-        for i, line in enumerate(lines[:10]):  # Check first 10 
-            line = line.strip()
-            words = line.split()
-        
-        # Skip empty lines
-            if not line or len(line) <= 5:
-                continue
-            
-            line_lower = line.lower()
-
-            # Filter out common words that wouldn't be brand names
-            if any(word in line_lower for word in product_type_words):
-                continue
-
-            # Skip if line contains percentages or volume measurements
-            if '%' in line or any(unit in line_lower for unit in ['ml', 'oz', 'liter', 'litre', 'cl']):
-                continue
-
-            # Brand names are typically 2-5 words OR a single distinctive word
-            if (2 <= len(words) <= 5) or (len(words) == 1 and len(line) > 8):
-                candidates.append((i, line))
-        if candidates:
-            return candidates[0][1]
-            
-        return None
+        return self.extract_fields(text)['brand_name']
         
     def extract_alcohol_content(self, text):
         """
@@ -212,30 +561,7 @@ class OCRService:
         Returns:
             Float alcohol percentage or None
         """
-        # Common pattern(s) for alcohol content
-        patterns = [
-            r'(\d+\.?\d*)\s*%\s*(?:alc|alcohol|abv)',  # "45% alc" or "45% ABV"
-            r'(?:alc|alcohol|abv)\s*(\d+\.?\d*)\s*%',  # "alc 45%" or "ABV 45%"
-            r'(\d+\.?\d*)\s*%\s*(?:vol|by\s*vol)',      # "45% vol" or "45% by vol"
-            r'(\d+\.?\d*)\s*proof',                      # "90 proof" (divide by 2 for ABV)
-        ]
-        text_lower = text.lower() # lowercase text
-        
-        # search for patterns in text
-        for pattern in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                value = float(match.group(1))
-
-                # If it's proof, divide by 2 for ABV
-                if 'proof' in pattern:
-                    value = value / 2
-
-                # Needs to be 0-100 (would not make sense o.w.)
-                if 0 <= value <= 100:
-                    return value
-        
-        return None
+        return self.extract_fields(text)['alcohol_content']
 
     def extract_net_contents(self, text):
         """
@@ -247,64 +573,77 @@ class OCRService:
         Returns:
             String with volume (e.g., "750 mL") or None
         """
-        # Pattern(s) for volume
-        patterns = [
-            r'(\d+\.?\d*)\s*(ml|mL|ML|milliliters?)', 
-            r'(\d+\.?\d*)\s*(l|L|liters?|litres?)', 
-            r'(\d+\.?\d*)\s*(oz|OZ|fl\.?\s*oz|fluid\s*ounces?)',
-            r'(\d+\.?\d*)\s*(cl|cL|CL|centiliters?)',
-        ]
-
-        # Search patterns
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                value = match.group(1) # number
-                unit = match.group(2) # unit
-                return f"{value} {unit}"
-            
-        return None
+        return self.extract_fields(text)['net_contents']
 
     def check_government_warning(self, text):
         """
-        Check if government warning text is present
+        Check the government warning text against the full statutory wording
         
         Args:
             text: OCR extracted text
             
         Returns:
-            Boolean indicating if warning is present
+            Dict with 'complete', 'found', 'missing' clauses and 'similarity' (see WarningChecker.check)
         """
-        text_lower = text.lower()
-        
-        # Key phrases that should appear in warning
-        required_phrases = [
-            'government warning',
-            'surgeon general',
-        ]
-
-        # Check if at least the main phrase is present
-        if 'government warning' in text_lower:
-            return True
-        
-        # Check for "warning" and "surgeon general" separately
-        if 'warning' in text_lower and 'surgeon general' in text_lower:
-            return True
-        
-        return False
+        return self.warning_checker.check(text)
 
-    def extract_all_info(self, image_path):
+    def extract_all_info(self, image_path, reuse_near_duplicates=True):
         """
         Extract all information from label image that is relevant
+        Results are cached on the image content so re-submitted artwork skips Tesseract. With NEAR_DUPLICATE_ENABLED
+        the same artwork re-exported or re-compressed is still read, but the extraction of the near duplicate is a hint:
+        a first pass that reads the same values ends the read early. It is never returned, labels that only differ
+        in small print (ABV, net contents, warning) hash alike
         
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or the upload itself (bytes, file-like object, PIL Image)
+            reuse_near_duplicates: Set to False to not use a near duplicate read before as a hint
             
         Returns:
-            Dictionary with extracted information
+            Dictionary with extracted information ('cache_hit' says if OCR was skipped,
+            'near_duplicate' has the Hamming distance when a near duplicate was used as a hint)
         """
+        cache_key = None
+        missing_file = self.is_path(image_path) and not os.path.exists(image_path) # reported by extract_text
+        if self.cache is not None and not missing_file:
+            image_bytes = self.image_bytes(image_path)
+            fingerprint = self.cache_fingerprint()
+            cache_key = self.cache.make_key(image_bytes, fingerprint)
+            if not isinstance(image_path, Image.Image):
+                image_path = image_bytes # already read, decode from memory from here on
+
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                cached['cache_hit'] = True
+                return cached
+
+        # The perceptual hash is taken on the preprocessed image, which the OCR passes then reuse
+        processed_img = image_hash = match = near_duplicate = None
+        if self.near_duplicates is not None and cache_key is not None:
+            try:
+                processed_img = self.preprocess_image(image_path)
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+            image_hash = dhash(processed_img)
+
+            match = self.near_duplicates.lookup(image_hash, fingerprint) if reuse_near_duplicates else None
+            near_duplicate = self.cache.get(match['key']) if match else None
+            if match and near_duplicate is None:
+                self.near_duplicates.remove(match['key']) # its extraction was evicted from the cache
+
+        # Preprocessing and orientation are their own stages, done before the timer so 'ocr' is only the passes
+        if processed_img is None and not missing_file:
+            try:
+                processed_img = self.preprocess_image(image_path)
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+
         # Extract text
-        ocr_result = self.extract_text(image_path)
+        with OCR_IN_FLIGHT.track(), timed('ocr'):
+            if self.strategy == 'regions':
+                ocr_result = self.extract_text_regions(image_path, processed_img)
+            else:
+                ocr_result = self.extract_text(image_path, processed_img, expected=near_duplicate)
         
         if not ocr_result['success']:
             return {
@@ -313,15 +652,24 @@ class OCRService:
             }
         
         text = ocr_result['raw_text']
+        regions = ocr_result.get('regions', {})
         
-        # Extract necessary fields
+        # Extract necessary fields in one scan (values read from their own region win over the whole text)
+        fields = self.extract_fields(text, ocr_result.get('word_spans'))
+        fields.update(regions)
         extracted_data = {
             'success': True,
             'raw_text': text,
-            'brand_name': self.extract_brand_name(text),
-            'alcohol_content': self.extract_alcohol_content(text),
-            'net_contents': self.extract_net_contents(text),
-            'has_government_warning': self.check_government_warning(text),
+            **fields,
+            'ocr_passes': ocr_result.get('ocr_passes', 0),
         }
+
+        if cache_key is not None:
+            self.cache.set(cache_key, extracted_data)
+            if image_hash is not None:
+                self.near_duplicates.add(image_hash, fingerprint, cache_key)
+        extracted_data['cache_hit'] = False
+        if near_duplicate is not None:
+            extracted_data['near_duplicate'] = {'distance': match['distance']}
         
-        return extracted_data
\ No newline at end of file
+        return extracted_data
@@ -0,0 +1,203 @@
+import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+from config import Config
+from app.services.layout import group_lines, text_with_spans
+from app.services.preprocessing import estimate_skew, deskew, upscale, binarize
+from app.services.metrics import OCR_IN_FLIGHT, timed
+
+def _same(img):
+    return img
+
+def _deskewed(img):
+    angle = estimate_skew(np.asarray(img))
+    if abs(angle) < Config.ORIENTATION_MIN_SKEW: # same threshold as the orientation stage
+        return None # already level, reading it again would repeat the first step
+    return deskew(img, angle)
+
+class AdaptiveOCR:
+    """
+    Cost aware OCR for one label (OCR_STRATEGY = 'adaptive'): read the label the cheapest way,
+    validate, and only escalate while some field failed or was read with low confidence
+
+    Every step reads the whole label again in a different way; its text is added to what was
+    read so far and the form is validated again against all of it
+    """
+
+    # step name -> (transform of the preprocessed image, Tesseract config), cheapest first
+    STEPS = {
+        'fast': (_same, r'--oem 3 --psm 6'),
+        'psm11': (_same, r'--oem 3 --psm 11'),  # scattered text
+        'upscale': (upscale, r'--oem 3 --psm 6'),  # small print
+        'binarize': (binarize, r'--oem 3 --psm 6'),  # low contrast/textured backgrounds
+        'deskew': (_deskewed, r'--oem 3 --psm 6'),  # photos taken at an angle
+    }
+
+    # fields whose validation does not depend on a single extracted value (no confidence to look at)
+    TEXT_FIELDS = ('product_type', 'government_warning')
+
+    def __init__(self, ocr_service, validator, steps=None, budgets_ms=None, total_budget_ms=None):
+        """
+        Args:
+            ocr_service: Shared OCRService instance (engine, preprocessing, pool and cache are reused)
+            validator: Shared LabelValidator instance
+            steps: Step names in the order they are tried (defaults to Config.OCR_LADDER_STEPS)
+            budgets_ms: Step name -> longest wait for that step (defaults to Config.OCR_LADDER_BUDGETS_MS)
+            total_budget_ms: No new step is started once a label has used this much time
+        """
+        self.ocr_service = ocr_service
+        self.validator = validator
+        self.steps = list(steps or Config.OCR_LADDER_STEPS)
+        unknown = [step for step in self.steps if step not in self.STEPS]
+        if unknown:
+            raise ValueError(f"Unknown OCR ladder steps {unknown} (choose from {', '.join(self.STEPS)})")
+        self.budgets_ms = budgets_ms or Config.OCR_LADDER_BUDGETS_MS
+        self.total_budget_ms = total_budget_ms or Config.OCR_LADDER_TOTAL_BUDGET_MS
+        self.confident_score = Config.OCR_CONFIDENT_SCORE
+
+    def _read(self, img, step):
+        """
+        Run one step on a preprocessed image (executed on the OCR pool)
+
+        Returns:
+            Dict with 'text' and 'spans', or 'skipped' when the step has nothing to change on this image
+        """
+        transform, config = self.STEPS[step]
+        img = transform(img)
+        if img is None:
+            return {'skipped': True}
+        lines = group_lines(self.ocr_service.engine.image_to_data(img, config=config))
+        text, spans = text_with_spans(lines)
+        return {'text': text, 'spans': spans}
+
+    def _weak_fields(self, results, ocr_data):
+        """
+        Fields worth another step: failed validation, or matched a value read with low confidence
+
+        Args:
+            results: validate_all output
+            ocr_data: Data it was validated against
+
+        Returns:
+            List of field names
+        """
+        weak = []
+        for field, check in results['field_checks'].items():
+            if not check['matched']:
+                weak.append(field)
+                continue
+            if field in self.TEXT_FIELDS:
+                continue
+            value = results['ocr_data'].get(field)
+            confidences = [c['confidence'] for c in ocr_data.get('candidates', {}).get(field, [])
+                           if c['value'] == value and 'confidence' in c]
+            if confidences and max(confidences) < self.confident_score:
+                weak.append(field)
+        return weak
+
+    def _combine(self, reads):
+        """Build extract_all_info style data from the reads so far (texts joined like passes)"""
+        texts, spans = [], []
+        offset = 0
+        for read in reads:
+            texts.append(read['text'])
+            spans.extend(dict(span, start=span['start'] + offset, end=span['end'] + offset)
+                         for span in read['spans'])
+            offset += len(read['text']) + 1
+        text = '\n'.join(texts)
+        return {
+            'success': True,
+            'raw_text': text,
+            **self.ocr_service.extract_fields(text, spans),
+            'ocr_passes': len(reads),
+        }
+
+    def run(self, image, form_data):
+        """
+        OCR and validate a label, escalating step by step
+
+        Args:
+            image: Path to the image file, or the upload itself (bytes, file-like object, PIL Image)
+            form_data: Dictionary with form inputs
+
+        Returns:
+            Dict with 'success', 'ocr_data' and 'results' (validate_all) or 'error', and 'steps'
+            (one entry per step tried: 'step', 'for_fields', 'ms', 'cache_hit', 'timed_out')
+        """
+        start = time.perf_counter()
+        ocr = self.ocr_service
+        if ocr.is_path(image) and not os.path.exists(image):
+            return {'success': False, 'error': f'Image file not found: {image}', 'steps': []}
+
+        # every step result is cached on its own, so a resubmitted label only re-runs what it needs
+        cache_prefix = None
+        if ocr.cache is not None:
+            image_bytes = ocr.image_bytes(image)
+            cache_prefix = ocr.cache.make_key(image_bytes, ocr.cache_fingerprint())
+            image = image_bytes
+
+        processed = None
+        reads, steps = [], []
+        ocr_data = results = None
+        weak = list(self.TEXT_FIELDS) + ['brand_name', 'alcohol_content', 'net_contents']
+
+        for step in self.steps:
+            budget_ms = self.budgets_ms.get(step, self.total_budget_ms)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if reads and elapsed_ms + budget_ms > self.total_budget_ms:
+                continue # not enough time left for this one, a cheaper step further on may still fit
+
+            step_start = time.perf_counter()
+            info = {'step': step, 'for_fields': weak, 'cache_hit': False, 'timed_out': False}
+            key = f'{cache_prefix}:{step}' if cache_prefix else None
+            read = ocr.cache.get(key, kind='ladder') if key else None
+
+            if read is not None:
+                info['cache_hit'] = True
+            else:
+                if processed is None:
+                    try:
+                        processed = ocr.preprocess_image(image)
+                    except Exception as e:
+                        return {'success': False, 'error': str(e), 'steps': steps}
+
+                future = ocr.submit(self._read, processed, step)
+                try:
+                    with OCR_IN_FLIGHT.track(), timed('ocr'):
+                        read = future.result(timeout=budget_ms / 1000)
+                except FutureTimeout:
+                    future.cancel() # a running Tesseract call still finishes in the background
+                    info['timed_out'] = True
+                except Exception as e:
+                    if not reads and step == self.steps[0]:
+                        return {'success': False, 'error': f'Tesseract OCR failed: {str(e)}', 'steps': steps}
+                    info['error'] = str(e)
+                if read is not None and key:
+                    ocr.cache.set(key, read)
+
+            info['ms'] = (time.perf_counter() - step_start) * 1000
+            steps.append(info)
+            if read is None:
+                continue
+            if read.get('skipped'):
+                info['skipped'] = True
+                continue
+
+            reads.append(read)
+            ocr_data = self._combine(reads)
+            results = self.validator.validate_all(form_data, ocr_data)
+            weak = self._weak_fields(results, ocr_data)
+            if not weak:
+                break
+
+        if ocr_data is None:
+            return {'success': False, 'error': 'No OCR step finished within its latency budget', 'steps': steps}
+
+        # results carry the data that was compared (chosen candidates), keep both in step
+        for data in (ocr_data, results['ocr_data']):
+            data['cache_hit'] = all(info['cache_hit'] for info in steps)
+            data['ladder'] = steps
+        return {'success': True, 'ocr_data': ocr_data, 'results': results, 'steps': steps}
@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from config import Config
+from app.services.ocr_engines import EngineUnavailable
+from app.services.preprocessing import estimate_skew, deskew
+from app.services.metrics import CACHE_LOOKUPS, timed
+
+logger = logging.getLogger(__name__)
+
+# clockwise rotation reported by OSD -> PIL transpose that applies it
+ROTATIONS = {
+    90: Image.Transpose.ROTATE_270,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
+
+class OrientationCorrector:
+    """
+    Puts labels upright before preprocessing: Tesseract OSD for sideways/upside down photos,
+    a projection profile for small tilts. Both run on a thumbnail, and the result is cached
+    per image hash so a label is only checked once
+    """
+
+    # Bump when detection changes so cached results are not reused
+    VERSION = 1
+
+    def __init__(self, engine, cache=None, mode=None, memory_entries=256, submit=None):
+        """
+        Args:
+            engine: OCR engine (see ocr_engines), used for OSD
+            submit: Runs a call on the OCR pool and returns its future (OCRService.submit). Labels are corrected
+                on request, batch and job threads, OSD goes through the pool so a per thread engine (tesserocr)
+                stays at one loaded Tesseract per pool thread. Without it OSD runs on the calling thread
+            cache: Optional OCRCache to keep results in (shared by workers)
+            mode: 'auto' (OSD + skew), 'skew' (projection profile only) or 'off' (defaults to Config.ORIENTATION_CHECK)
+            memory_entries: Results kept in memory when there is no cache
+        """
+        self.engine = engine
+        self.submit = submit
+        self.cache = cache
+        self.mode = mode or Config.ORIENTATION_CHECK
+        if self.mode not in ('auto', 'skew', 'off'):
+            raise ValueError(f"Unknown orientation check '{self.mode}' (choose from auto, skew, off)")
+        self.thumbnail_size = Config.ORIENTATION_THUMBNAIL
+        self.min_confidence = Config.ORIENTATION_MIN_CONFIDENCE
+        self.min_skew = Config.ORIENTATION_MIN_SKEW
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock() # labels are corrected on several threads at once
+        self._osd_available = self.mode == 'auto'
+
+    def fingerprint(self):
+        return f'orient{self.VERSION}:{self.mode}:{self.min_skew}'
+
+    def _cached(self, key):
+        if self.cache is not None:
+            return self.cache.get(key, kind='orientation')
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+        CACHE_LOOKUPS.inc(cache='orientation', result='miss' if result is None else 'memory')
+        return result
+
+    def _remember(self, key, result):
+        if self.cache is not None:
+            self.cache.set(key, result)
+            return
+        with self._lock:
+            self._memory[key] = result
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _rotation(self, thumbnail):
+        """Clockwise degrees that put the text upright according to OSD (0 when unsure or unavailable)"""
+        if not self._osd_available:
+            return 0
+        try:
+            if self.submit is not None:
+                osd = self.submit(self.engine.detect_orientation, thumbnail).result()
+            else:
+                osd = self.engine.detect_orientation(thumbnail)
+        except EngineUnavailable as e:
+            # osd.traineddata (or tesseract) is missing, no point asking again for every label
+            logger.warning(f"Orientation detection unavailable, only correcting skew: {e}")
+            self._osd_available = False
+            return 0
+        except Exception as e:
+            # failed on this label only (e.g. too few characters on a neck label), leave it as it is
+            logger.info(f"Orientation detection failed on this label, not rotating it: {e}")
+            return 0
+        if osd['rotate'] in ROTATIONS and osd['confidence'] >= self.min_confidence:
+            return osd['rotate']
+        return 0
+
+    @timed('orientation')
+    def detect(self, img):
+        """
+        Work out how a label has to be turned
+
+        Args:
+            img: PIL Image
+
+        Returns:
+            Dict with 'rotate' (clockwise multiple of 90) and 'skew' (degrees, see estimate_skew)
+        """
+        thumbnail = img.convert('L')
+        thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size))
+
+        rotate = self._rotation(thumbnail)
+        if rotate:
+            thumbnail = thumbnail.transpose(ROTATIONS[rotate])
+
+        skew = estimate_skew(np.asarray(thumbnail))
+        return {'rotate': rotate, 'skew': skew if abs(skew) >= self.min_skew else 0.0}
+
+    def correct(self, img, image_bytes=None):
+        """
+        Rotate a label upright, only when it is actually turned or tilted
+
+        Args:
+            img: PIL Image (size normalized, before preprocessing)
+            image_bytes: Raw image bytes to cache the result under (the pixels are hashed otherwise)
+
+        Returns:
+            PIL Image
+        """
+        if self.mode == 'off':
+            return img
+
+        digest = hashlib.sha256(image_bytes if image_bytes is not None else img.tobytes()).hexdigest()
+        key = f'{digest}:{self.fingerprint()}'
+        result = self._cached(key)
+        if result is None:
+            result = self.detect(img)
+            self._remember(key, result)
+
+        if result['rotate']:
+            img = img.transpose(ROTATIONS[result['rotate']])
+        if result['skew']:
+            img = deskew(img, result['skew'])
+        return img
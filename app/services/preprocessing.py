@@ -0,0 +1,332 @@
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+from config import Config
+
+def histogram(gray):
+    """256 bin histogram of a 0-255 array"""
+    return np.bincount(np.clip(gray, 0, 255).astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+
+def otsu_threshold(gray):
+    """Global threshold maximizing between-class variance"""
+    hist = histogram(gray)
+    levels = np.arange(256)
+    weight = np.cumsum(hist)
+    mean = np.cumsum(hist * levels)
+    total = weight[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mean[-1] * weight / total - mean) ** 2 / (weight * (total - weight))
+    if np.isnan(between).all():
+        return float(gray.min()) # single colour image (blank upload), nothing is below it
+    return float(np.nanargmax(between))
+
+def text_line_heights(gray):
+    """
+    Heights of the text lines found in the horizontal projection profile
+
+    Args:
+        gray: 2D array (0-255)
+
+    Returns:
+        Array of line heights in px
+    """
+    ink = gray < otsu_threshold(gray)
+    rows = ink.sum(axis=1) > max(2, gray.shape[1] // 200) # rows with a bit of ink on them
+
+    # lengths of consecutive runs of inked rows = text line heights
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+    heights = edges[1::2] - edges[::2]
+    return heights[heights >= 4] # ignore rules/noise
+
+def estimate_text_height(gray, min_lines=1):
+    """
+    Estimate typical text line height
+
+    Args:
+        gray: 2D array (0-255)
+        min_lines: Lines that must be found to trust the estimate
+
+    Returns:
+        Median line height in px, or None if there weren't enough lines
+    """
+    heights = text_line_heights(gray)
+    # a line taller than a quarter of the image is a photo/background, not text
+    heights = heights[heights < gray.shape[0] / 4]
+    if len(heights) < min_lines:
+        return None
+    return float(np.median(heights))
+
+def normalize_size(img, max_pixels=None, target_text_height=None, min_long_side=None):
+    """
+    Shrink large photos before any other processing (OCR time grows with pixel count)
+
+    JPEGs are decoded straight at a reduced scale with draft(), then the image is
+    downsampled to the pixel budget, or further while the text stays at least
+    target_text_height tall. Images under the budget are returned untouched.
+
+    Args:
+        img: PIL Image that has not been loaded yet (so draft() can still apply)
+        max_pixels: Pixel budget (defaults to Config.OCR_MAX_PIXELS)
+        target_text_height: Smallest text line height in px to keep (defaults to Config.OCR_DOWNSCALE_TEXT_HEIGHT)
+        min_long_side: Never shrink the long side below this (defaults to Config.OCR_MIN_LONG_SIDE)
+
+    Returns:
+        PIL Image
+    """
+    max_pixels = max_pixels or Config.OCR_MAX_PIXELS
+    target_text_height = target_text_height or Config.OCR_DOWNSCALE_TEXT_HEIGHT
+    min_long_side = min_long_side or Config.OCR_MIN_LONG_SIDE
+
+    width, height = img.size
+    if width * height <= max_pixels:
+        return img
+
+    budget_scale = (max_pixels / (width * height)) ** 0.5
+    if img.format == 'JPEG':
+        # decoder picks the smallest 1/2, 1/4 or 1/8 scale that is still at least this big
+        img.draft('RGB', (int(width * budget_scale), int(height * budget_scale)))
+
+    img = img.convert('RGB')
+    width, height = img.size
+    scale = min(1.0, (max_pixels / (width * height)) ** 0.5)
+
+    # Go further down if the text is big enough to take it
+    line_height = estimate_text_height(np.asarray(img.convert('L')), min_lines=3)
+    if line_height:
+        scale = min(scale, target_text_height / line_height)
+    scale = max(scale, min(1.0, min_long_side / max(width, height)))
+
+    if scale < 1.0:
+        new_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        img = img.resize(new_size, Image.LANCZOS, reducing_gap=2.0)
+    return img
+
+def estimate_skew(gray, max_angle=15.0, thumbnail_width=600):
+    """
+    Estimate how far text lines are tilted with a projection profile search
+
+    Ink pixels of a thumbnail are projected onto the vertical axis for each candidate
+    angle; when the angle matches the text, lines collapse into sharp peaks (largest
+    sum of squared bin counts). A coarse 1 degree search is refined to 0.1 degree
+
+    Args:
+        gray: 2D array (0-255)
+        max_angle: Largest tilt looked for, in degrees either way
+        thumbnail_width: Width the image is shrunk to first (keeps this cheap)
+
+    Returns:
+        Angle in degrees (positive = text rises to the right), 0.0 if there is too little text
+    """
+    if gray.shape[1] > thumbnail_width:
+        step = gray.shape[1] // thumbnail_width + 1
+        gray = gray[::step, ::step]
+    ys, xs = np.nonzero(gray < otsu_threshold(gray))
+    if len(ys) < 100:
+        return 0.0
+    ys = ys.astype(np.float64)
+    xs = xs.astype(np.float64)
+
+    def score(angle):
+        projected = ys + xs * np.tan(np.radians(angle))
+        counts = np.bincount((projected - projected.min()).astype(np.int64))
+        return float(np.dot(counts, counts))
+
+    coarse = max(np.arange(-max_angle, max_angle + 1.0, 1.0), key=score)
+    fine = max(np.arange(coarse - 1.0, coarse + 1.05, 0.1), key=score)
+    return round(float(fine), 1) or 0.0 # no -0.0
+
+def deskew(img, angle):
+    """
+    Rotate an image so text tilted by `angle` (see estimate_skew) is level again
+
+    Args:
+        img: PIL Image
+        angle: Tilt in degrees
+
+    Returns:
+        PIL Image (same image if there is nothing to fix)
+    """
+    if abs(angle) < 0.5:
+        return img
+    return img.rotate(-angle, resample=Image.BILINEAR, expand=True, fillcolor='white') # bicubic is ~3x slower here
+
+def upscale(img, factor=2.0):
+    """Enlarge a preprocessed image (small text reads better a bit bigger)"""
+    return img.resize((int(img.width * factor), int(img.height * factor)), Image.LANCZOS)
+
+def binarize(img):
+    """Otsu black and white version of a grayscale image"""
+    gray = np.asarray(img.convert('L'))
+    return Image.fromarray(np.where(gray < otsu_threshold(gray), 0, 255).astype(np.uint8))
+
+class PILPreprocessor:
+    """Original preprocessing chain built from PIL filters (each step makes a new full size image)"""
+
+    name = 'pil'
+
+    def fingerprint(self):
+        return self.name
+
+    def process(self, img):
+        """
+        Preprocess image to improve OCR accuracy
+
+        Args:
+            img: PIL Image in RGB mode
+
+        Returns:
+            PIL Image object (preprocessed)
+        """
+        # convert to grayscale (improves OCR)
+        img = img.convert('L')
+
+        # Increase contrast to improve
+        enhancer = ImageEnhance.Contrast(img)
+        img = enhancer.enhance(2.0)
+
+        # Sharpen image
+        img = img.filter(ImageFilter.SHARPEN)
+
+        # Resize image if too small (should be around 300px for Tesseract to work best with)
+        width, height = img.size
+        if width < 300:
+            scale_factor = 300 / width
+            new_size = (int(width * scale_factor), int(height * scale_factor))
+            img = img.resize(new_size, Image.LANCZOS)
+
+        return img
+
+class NumpyPreprocessor:
+    """
+    Preprocessing on a single float32 NumPy array, modified in place where possible
+
+    Steps: grayscale -> rescale to target text height -> contrast stretch -> sharpen -> binarize
+    """
+
+    name = 'numpy'
+
+    # ITU-R 601 luma weights (same ones PIL uses for convert('L'))
+    LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+    def __init__(self, binarize=None, target_text_height=None):
+        """
+        Args:
+            binarize: 'otsu', 'sauvola' or 'none' (defaults to Config.PREPROCESS_BINARIZE)
+            target_text_height: Text line height in px to rescale to (defaults to Config.PREPROCESS_TARGET_TEXT_HEIGHT)
+        """
+        self.binarize = binarize or Config.PREPROCESS_BINARIZE
+        self.target_text_height = target_text_height or Config.PREPROCESS_TARGET_TEXT_HEIGHT
+
+    def fingerprint(self):
+        return f'{self.name}:{self.binarize}:{self.target_text_height}'
+
+    def process(self, img):
+        """
+        Preprocess image to improve OCR accuracy
+
+        Args:
+            img: PIL Image in RGB mode
+
+        Returns:
+            PIL Image object (preprocessed, mode 'L')
+        """
+        gray = np.asarray(img, dtype=np.float32) @ self.LUMA # only full size copy we make
+
+        gray = self._rescale(gray, img.info.get('dpi'))
+        self._stretch_contrast(gray)
+        gray = self._sharpen(gray)
+
+        if self.binarize == 'otsu':
+            self._threshold(gray, otsu_threshold(gray))
+        elif self.binarize == 'sauvola':
+            self._threshold(gray, self._sauvola_threshold(gray))
+
+        np.clip(gray, 0, 255, out=gray)
+        return Image.fromarray(gray.astype(np.uint8))
+
+    def _rescale(self, gray, dpi):
+        """Scale so text is about as tall as it would be in a 300 DPI scan"""
+        height = estimate_text_height(gray)
+        if height:
+            scale = self.target_text_height / height
+        elif dpi and dpi[0]:
+            scale = 300 / float(dpi[0])
+        else:
+            scale = 300 / gray.shape[1] if gray.shape[1] < 300 else 1.0 # same rule as the PIL chain
+
+        scale = min(max(scale, Config.PREPROCESS_MIN_SCALE), Config.PREPROCESS_MAX_SCALE)
+        if 0.8 <= scale <= 1.25: # close enough, resampling would only cost time
+            return gray
+
+        new_size = (max(1, int(gray.shape[1] * scale)), max(1, int(gray.shape[0] * scale)))
+        resized = Image.fromarray(gray).resize(new_size, Image.LANCZOS if scale > 1 else Image.BILINEAR)
+        return np.asarray(resized, dtype=np.float32).copy()
+
+    @staticmethod
+    def _stretch_contrast(gray, low=0.01, high=0.99):
+        """Stretch the low..high percentile range to 0..255 (in place, percentiles read off the histogram)"""
+        cdf = np.cumsum(histogram(gray))
+        cdf /= cdf[-1]
+        lo, hi = np.searchsorted(cdf, low), np.searchsorted(cdf, high)
+        if hi - lo < 1:
+            return
+        gray -= lo
+        gray *= 255.0 / (hi - lo)
+        np.clip(gray, 0, 255, out=gray)
+
+    @staticmethod
+    def _sharpen(gray):
+        """Same 3x3 kernel as ImageFilter.SHARPEN: (34 * center - 2 * box3x3) / 16"""
+        padded = np.pad(gray, 1, mode='edge')
+        box = padded[:-2] + padded[1:-1] + padded[2:] # vertical sums
+        box = box[:, :-2] + box[:, 1:-1] + box[:, 2:] # then horizontal
+        box *= -2.0 / 16
+        gray *= 34.0 / 16
+        gray += box
+        return gray
+
+    @staticmethod
+    def _sauvola_threshold(gray, window=25, k=0.2, r=128.0):
+        """Local threshold from mean and std in a window around each pixel (integral images)"""
+        half = window // 2
+        padded = np.pad(gray.astype(np.float64), ((half + 1, half), (half + 1, half)), mode='edge')
+        padded[0, :] = 0
+        padded[:, 0] = 0
+        integral = padded.cumsum(0).cumsum(1)
+        integral_sq = (padded ** 2).cumsum(0).cumsum(1)
+
+        h, w = gray.shape
+        def window_sum(table):
+            return (table[window:window + h, window:window + w] - table[:h, window:window + w]
+                    - table[window:window + h, :w] + table[:h, :w])
+
+        area = float(window * window)
+        mean = window_sum(integral) / area
+        std = np.sqrt(np.maximum(window_sum(integral_sq) / area - mean ** 2, 0))
+        return mean * (1 + k * (std / r - 1))
+
+    @staticmethod
+    def _threshold(gray, threshold):
+        """Turn into pure black text on white (in place)"""
+        ink = gray < threshold
+        gray.fill(255)
+        gray[ink] = 0
+
+PREPROCESSORS = {
+    PILPreprocessor.name: PILPreprocessor,
+    NumpyPreprocessor.name: NumpyPreprocessor,
+}
+
+def get_preprocessor(name=None):
+    """
+    Build the preprocessing engine selected in Config.PREPROCESS_ENGINE
+
+    Args:
+        name: Engine name ('pil' or 'numpy'), defaults to Config.PREPROCESS_ENGINE
+
+    Returns:
+        Preprocessor instance
+    """
+    name = name or Config.PREPROCESS_ENGINE
+    if name not in PREPROCESSORS:
+        raise ValueError(f"Unknown preprocessing engine '{name}' (choose from {', '.join(PREPROCESSORS)})")
+    return PREPROCESSORS[name]()
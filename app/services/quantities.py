@@ -0,0 +1,103 @@
+import re
+
+from config import Config
+
+# Volume units found on labels: canonical name, how it is spelled (regex, longest first) and mL per unit.
+# US customary units are the fluid ones (ounces on alcohol labels are always fluid ounces)
+UNITS = (
+    ('mL', r'milliliters?|millilitres?|ml', 1.0),
+    ('cL', r'centiliters?|centilitres?|cl', 10.0),
+    ('L', r'liters?|litres?|ltr|l', 1000.0),
+    ('fl oz', r'fl\.?\s*oz|fluid\s*ounces?|oz', 29.5735295625),
+    ('pint', r'pints?|pt', 473.176473),
+    ('quart', r'quarts?|qt', 946.352946),
+    ('gallon', r'gallons?|gal', 3785.411784),
+)
+UNIT_PATTERN = '|'.join(spelling for _, spelling, _ in UNITS)
+
+# Every spelling in one alternation, the group that matched names the unit (see unit_info)
+UNIT_NAMES = re.compile('|'.join(f'(?P<u{index}>{spelling})' for index, (_, spelling, _) in enumerate(UNITS)),
+                        re.IGNORECASE)
+
+# "750 mL", "1.75L", "75 cl", ".5 L", "1,5 l" (decimal comma), "12 FL. OZ."
+QUANTITY = re.compile(rf'(?P<number>\d+(?:[.,]\d+)?|[.,]\d+)\s*(?P<unit>{UNIT_PATTERN})\.?(?![a-z])', re.IGNORECASE)
+
+# Authorized container sizes in mL for distilled spirits (27 CFR 5.203) and wine (27 CFR 4.72, which
+# also allows whole liters from 4 L up). Malt beverages have none, so a size outside
+# these is reported, not failed
+STANDARDS_OF_FILL = frozenset([
+    50, 100, 180, 187, 200, 250, 300, 330, 331, 350, 355, 360, 365, 375, 473, 475, 500, 550, 568, 570,
+    600, 620, 700, 710, 720, 750, 900, 945, 1000, 1500, 1750, 1800, 2000, 2250, 3000, 3750,
+])
+
+def unit_info(spelling):
+    """
+    Canonical unit of a unit as written on a label
+
+    Args:
+        spelling: e.g. 'ml', 'Litres', 'fl. oz'
+
+    Returns:
+        (canonical name, mL per unit, index in UNITS), or None for an unknown unit
+    """
+    match = UNIT_NAMES.fullmatch(spelling.strip())
+    if not match:
+        return None
+    index = int(match.lastgroup[1:])
+    name, _, ml = UNITS[index]
+    return name, ml, index
+
+def parse_number(text):
+    """Number as printed on a label: a decimal comma counts as a decimal point ("1,5"), unless it is a thousands separator ("1,000")"""
+    if ',' in text and not re.fullmatch(r'\d{1,3}(?:,\d{3})+', text):
+        text = text.replace(',', '.')
+    return float(text.replace(',', ''))
+
+def parse_volume(text):
+    """
+    First volume in a text, converted to mL
+
+    Args:
+        text: Form input or OCR value ("750 mL", "75cl", "25.4 fl oz")
+
+    Returns:
+        Dict with 'value', 'unit' (canonical name) and 'ml', or None when there is no number with a unit
+    """
+    if not text:
+        return None
+    match = QUANTITY.search(text)
+    if not match:
+        return None
+    name, ml, _ = unit_info(match.group('unit'))
+    value = parse_number(match.group('number'))
+    return {'value': value, 'unit': name, 'ml': value * ml}
+
+def same_volume(a_ml, b_ml, tolerance=None):
+    """
+    Check two volumes are the same within a relative tolerance (unit conversions and label rounding,
+    e.g. 12 fl oz = 354.9 mL printed as 355 mL)
+
+    Args:
+        a_ml, b_ml: Volumes in mL
+        tolerance: Largest relative difference (defaults to Config.NET_CONTENTS_TOLERANCE)
+    """
+    tolerance = tolerance if tolerance is not None else Config.NET_CONTENTS_TOLERANCE
+    return abs(a_ml - b_ml) <= tolerance * max(a_ml, b_ml)
+
+def standard_of_fill(ml, tolerance=None):
+    """
+    Standard of fill a volume is (25.4 fl oz counts as 750 mL)
+
+    Returns:
+        The standard size in mL, or None
+    """
+    closest = min(STANDARDS_OF_FILL, key=lambda size: abs(size - ml))
+    if ml >= 4000: # wine: 4 L, 5 L, ...
+        closest = min(closest, round(ml / 1000) * 1000, key=lambda size: abs(size - ml))
+    return closest if same_volume(ml, closest, tolerance) else None
+
+def format_ml(ml):
+    """Volume for messages: mL under a liter, L from there ('750 mL', '1.75 L')"""
+    if ml >= 1000:
+        return f'{ml / 1000:g} L'
+    return f'{round(ml, 1):g} mL'
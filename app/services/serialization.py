@@ -0,0 +1,74 @@
+import gzip
+import json
+
+from app.services.verification import VerificationService
+
+try:
+    import orjson
+except ImportError: # optional, a faster drop-in for json.dumps
+    orjson = None
+
+# Optional parts of the compact result (?include=...), left out unless asked for
+INCLUDE_OPTIONS = ('messages', 'raw_text', 'candidates', 'panels', 'ladder')
+
+def compact_results(results, form_data, fields=None, include=()):
+    """
+    Compact JSON schema of a validate_all (or verify_set) result for machine clients
+
+    Args:
+        results: validate_all style dict
+        form_data: Form inputs the label was checked against
+        fields: Field checks to return (None = all)
+        include: Extra parts from INCLUDE_OPTIONS
+
+    Returns:
+        Dict with 'match', per field 'fields' ('ok', 'expected', 'found', 'panel' for label sets,
+        'missing' clauses and 'similarity' for the government warning)
+        and 'ocr' (passes, cache hit), plus whatever was included
+    """
+    ocr_data = results['ocr_data']
+    checks = {}
+    for field, check in results['field_checks'].items():
+        if fields is not None and field not in fields:
+            continue
+        entry = {'ok': check['matched']}
+        if form_data.get(field):
+            entry['expected'] = form_data[field]
+        if field == 'government_warning': # a check of the statutory text, not a single value
+            warning = ocr_data.get('government_warning') or {}
+            entry['found'] = warning.get('found', False)
+            entry['missing'] = check.get('missing', [])
+            entry['similarity'] = warning.get('similarity', 0.0)
+        elif field in VerificationService.FIELD_VALUES: # product type is matched in the raw text, no single value
+            entry['found'] = ocr_data.get(VerificationService.FIELD_VALUES[field])
+        if 'panel' in check:
+            entry['panel'] = check['panel']
+        if 'messages' in include:
+            entry['message'] = check['message']
+        checks[field] = entry
+
+    compact = {
+        'match': results['overall_match'],
+        'fields': checks,
+        'ocr': {'passes': ocr_data.get('ocr_passes', 0), 'cache_hit': bool(ocr_data.get('cache_hit'))},
+    }
+    if 'raw_text' in include:
+        compact['raw_text'] = ocr_data.get('raw_text', '')
+    if 'candidates' in include:
+        compact['candidates'] = {field: candidates for field, candidates in ocr_data.get('candidates', {}).items()
+                                 if fields is None or field in fields}
+    if 'panels' in include and 'panels' in results:
+        compact['panels'] = results['panels']
+    if 'ladder' in include and 'ladder' in ocr_data:
+        compact['ocr']['ladder'] = ocr_data['ladder']
+    return compact
+
+def dumps(payload):
+    """Serialize to compact JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def gzip_body(body, level=5):
+    """Gzip a response body (level 5: most of the size win of 9 at a fraction of the CPU)"""
+    return gzip.compress(body, compresslevel=level)
@@ -1,13 +1,26 @@
-from difflib import SequenceMatcher
-import re
 from config import Config
+from app.services.matching import SCORERS, KnownBrandIndex, best_window, similarity as text_similarity
+from app.services.government_warning import CLAUSES, CLAUSE_NAMES
+from app.services.metrics import timed
+from app.services.quantities import format_ml, parse_volume, same_volume, standard_of_fill
 
 class LabelValidator:
     """Service for validating form data against the data extracted from OCR"""
     
-    def __init__(self):
+    def __init__(self, known_brands=None):
+        """
+        Args:
+            known_brands: Optional KnownBrandIndex (loaded from Config.KNOWN_BRANDS_PATH when set)
+        """
         self.similarity_threshold = Config.SIMILARITY_THRESHOLD # stored in config file for easy changing
+        self.scorer = SCORERS[Config.BRAND_MATCH_SCORER]
+        if known_brands is None and Config.KNOWN_BRANDS_PATH:
+            known_brands = KnownBrandIndex.load(Config.KNOWN_BRANDS_PATH, self.scorer)
+        self.known_brands = known_brands
+        self.known_brand_threshold = Config.KNOWN_BRAND_THRESHOLD
         self.abv_tolerance = Config.ABV_TOLERANCE
+        self.net_contents_tolerance = Config.NET_CONTENTS_TOLERANCE
+        self.min_confidence = Config.OCR_MIN_CONFIDENCE
 
     def calculate_similarity(self, str1, str2):
         """
@@ -22,15 +35,92 @@ class LabelValidator:
         """
         if not str1 or not str2: # if either is empty 
             return 0.0
+
+        # Banded edit distance (or Jaro-Winkler, see config) on the normalized text and on the
+        # sorted set of words, whichever is higher (word order and repeats from OCR passes don't count)
+        return text_similarity(str1, str2, self.scorer)
         
-        # Normalize both strings (lowercase + strip whitespace)
-        s1 = str1.lower().strip()
-        s2 = str2.lower().strip()
+    def candidate_values(self, field, ocr_data):
+        """
+        Values OCR found for a field, the extracted one first, then the other confident candidates.
+        Values only read under OCR_MIN_CONFIDENCE are left out (the extracted value included), so they
+        can't win just because they happen to match the form
+        
+        Args:
+            field: 'brand_name', 'alcohol_content' or 'net_contents'
+            ocr_data: OCR extracted data dictionary
+            
+        Returns:
+            List of values (no duplicates)
+        """
+        candidates = ocr_data.get('candidates', {}).get(field, [])
+        values = []
+        extracted = ocr_data.get(field)
+        if extracted is not None:
+            # confidences of the candidates it was picked from (none for region reads or cached results without them)
+            confidences = [c['confidence'] for c in candidates if c['value'] == extracted and 'confidence' in c]
+            if not confidences or max(confidences) >= self.min_confidence:
+                values.append(extracted)
+        # candidates are ranked best first by OCRService
+        for candidate in candidates:
+            if candidate.get('confidence', self.min_confidence) < self.min_confidence:
+                continue
+            if candidate['value'] not in values:
+                values.append(candidate['value'])
+        return values
 
-        # Using Gestalt Pattern Matching (longest matching seq between two strings)
-        # returns ratio based on how much it matches
-        return SequenceMatcher(None, s1, s2).ratio() 
+    def choose_candidates(self, form_data, ocr_data):
+        """
+        Pick, for each field, the OCR candidate that matches the form (so a stray value read by
+        one pass does not hide the real one). Fields with no matching candidate keep the extracted value,
+        or the best confident candidate when the extracted value was read under OCR_MIN_CONFIDENCE
         
+        Args:
+            form_data: Dictionary with form inputs
+            ocr_data: OCR extracted data dictionary
+            
+        Returns:
+            Copy of ocr_data with the chosen values
+        """
+        chosen = dict(ocr_data)
+        validators = {
+            'brand_name': self.validate_brand_name,
+            'alcohol_content': self.validate_alcohol_content,
+            'net_contents': self.validate_net_contents,
+        }
+        for field, validate in validators.items():
+            if not form_data.get(field):
+                continue
+            values = self.candidate_values(field, ocr_data)
+            for value in values:
+                if validate(form_data[field], {**ocr_data, field: value})['matched']:
+                    chosen[field] = value
+                    break
+            else:
+                if values: # the extracted value may have been left out for its confidence
+                    chosen[field] = values[0]
+        return chosen
+
+    def known_brand(self, name):
+        """
+        Registered brand a name is a (mis)reading of (needs KNOWN_BRANDS_PATH)
+        
+        Args:
+            name: Brand name as read by OCR
+            
+        Returns:
+            Registered brand name or None
+        """
+        if not self.known_brands or not name:
+            return None
+        matches = self.known_brands.lookup(name, cutoff=self.known_brand_threshold, limit=2)
+        if not matches:
+            return None
+        # a read halfway between two registered brands is not either of them
+        if len(matches) > 1 and matches[0][1] - matches[1][1] < 0.05:
+            return None
+        return matches[0][0]
+
     def validate_brand_name(self, form_brand, ocr_data):
         """
         Validate brand name from form against data extracted from OCR 
@@ -45,13 +135,14 @@ class LabelValidator:
         ocr_brand = ocr_data.get('brand_name')
 
         if not ocr_brand:
-        # Find brand name in raw text
+        # Find brand name in raw text (closest run of words, so OCR errors inside the name are fine)
             raw_text = ocr_data.get('raw_text', '')
+            score, window = best_window(form_brand or '', raw_text, self.scorer, self.similarity_threshold)
 
-            if form_brand.lower() in raw_text.lower():
+            if score >= self.similarity_threshold:
                 return {
                     'matched': True,
-                    'message': f"Brand name '{form_brand}' found in label text"
+                    'message': f"Brand name '{form_brand}' found in label text as '{window}' ({score*100:.0f}% similar)"
                 }
             else:
                 return {
@@ -67,6 +158,14 @@ class LabelValidator:
                 'matched': True,
                 'message': f"Brand name matches: '{form_brand}' ≈ '{ocr_brand}' ({similarity*100:.0f}% similar)"
             }
+
+        # A misread registered brand: snap the OCR text to the closest registered name
+        known = self.known_brand(ocr_brand)
+        if known and self.calculate_similarity(form_brand, known) >= self.similarity_threshold:
+            return {
+                'matched': True,
+                'message': f"Brand name matches registered brand '{known}' (label read as '{ocr_brand}')"
+            }
         else:
             return {
                 'matched': False,
@@ -152,7 +251,8 @@ class LabelValidator:
             }
     def validate_net_contents(self, form_contents, ocr_data):
         """
-        Validate net contents from form against data extracted from OCR 
+        Validate net contents from form against data extracted from OCR, as volumes
+        ("75 cl" matches "750 mL", "25.4 fl oz" matches "750 mL" within NET_CONTENTS_TOLERANCE)
         
         Args:
             form_contents: Net contents from form 
@@ -168,44 +268,79 @@ class LabelValidator:
                 'matched': False,
                 'message': f"Could not find net contents on label. Expected '{form_contents}'"
             }
-        
-        # Normalize and compare
-        form_normalized = re.sub(r'\s+', '', form_contents.lower())
-        ocr_normalized = re.sub(r'\s+', '', ocr_contents.lower())
-        
-        if form_normalized in ocr_normalized or ocr_normalized in form_normalized:
+
+        ocr_volume = parse_volume(ocr_contents)
+        if ocr_volume is None:
+            return {
+                'matched': False,
+                'message': f"Could not read a volume from the label's net contents '{ocr_contents}'"
+            }
+
+        form_volume = parse_volume(form_contents)
+        if form_volume is None:
+            # a bare number on the form is taken in the label's unit ("750" for "750 mL")
+            try:
+                form_ml = float(str(form_contents).strip()) * ocr_volume['ml'] / ocr_volume['value']
+            except (ValueError, TypeError, ZeroDivisionError):
+                return {
+                    'matched': False,
+                    'message': f"Invalid net contents in form: '{form_contents}'"
+                }
+        else:
+            form_ml = form_volume['ml']
+
+        # Not failed for it (malt beverages have no standards of fill), only pointed out
+        note = ''
+        if standard_of_fill(ocr_volume['ml'], self.net_contents_tolerance) is None:
+            note = f" ({format_ml(ocr_volume['ml'])} is not a standard of fill size)"
+
+        if same_volume(form_ml, ocr_volume['ml'], self.net_contents_tolerance):
             return {
                 'matched': True,
-                'message': f"Net contents matches: '{form_contents}' ≈ '{ocr_contents}'"
+                'message': f"Net contents matches: '{form_contents}' ≈ '{ocr_contents}' ({format_ml(ocr_volume['ml'])}){note}"
             }
         else:
             return {
                 'matched': False,
-                'message': f"Net contents mismatch: Form says '{form_contents}', label shows '{ocr_contents}'"
+                'message': f"Net contents mismatch: Form says '{form_contents}' ({format_ml(form_ml)}), "
+                           f"label shows '{ocr_contents}' ({format_ml(ocr_volume['ml'])}){note}"
             }
         
     def validate_government_warning(self, ocr_data):
         """
-        Check if government warning is present on label
+        Check that the full government warning statement (27 CFR 16.21) is on the label
         
         Args:
             ocr_data: OCR extracted data dictionary
             
         Returns:
-            Dict with 'matched' (bool) and 'message' (str)
+            Dict with 'matched' (bool), 'message' (str) and the 'missing' clauses
         """
-        has_warning = ocr_data.get('has_government_warning', False)
-        if has_warning:
+        warning = ocr_data.get('government_warning') or {'complete': False, 'found': False,
+                                                         'missing': [name for name, _ in CLAUSES], 'similarity': 0.0}
+        if warning['complete']:
             return {
                 'matched': True,
-                'message': 'Government warning statement found on label'
+                'message': f"Government warning statement found on label "
+                           f"({warning['similarity']:.0%} match with the statutory text)",
+                'missing': [],
+            }
+        elif warning['found']:
+            missing = ', '.join(CLAUSE_NAMES[name] for name in warning['missing'])
+            return {
+                'matched': False,
+                'message': f"Government warning statement incomplete, missing or illegible: {missing} "
+                           "(the full text is required by TTB regulations)",
+                'missing': warning['missing'],
             }
         else:
             return {
                 'matched': False,
-                'message': 'Government warning statement not detected on label (required by TTB regulations)'
+                'message': 'Government warning statement not detected on label (required by TTB regulations)',
+                'missing': warning['missing'],
             }
         
+    @timed('validation')
     def validate_all(self, form_data, ocr_data):
         """
         Validate all fields from form against data extracted from OCR 
@@ -217,6 +352,9 @@ class LabelValidator:
         Returns:
             Dictionary with validation results
         """
+        # Compare against the candidate that fits the form best
+        ocr_data = self.choose_candidates(form_data, ocr_data)
+
         # Validate each field by calling each val method
         results = {
             'brand_name': self.validate_brand_name(form_data.get('brand_name'), ocr_data),
@@ -0,0 +1,251 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from app.services.ocr_strategy import AdaptiveOCR
+from app.services.metrics import FIELD_CHECKS
+
+class VerificationService:
+    """Service that runs the OCR + validation pipeline for one label or a whole batch"""
+
+    def __init__(self, ocr_service, validator, max_workers=None):
+        """
+        Args:
+            ocr_service: Shared OCRService instance
+            validator: Shared LabelValidator instance
+            max_workers: Size of the batch pool (defaults to Config.BATCH_MAX_WORKERS)
+        """
+        self.ocr_service = ocr_service
+        self.validator = validator
+        self.max_workers = max_workers or Config.BATCH_MAX_WORKERS
+        self._executor = None
+        self._panel_executor = None
+        self._recent_ms = deque(maxlen=Config.READINESS_LATENCY_WINDOW) # latest verifications, for readiness
+        # adaptive OCR needs the form to know when to stop, so it runs here rather than in OCRService
+        self.adaptive = AdaptiveOCR(ocr_service, validator) if ocr_service.strategy == 'adaptive' else None
+
+    @property
+    def executor(self):
+        """Batch pool, only started the first time a batch comes in"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='verify-batch')
+        return self._executor
+
+    @property
+    def panel_executor(self):
+        """Pool for the panels of one label set (separate from the batch pool so the two never wait on each other)"""
+        if self._panel_executor is None:
+            self._panel_executor = ThreadPoolExecutor(max_workers=Config.LABEL_SET_MAX_IMAGES,
+                                                      thread_name_prefix='verify-panel')
+        return self._panel_executor
+
+    def recent_latency(self):
+        """Mean latency of the latest verifications in this worker (READINESS_LATENCY_WINDOW of them)"""
+        recent = list(self._recent_ms)
+        return {
+            'samples': len(recent),
+            'mean_ms': sum(recent) / len(recent) if recent else None,
+        }
+
+    def verify(self, image, form_data):
+        """
+        OCR a label image and validate it against the form data
+
+        Args:
+            image: Path to the image file, or the upload itself (bytes, file-like object, PIL Image)
+            form_data: Dictionary with form inputs
+
+        Returns:
+            Dict with 'success', 'results' (from validate_all) or 'error', and 'elapsed_ms'
+        """
+        return self._record(self._verify(image, form_data))
+
+    def _record(self, verification):
+        """
+        Add the final per field outcome of a verification to the metrics (once per label, not per panel or retry)
+        and remember its latency
+        """
+        self._recent_ms.append(verification['elapsed_ms'])
+        if verification['success']:
+            for field, check in verification['results']['field_checks'].items():
+                FIELD_CHECKS.inc(field=field, result='match' if check['matched'] else 'mismatch')
+        return verification
+
+    def _verify(self, image, form_data):
+        """verify without counting the outcome (panels of a label set are counted once merged)"""
+        start = time.perf_counter()
+
+        if self.adaptive is not None:
+            outcome = self.adaptive.run(image, form_data)
+            if not outcome['success']:
+                return {
+                    'success': False,
+                    'error': outcome['error'],
+                    'elapsed_ms': (time.perf_counter() - start) * 1000
+                }
+            return {
+                'success': True,
+                'results': outcome['results'],
+                'elapsed_ms': (time.perf_counter() - start) * 1000
+            }
+
+        ocr_data = self.ocr_service.extract_all_info(image)
+
+        if not ocr_data.get('success'):
+            return {
+                'success': False,
+                'error': ocr_data.get('error', 'Unknown error'),
+                'elapsed_ms': (time.perf_counter() - start) * 1000
+            }
+
+        results = self.validator.validate_all(form_data, ocr_data)
+
+        return {
+            'success': True,
+            'results': results,
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        }
+
+    def verify_batch(self, items):
+        """
+        Verify many labels at once, fanned out across the batch pool
+
+        Args:
+            items: List of (image, form_data) tuples
+
+        Returns:
+            Dict with per-item 'items' (same order as input) and aggregate 'timing'
+        """
+        start = time.perf_counter()
+
+        futures = [self.executor.submit(self.verify, image, form_data)
+                   for image, form_data in items]
+
+        results = []
+        for index, future in enumerate(futures):
+            try:
+                result = future.result()
+            except Exception as e: # one bad label should not fail the whole batch
+                result = {'success': False, 'error': str(e), 'elapsed_ms': 0.0}
+            result['index'] = index
+            results.append(result)
+
+        wall_ms = (time.perf_counter() - start) * 1000
+        item_ms = [r['elapsed_ms'] for r in results]
+
+        return {
+            'items': results,
+            'timing': {
+                'items': len(results),
+                'workers': self.max_workers,
+                'wall_ms': wall_ms,
+                'total_item_ms': sum(item_ms),
+                'mean_item_ms': sum(item_ms) / len(item_ms) if item_ms else 0.0,
+                'items_per_second': len(results) / (wall_ms / 1000) if wall_ms else 0.0,
+            }
+        }
+
+    def verify_set(self, panels, form_data):
+        """
+        Verify one product from several label images (front, back, neck...), OCR'd concurrently.
+        A field passes when it matches on any panel
+
+        Args:
+            panels: List of (panel name, image) tuples
+            form_data: Dictionary with form inputs
+
+        Returns:
+            Dict like verify, 'results' also has 'provenance' (field -> panel it was checked on)
+            and 'panels' (per panel status and timing)
+        """
+        start = time.perf_counter()
+
+        futures = [self.panel_executor.submit(self._verify, image, form_data) for _, image in panels]
+        outcomes = []
+        for (name, _), future in zip(panels, futures):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = {'success': False, 'error': str(e), 'elapsed_ms': 0.0}
+            outcomes.append((name, outcome))
+
+        panel_info = [{'panel': name, 'success': outcome['success'], 'elapsed_ms': outcome['elapsed_ms'],
+                       **({'error': outcome['error']} if not outcome['success'] else {})}
+                      for name, outcome in outcomes]
+        read = [(name, outcome['results']) for name, outcome in outcomes if outcome['success']]
+        if not read:
+            return self._record({
+                'success': False,
+                'error': '; '.join(f"{info['panel']}: {info['error']}" for info in panel_info),
+                'elapsed_ms': (time.perf_counter() - start) * 1000
+            })
+
+        results = self._merge_panels(read)
+        results['panels'] = panel_info
+        return self._record({
+            'success': True,
+            'results': results,
+            'elapsed_ms': (time.perf_counter() - start) * 1000
+        })
+
+    # field check -> key of the value it was checked against in ocr_data
+    FIELD_VALUES = {
+        'brand_name': 'brand_name',
+        'alcohol_content': 'alcohol_content',
+        'net_contents': 'net_contents',
+        'government_warning': 'government_warning',
+    }
+
+    @staticmethod
+    def _was_read(value):
+        """A field value was found on a panel (for the warning check: some of the warning was)"""
+        if isinstance(value, dict):
+            return value['found']
+        return value is not None
+
+    def _merge_panels(self, read):
+        """
+        Combine validate_all results of every panel into one
+
+        For each field the first panel it matched on is used; if it matched nowhere, the first
+        panel where the value was at least found (or the first panel) explains the failure
+
+        Args:
+            read: List of (panel name, validate_all result) for the panels that were read
+
+        Returns:
+            validate_all style dict with 'provenance'
+        """
+        field_checks, provenance = {}, {}
+        ocr_data = {
+            'success': True,
+            'raw_text': '\n'.join(results['ocr_data'].get('raw_text', '') for _, results in read),
+            'ocr_passes': sum(results['ocr_data'].get('ocr_passes', 0) for _, results in read),
+            'cache_hit': all(results['ocr_data'].get('cache_hit') for _, results in read),
+            'candidates': {},
+        }
+
+        for field in read[0][1]['field_checks']:
+            value_key = self.FIELD_VALUES.get(field)
+            matched = [(name, results) for name, results in read if results['field_checks'][field]['matched']]
+            found = [(name, results) for name, results in read
+                     if value_key and self._was_read(results['ocr_data'].get(value_key))]
+            name, results = (matched or found or read)[0]
+
+            field_checks[field] = dict(results['field_checks'][field], panel=name)
+            provenance[field] = {'panel': name, 'matched': bool(matched),
+                                 'matched_on': [panel for panel, _ in matched]}
+            if value_key:
+                ocr_data[value_key] = results['ocr_data'].get(value_key)
+
+        for name, results in read:
+            for field, candidates in results['ocr_data'].get('candidates', {}).items():
+                ocr_data['candidates'].setdefault(field, []).extend(dict(c, panel=name) for c in candidates)
+
+        return {
+            'overall_match': all(check['matched'] for check in field_checks.values()),
+            'field_checks': field_checks,
+            'provenance': provenance,
+            'ocr_data': ocr_data,
+        }
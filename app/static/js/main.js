@@ -9,21 +9,22 @@ document.addEventListener('DOMContentLoaded', function() {
     
     if (fileInput) {
         fileInput.addEventListener('change', function(e) {
-            const file = e.target.files[0];
+            const files = Array.from(e.target.files);
+            const file = files[0]; // preview shows the first label of a set
             
             if (file) {
                 // Check if image
-                if (!file.type.startsWith('image/')) {
-                    alert('Please select an image file');
+                if (!files.every(f => f.type.startsWith('image/'))) {
+                    alert('Please select image files only');
                     fileInput.value = '';
                     imagePreview.style.display = 'none';
                     return;
                 }
                 
-                // Check file size (max set is 16MB)
+                // Check file size (max set is 16MB for the whole submission)
                 const maxSize = 16 * 1024 * 1024; // 16MB
-                if (file.size > maxSize) {
-                    alert('File is too large. Maximum size is 16MB.');
+                if (files.reduce((total, f) => total + f.size, 0) > maxSize) {
+                    alert('Files are too large. Maximum size is 16MB.');
                     fileInput.value = '';
                     imagePreview.style.display = 'none';
                     return;
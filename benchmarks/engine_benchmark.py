@@ -0,0 +1,66 @@
+"""
+Per-call OCR latency: warm in-process tesserocr engine vs a pytesseract subprocess per call
+
+Run from the repo root:
+    python -m benchmarks.engine_benchmark --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from PIL import Image
+
+from app.services.ocr_engines import ENGINES
+from app.services.preprocessing import get_preprocessor
+from benchmarks.ground_truth import TEST_LABELS
+
+IMAGE_DIR = 'test_images'
+CONFIG = r'--oem 3 --psm 6'
+
+def benchmark_engine(engine, images, repeat):
+    """Time image_to_string calls, the first call (cold, loads the model) is reported separately"""
+    start = time.perf_counter()
+    engine.image_to_string(images[0], config=CONFIG)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(repeat):
+        for img in images:
+            start = time.perf_counter()
+            engine.image_to_string(img, config=CONFIG)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        'first_call_ms': first_ms,
+        'calls': len(timings),
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES))
+    parser.add_argument('--repeat', type=int, default=3, help='passes over test_images/ per engine')
+    args = parser.parse_args()
+
+    # same preprocessed input for every engine
+    preprocessor = get_preprocessor()
+    images = [preprocessor.process(Image.open(os.path.join(IMAGE_DIR, name)).convert('RGB'))
+              for name in TEST_LABELS]
+
+    report = {}
+    for name in args.engines:
+        try:
+            engine = ENGINES[name]()
+            report[name] = benchmark_engine(engine, images, args.repeat)
+        except Exception as e:
+            report[name] = {'error': str(e)}
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Microbenchmark for field extraction over large OCR dumps
+
+Compares the single scan engine (app/services/field_extraction.py) with the
+previous approach of one regex loop per field, each over its own lowercased copy,
+and times the full text government warning check (app/services/government_warning.py).
+
+Run from the repo root:
+    python -m benchmarks.extraction_benchmark --sizes 1 10 100 1000
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+
+from app.services.field_extraction import PRODUCT_TYPE_WORDS, scan_fields, rank_candidates
+from app.services.government_warning import WarningChecker
+
+LABEL_TEXT = """OLD TOM DISTILLERY
+Kentucky Straight Bourbon Whiskey
+45% Alc./Vol. (90 Proof)
+750 mL
+Distilled and Bottled by Old Tom Distillery
+Louisville, Kentucky, USA
+GOVERNMENT WARNING: (1) According to the Surgeon General, women should not drink
+alcoholic beverages during pregnancy because of the risk of birth defects.
+(2) Consumption of alcoholic beverages impairs your ability to drive a car or
+operate machinery, and may cause health problems.
+"""
+
+NOISE_WORDS = ['lorem', 'ipsum', 'batch', 'no.', '1234', 'oak', 'aged', '|', '~', 'rn', 'cl0se', '5O']
+
+# Previous per field extraction, kept here as the baseline
+LEGACY_ABV = [
+    r'(\d+\.?\d*)\s*%\s*(?:alc|alcohol|abv)',
+    r'(?:alc|alcohol|abv)\s*(\d+\.?\d*)\s*%',
+    r'(\d+\.?\d*)\s*%\s*(?:vol|by\s*vol)',
+    r'(\d+\.?\d*)\s*proof',
+]
+LEGACY_NET = [
+    r'(\d+\.?\d*)\s*(ml|mL|ML|milliliters?)',
+    r'(\d+\.?\d*)\s*(l|L|liters?|litres?)',
+    r'(\d+\.?\d*)\s*(oz|OZ|fl\.?\s*oz|fluid\s*ounces?)',
+    r'(\d+\.?\d*)\s*(cl|cL|CL|centiliters?)',
+]
+
+LEGACY_PRODUCT_WORDS = sorted(PRODUCT_TYPE_WORDS)
+
+def legacy_brand(text):
+    for line in text.split('\n')[:10]:
+        line = line.strip()
+        words = line.split()
+        if not line or len(line) <= 5:
+            continue
+        line_lower = line.lower()
+        if any(word in line_lower for word in LEGACY_PRODUCT_WORDS):
+            continue
+        if '%' in line or any(unit in line_lower for unit in ['ml', 'oz', 'liter', 'litre', 'cl']):
+            continue
+        if (2 <= len(words) <= 5) or (len(words) == 1 and len(line) > 8):
+            return line
+    return None
+
+def legacy_extract(text):
+    brand = legacy_brand(text)
+    text_lower = text.lower()
+    abv = None
+    for pattern in LEGACY_ABV:
+        match = re.search(pattern, text_lower)
+        if match:
+            abv = float(match.group(1)) / (2 if 'proof' in pattern else 1)
+            break
+    net = None
+    for pattern in LEGACY_NET:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            net = f'{match.group(1)} {match.group(2)}'
+            break
+    warning_text = text.lower()
+    warning = 'government warning' in warning_text or \
+              ('warning' in warning_text and 'surgeon general' in warning_text)
+    return brand, abv, net, warning
+
+def top(candidates):
+    """Value OCRService.extract_fields would pick (no word confidences in a text dump)"""
+    return rank_candidates(candidates)[0]['value'] if candidates else None
+
+def single_scan_extract(text):
+    candidates = scan_fields(text)
+    # the warning is no longer a phrase search in this scan, WarningChecker is timed on its own (warning_check_ms)
+    return top(candidates['brand_name']), top(candidates['alcohol_content']), top(candidates['net_contents'])
+
+def make_dump(labels, seed=0):
+    """OCR dump of `labels` label texts with noise lines between them (fields are near the end)"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(labels - 1):
+        parts.append(' '.join(rng.choice(NOISE_WORDS) for _ in range(60)))
+    parts.append(LABEL_TEXT)
+    return '\n'.join(parts)
+
+def time_calls(fn, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1, 10, 100, 1000],
+                        help='dump sizes, in label-sized chunks of text')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    checker = WarningChecker()
+    report = []
+    for size in args.sizes:
+        text = make_dump(size)
+        report.append({
+            'chunks': size,
+            'chars': len(text),
+            'legacy_ms': time_calls(legacy_extract, text, args.repeat),
+            'single_scan_ms': time_calls(single_scan_extract, text, args.repeat),
+            'warning_check_ms': time_calls(checker.check, text, args.repeat),
+            'candidates': sum(len(c) for c in scan_fields(text).values()),
+        })
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# Form data that matches each label in test_images/ (see testing_guide.md)
+TEST_LABELS = {
+    'bourbon_perfect_match.png': {
+        'brand_name': 'Old Tom Distillery',
+        'product_type': 'Kentucky Straight Bourbon Whiskey',
+        'alcohol_content': '45',
+        'net_contents': '750 mL',
+        'has_warning': True,
+    },
+    'vodka_perfect_match.png': {
+        'brand_name': 'Crystal Clear Vodka',
+        'product_type': 'Premium Vodka',
+        'alcohol_content': '40',
+        'net_contents': '1 L',
+        'has_warning': True,
+    },
+    'missing_warning.png': {
+        'brand_name': 'Rebel Spirits',
+        'product_type': 'Craft Gin',
+        'alcohol_content': '42',
+        'net_contents': '750 mL',
+        'has_warning': False,
+    },
+    'beer_label.png': {
+        'brand_name': 'Hoppy Hills Brewery',
+        'product_type': 'India Pale Ale',
+        'alcohol_content': '6.5',
+        'net_contents': '12 fl oz',
+        'has_warning': True,
+    },
+    'wine_label.png': {
+        'brand_name': 'Sunset Vineyards',
+        'product_type': 'Cabernet Sauvignon',
+        'alcohol_content': '13.5',
+        'net_contents': '750 mL',
+        'has_warning': True,
+    },
+    'rum_label.png': {
+        'brand_name': 'Caribbean Gold',
+        'product_type': 'Spiced Rum',
+        'alcohol_content': '47.5',
+        'net_contents': '1 L',
+        'has_warning': True,
+    },
+    'long_brand_name.png': {
+        'brand_name': 'Toms Old Distillery Premium Spirits Company',
+        'product_type': 'Small Batch Tennessee Whiskey',
+        'alcohol_content': '43',
+        'net_contents': '750 mL',
+        'has_warning': True,
+    },
+    'complex_label.png': {
+        'brand_name': 'Heritage Distillers',
+        'product_type': 'Single Barrel Aged Kentucky Straight Bourbon Whiskey',
+        'alcohol_content': '50',
+        'net_contents': '750 mL',
+        'has_warning': True,
+    },
+}
+
+FIELDS = ('brand_name', 'product_type', 'alcohol_content', 'net_contents', 'government_warning')
+
+def field_accuracy(validator, ocr_data, expected):
+    """
+    Check which fields the pipeline got right for a label with known contents
+
+    Args:
+        validator: LabelValidator instance
+        ocr_data: Result of OCRService.extract_all_info
+        expected: Entry from TEST_LABELS
+
+    Returns:
+        Dict of field name -> bool
+    """
+    if not ocr_data.get('success'):
+        return checks_accuracy(None, expected)
+    return checks_accuracy(validator.validate_all(expected, ocr_data)['field_checks'], expected)
+
+def checks_accuracy(checks, expected):
+    """
+    Same as field_accuracy for field checks that were already run (e.g. by VerificationService)
+
+    Args:
+        checks: 'field_checks' of a validate_all result, None when OCR failed
+        expected: Entry from TEST_LABELS
+
+    Returns:
+        Dict of field name -> bool
+    """
+    if checks is None:
+        return {field: False for field in FIELDS}
+
+    correct = {field: check['matched'] for field, check in checks.items()}
+    # a label without the warning is read correctly when the warning is *not* found
+    correct['government_warning'] = checks['government_warning']['matched'] == expected['has_warning']
+    return correct
@@ -0,0 +1,246 @@
+"""
+End to end benchmark and accuracy suite: generated labels with known contents, degraded like
+real photos (noise, blur, rotation, JPEG artefacts), run through OCR + validation serially and
+on the batch pool. Reports throughput, p50/p95 latency, peak memory and per field accuracy
+
+Run from the repo root:
+    python -m benchmarks.pipeline_benchmark --count 50 --workers 4 --output report.json
+
+The same --seed always generates the same labels, so reports from two branches can be compared
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pytesseract
+from PIL import Image, ImageFilter
+
+from benchmarks.ground_truth import FIELDS, checks_accuracy
+from config import Config
+
+BRANDS = [
+    'Old Tom Distillery', 'Crystal Clear Vodka', 'Rebel Spirits', 'Hoppy Hills Brewery',
+    'Sunset Vineyards', 'Caribbean Gold', 'Heritage Distillers', 'Silver Creek',
+    'Blue Ridge Cellars', 'Iron Horse Brewing', 'Copper Kettle', 'Northern Lights Distilling',
+]
+PRODUCT_TYPES = [
+    'Kentucky Straight Bourbon Whiskey', 'Premium Vodka', 'Craft Gin', 'India Pale Ale',
+    'Cabernet Sauvignon', 'Spiced Rum', 'Small Batch Tennessee Whiskey', 'Cask Strength Rye Whiskey',
+    'Pinot Noir', 'Blanco Tequila', 'American Lager',
+]
+VOLUMES = ['750 mL', '1 L', '12 fl oz', '375 mL', '1.75 L', '50 mL']
+
+def percentile(values, p):
+    """Nearest rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def degrade(img, rng, noise, blur, rotate):
+    """
+    Make a clean generated label look more like a photo, each effect drawn between none and its maximum
+
+    Args:
+        img: PIL Image (RGB)
+        rng: random.Random
+        noise: Largest gaussian noise std dev (grey levels)
+        blur: Largest gaussian blur radius (px)
+        rotate: Largest rotation either way (degrees)
+
+    Returns:
+        (PIL Image, dict of the amounts used)
+    """
+    applied = {
+        'rotate': round(rng.uniform(-rotate, rotate), 2) if rotate else 0.0,
+        'blur': round(rng.uniform(0, blur), 2) if blur else 0.0,
+        'noise': round(rng.uniform(0, noise), 2) if noise else 0.0,
+    }
+    if applied['rotate']:
+        img = img.rotate(applied['rotate'], resample=Image.Resampling.BICUBIC, expand=True, fillcolor='white')
+    if applied['blur']:
+        img = img.filter(ImageFilter.GaussianBlur(applied['blur']))
+    if applied['noise']:
+        pixels = np.asarray(img, dtype=np.float32)
+        noisy = np.random.default_rng(rng.getrandbits(32)).normal(0, applied['noise'], pixels.shape)
+        img = Image.fromarray(np.clip(pixels + noisy, 0, 255).astype(np.uint8))
+    return img, applied
+
+def generate_labels(count, out_dir, seed=0, noise=0.0, blur=0.0, rotate=0.0, jpeg=0):
+    """
+    Generate labels with create_label (same layout as test_images/) and their ground truth
+
+    Args:
+        count: Number of labels
+        out_dir: Directory the images are written to
+        seed: Random seed (same seed = same labels)
+        noise, blur, rotate: Largest degradation of each kind (see degrade)
+        jpeg: Lowest JPEG quality (labels are saved as PNG when 0)
+
+    Returns:
+        List of dicts with 'path', 'form' (matching form data), 'has_warning' and 'degradation'
+    """
+    from create_test_labels import create_label
+
+    rng = random.Random(seed)
+    labels = []
+    for index in range(count):
+        form = {
+            'brand_name': rng.choice(BRANDS),
+            'product_type': rng.choice(PRODUCT_TYPES),
+            'alcohol_content': rng.choice(['{:.0f}', '{:.1f}'])
+                                  .format(rng.choice([rng.uniform(4, 14), rng.uniform(35, 60)])),
+            'net_contents': rng.choice(VOLUMES),
+        }
+        has_warning = rng.random() < 0.85
+        path = os.path.join(out_dir, f'label_{index:04d}.png')
+        with contextlib.redirect_stdout(io.StringIO()): # create_label reports every font and file
+            create_label(path, form['brand_name'], form['product_type'], form['alcohol_content'],
+                         form['net_contents'], include_warning=has_warning)
+
+        img, degradation = degrade(Image.open(path).convert('RGB'), rng, noise, blur, rotate)
+        if jpeg:
+            degradation['jpeg_quality'] = rng.randint(jpeg, 95)
+            os.remove(path)
+            path = path[:-len('.png')] + '.jpg'
+            img.save(path, 'JPEG', quality=degradation['jpeg_quality'])
+        else:
+            img.save(path)
+
+        labels.append({'path': path, 'form': form, 'has_warning': has_warning, 'degradation': degradation})
+    return labels
+
+def summarize(labels, outcomes, wall_s):
+    """Throughput, latency percentiles and per field accuracy of one run"""
+    per_field = {field: [] for field in FIELDS}
+    failures = 0
+    for label, outcome in zip(labels, outcomes):
+        checks = outcome['results']['field_checks'] if outcome['success'] else None
+        failures += not outcome['success']
+        correct = checks_accuracy(checks, {**label['form'], 'has_warning': label['has_warning']})
+        for field in FIELDS:
+            per_field[field].append(correct[field])
+
+    accuracy = {field: sum(results) / len(results) for field, results in per_field.items()}
+    accuracy['overall'] = statistics.mean(accuracy.values())
+    accuracy['labels_all_correct'] = sum(all(results) for results in zip(*per_field.values())) / len(labels)
+
+    latencies = sorted(outcome['elapsed_ms'] for outcome in outcomes)
+    return {
+        'labels': len(labels),
+        'failures': failures,
+        'wall_s': wall_s,
+        'labels_per_second': len(labels) / wall_s if wall_s else 0.0,
+        'latency_ms': {
+            'mean': statistics.mean(latencies),
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'max': latencies[-1],
+        },
+        'accuracy': accuracy,
+    }
+
+def run_mode(mode, labels, workers, queue):
+    """Run every label through the pipeline (in its own process so peak RSS belongs to this run only)"""
+    try:
+        queue.put(measure(mode, labels, workers))
+    except Exception as e: # the parent is waiting on the queue, never leave it hanging
+        queue.put({'error': str(e)})
+
+def measure(mode, labels, workers):
+    """Serial or parallel run of every label, see run_mode"""
+    Config.OCR_CACHE_ENABLED = False # every label has to be OCR'd, not looked up
+    from app.services.ocr_service import OCRService
+    from app.services.validator import LabelValidator
+    from app.services.verification import VerificationService
+
+    service = VerificationService(OCRService(), LabelValidator(), max_workers=workers)
+
+    start = time.perf_counter()
+    # loads models, not part of the numbers (a blank image, so no label is already in the orientation cache)
+    service.verify(Image.new('RGB', (600, 900), 'white'), labels[0]['form'])
+    warmup_ms = (time.perf_counter() - start) * 1000
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'serial':
+        outcomes = [service.verify(label['path'], label['form']) for label in labels]
+    else:
+        outcomes = service.verify_batch([(label['path'], label['form']) for label in labels])['items']
+    wall_s = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    report = summarize(labels, outcomes, wall_s)
+    report.update({
+        'workers': 1 if mode == 'serial' else workers,
+        'warmup_ms': warmup_ms,
+        'peak_rss_mb': peak_kb / 1024,
+        'peak_rss_increase_mb': (peak_kb - baseline_kb) / 1024,
+        # largest tesseract subprocess (pytesseract engine only)
+        'peak_child_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    })
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=30, help='labels to generate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--noise', type=float, default=12.0, help='largest noise std dev (grey levels)')
+    parser.add_argument('--blur', type=float, default=1.0, help='largest blur radius (px)')
+    parser.add_argument('--rotate', type=float, default=3.0, help='largest rotation (degrees)')
+    parser.add_argument('--jpeg', type=int, default=40, help='lowest JPEG quality, 0 keeps PNG')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='batch pool size for the parallel run')
+    parser.add_argument('--modes', nargs='+', default=['serial', 'parallel'], choices=['serial', 'parallel'])
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--keep-images', metavar='DIR', help='write the generated labels here instead of a temp dir')
+    args = parser.parse_args()
+
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        parser.error('Tesseract not found, the pipeline benchmark needs it installed')
+
+    out_dir = args.keep_images or tempfile.mkdtemp(prefix='label-bench-')
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        labels = generate_labels(args.count, out_dir, args.seed, args.noise, args.blur, args.rotate, args.jpeg)
+
+        report = {
+            'settings': {
+                'count': args.count, 'seed': args.seed, 'noise': args.noise, 'blur': args.blur,
+                'rotate': args.rotate, 'jpeg': args.jpeg, 'ocr_engine': Config.OCR_ENGINE,
+                'ocr_strategy': Config.OCR_STRATEGY, 'preprocess_engine': Config.PREPROCESS_ENGINE,
+            },
+        }
+        context = multiprocessing.get_context('spawn')
+        for mode in args.modes:
+            queue = context.Queue()
+            process = context.Process(target=run_mode, args=(mode, labels, args.workers, queue))
+            process.start()
+            report[mode] = queue.get()
+            process.join()
+
+        if 'labels_per_second' in report.get('serial', {}) and 'labels_per_second' in report.get('parallel', {}):
+            report['parallel']['speedup'] = report['parallel']['labels_per_second'] / report['serial']['labels_per_second']
+    finally:
+        if not args.keep_images:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare preprocessing engines on test_images/: latency, peak memory and OCR accuracy
+
+Run from the repo root:
+    python -m benchmarks.preprocess_benchmark --repeat 20
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+
+import pytesseract
+from PIL import Image
+
+from benchmarks.ground_truth import TEST_LABELS, field_accuracy
+from config import Config
+
+IMAGE_DIR = 'test_images'
+
+def load_images():
+    """Decode every test label once so decoding isn't part of the timings"""
+    return {name: Image.open(os.path.join(IMAGE_DIR, name)).convert('RGB') for name in TEST_LABELS}
+
+def measure_engine(engine, repeat, queue):
+    """Time an engine over all labels (runs in its own process so peak RSS belongs to this engine only)"""
+    from app.services.preprocessing import get_preprocessor
+
+    preprocessor = get_preprocessor(engine)
+    images = load_images()
+    preprocessor.process(next(iter(images.values()))) # warm up imports/caches
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        for img in images.values():
+            start = time.perf_counter()
+            preprocessor.process(img)
+            timings.append((time.perf_counter() - start) * 1000)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings.sort()
+    queue.put({
+        'calls': len(timings),
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+        'peak_rss_increase_mb': (peak_kb - baseline_kb) / 1024,
+    })
+
+def measure_accuracy(engine):
+    """Run the full OCR pipeline with an engine and score it against the known label contents"""
+    from app.services.ocr_service import OCRService
+    from app.services.preprocessing import get_preprocessor
+    from app.services.validator import LabelValidator
+
+    Config.OCR_CACHE_ENABLED = False
+    ocr_service = OCRService(preprocessor=get_preprocessor(engine))
+    validator = LabelValidator()
+
+    per_field = {}
+    for name, expected in TEST_LABELS.items():
+        ocr_data = ocr_service.extract_all_info(os.path.join(IMAGE_DIR, name))
+        for field, correct in field_accuracy(validator, ocr_data, expected).items():
+            per_field.setdefault(field, []).append(correct)
+
+    scores = {field: sum(results) / len(results) for field, results in per_field.items()}
+    scores['overall'] = statistics.mean(scores.values())
+    return scores
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', nargs='+', default=['pil', 'numpy'])
+    parser.add_argument('--repeat', type=int, default=10, help='passes over test_images/ per engine')
+    parser.add_argument('--no-ocr', action='store_true', help='skip the accuracy run (no Tesseract needed)')
+    args = parser.parse_args()
+
+    run_ocr = not args.no_ocr
+    if run_ocr:
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception:
+            print('Tesseract not found, skipping accuracy (use --no-ocr to silence this)')
+            run_ocr = False
+
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    for engine in args.engines:
+        queue = context.Queue()
+        process = context.Process(target=measure_engine, args=(engine, args.repeat, queue))
+        process.start()
+        report[engine] = {'latency': queue.get()}
+        process.join()
+
+        if run_ocr:
+            report[engine]['accuracy'] = measure_accuracy(engine)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Verify a whole archive of labels offline, without the web app
+
+Reads a manifest (CSV with a header row, or JSONL) with one label per row: the image path
+('image') and the expected form fields (brand_name, product_type, alcohol_content,
+net_contents), optionally an 'id' (defaults to the image path). Image paths are relative
+to the manifest's folder unless --base-dir is given.
+
+Labels are verified on a process pool (one process per core by default) and each result is
+appended to the output JSONL as soon as it is done. Running the same command again resumes:
+labels already in the output are skipped (failed ones too, unless --retry-failed).
+
+    python bulk_verify.py archive/manifest.csv --output results.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+FORM_FIELDS = ('brand_name', 'product_type', 'alcohol_content', 'net_contents')
+
+def read_manifest(path, base_dir=None):
+    """
+    Load manifest rows
+
+    Args:
+        path: .csv or .jsonl file
+        base_dir: Folder relative image paths are resolved against (defaults to the manifest's folder)
+
+    Returns:
+        List of dicts with 'id', 'image' and 'form_data' (first row wins for repeated ids)
+    """
+    base_dir = base_dir if base_dir is not None else os.path.dirname(os.path.abspath(path))
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items = {}
+    for number, row in enumerate(rows, 1):
+        image = str(row.get('image') or '').strip()
+        if not image:
+            raise ValueError(f"{path}: row {number} has no 'image'")
+        item_id = str(row.get('id') or image).strip()
+        items.setdefault(item_id, {
+            'id': item_id,
+            'image': os.path.join(base_dir, image),
+            'form_data': {field: str(row.get(field, '') or '').strip() for field in FORM_FIELDS},
+        })
+    return list(items.values())
+
+def finished_ids(output_path, retry_failed=False):
+    """
+    Ids already in an earlier run's output
+
+    Args:
+        output_path: Results JSONL (may not exist yet)
+        retry_failed: Leave out items whose verification errored, so they are run again
+
+    Returns:
+        Set of ids
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # half written line from an interrupted run, that item runs again
+            if record.get('success') or not retry_failed:
+                done.add(record['id'])
+    return done
+
+# Services of this pool process (built once by init_worker, reused for every label)
+_service = None
+
+def init_worker(use_cache):
+    """Process pool initializer: build the OCR + validation pipeline in this process"""
+    global _service
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1') # one core per Tesseract, the pool already uses them all
+    from config import Config
+    Config.OCR_CACHE_ENABLED = use_cache
+    from app.services.ocr_service import OCRService
+    from app.services.validator import LabelValidator
+    from app.services.verification import VerificationService
+    _service = VerificationService(OCRService(), LabelValidator())
+
+def verify_item(item, include_ocr=False):
+    """
+    Verify one manifest item (runs in a pool process)
+
+    Returns:
+        JSON serializable result record
+    """
+    record = {'id': item['id'], 'image': item['image']}
+    try:
+        verification = _service.verify(item['image'], item['form_data'])
+    except Exception as e:
+        return {**record, 'success': False, 'error': str(e)}
+
+    record['elapsed_ms'] = verification['elapsed_ms']
+    if not verification['success']:
+        return {**record, 'success': False, 'error': verification['error']}
+
+    results = verification['results']
+    record.update({
+        'success': True,
+        'overall_match': results['overall_match'],
+        'field_checks': results['field_checks'],
+    })
+    if include_ocr:
+        record['ocr_data'] = results['ocr_data']
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest', help='CSV or JSONL manifest')
+    parser.add_argument('--output', '-o', required=True, help='results JSONL (appended to, resumes from it)')
+    parser.add_argument('--base-dir', help='folder image paths are relative to (default: the manifest folder)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='pool processes (default: one per core)')
+    parser.add_argument('--retry-failed', action='store_true', help='run items whose verification errored again')
+    parser.add_argument('--include-ocr', action='store_true', help='also write the OCR data (raw text, candidates)')
+    parser.add_argument('--no-cache', action='store_true', help='skip the OCR result cache')
+    args = parser.parse_args()
+
+    items = read_manifest(args.manifest, args.base_dir)
+    done = finished_ids(args.output, args.retry_failed)
+    pending = [item for item in items if item['id'] not in done]
+    print(f"{len(items)} labels in manifest, {len(items) - len(pending)} already done, {len(pending)} to verify",
+          file=sys.stderr)
+    if not pending:
+        return
+
+    counts = {'verified': 0, 'matched': 0, 'failed': 0}
+    start = time.perf_counter()
+    queue = iter(pending)
+    window = args.workers * 4 # submitted ahead, so a huge manifest isn't all queued in memory at once
+
+    # an interrupted run can leave a half written last line, start on a fresh one
+    if os.path.exists(args.output) and os.path.getsize(args.output):
+        with open(args.output, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+        if needs_newline:
+            with open(args.output, 'a', encoding='utf-8') as out:
+                out.write('\n')
+
+    with open(args.output, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                initargs=(not args.no_cache,)) as executor:
+        running = set()
+        try:
+            while True:
+                for item in queue:
+                    running.add(executor.submit(verify_item, item, args.include_ocr))
+                    if len(running) >= window:
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    out.write(json.dumps(record) + '\n')
+                    out.flush() # an interrupted run keeps everything finished so far
+
+                    counts['verified'] += 1
+                    counts['matched'] += bool(record.get('overall_match'))
+                    counts['failed'] += not record['success']
+                    if counts['verified'] % 100 == 0:
+                        rate = counts['verified'] / (time.perf_counter() - start)
+                        print(f"{counts['verified']}/{len(pending)} ({rate:.1f} labels/s)", file=sys.stderr)
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print("Interrupted, run the same command again to resume", file=sys.stderr)
+            raise SystemExit(130)
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {counts['verified']} verified in {elapsed:.1f}s "
+          f"({counts['verified'] / elapsed:.1f} labels/s), {counts['matched']} matched, "
+          f"{counts['failed']} could not be read", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
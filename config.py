@@ -13,8 +13,110 @@ class Config:
 
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'} # common extension types for uploaded docs
 
+    # Uploads are checked while they stream in: the type from the magic bytes and the dimensions from the header,
+    # so wrong files and decompression bombs are refused before the rest of the request is read
+    UPLOAD_MAX_PIXELS = int(os.environ.get('UPLOAD_MAX_PIXELS', 50_000_000))
+    UPLOAD_MAX_SIDE = int(os.environ.get('UPLOAD_MAX_SIDE', 20_000))  # px
+    UPLOAD_SNIFF_BYTES = 256 * 1024  # header bytes read at most to find the dimensions (JPEG metadata comes first)
+
     TESSERACT_CMD = os.environ.get('TESSERACT_CMD') or None
 
+    # 'tesserocr' keeps one loaded Tesseract per thread (needs the optional tesserocr package),
+    # 'pytesseract' starts the tesseract binary for every call, 'auto' picks tesserocr when installed
+    OCR_ENGINE = os.environ.get('OCR_ENGINE', 'auto')
+    TESSDATA_PREFIX = os.environ.get('TESSDATA_PREFIX') or None
+
+    # Large photos are shrunk before preprocessing: down to the pixel budget, or further while text lines stay this tall
+    OCR_MAX_PIXELS = int(os.environ.get('OCR_MAX_PIXELS', 4_000_000))
+    OCR_DOWNSCALE_TEXT_HEIGHT = 32  # px
+    OCR_MIN_LONG_SIDE = 1000  # px, never shrink further than this
+
+    # Orientation check before preprocessing, on a thumbnail and cached per image: 'auto' (Tesseract OSD for
+    # sideways/upside down labels + projection profile deskew), 'skew' (deskew only) or 'off'
+    ORIENTATION_CHECK = os.environ.get('ORIENTATION_CHECK', 'auto')
+    ORIENTATION_THUMBNAIL = 1000  # px, long side of the image OSD and skew estimation look at
+    ORIENTATION_MIN_CONFIDENCE = 1.5  # OSD orientation confidence needed before turning a label
+    ORIENTATION_MIN_SKEW = 0.5  # degrees, smaller tilts are left alone
+
+    # Image preprocessing engine: 'pil' (original filter chain) or 'numpy' (in place array pipeline)
+    PREPROCESS_ENGINE = os.environ.get('PREPROCESS_ENGINE', 'pil')
+    PREPROCESS_BINARIZE = os.environ.get('PREPROCESS_BINARIZE', 'otsu')  # numpy engine: 'otsu', 'sauvola' or 'none'
+    PREPROCESS_TARGET_TEXT_HEIGHT = 24  # numpy engine: px per text line, roughly a 300 DPI scan
+    PREPROCESS_MIN_SCALE = 0.25
+    PREPROCESS_MAX_SCALE = 3.0
+
+    # Tesseract passes per label run side by side on a bounded thread pool (per worker)
+    OCR_MAX_WORKERS = int(os.environ.get('OCR_MAX_WORKERS', max(2, os.cpu_count() or 1)))
+    OCR_EARLY_EXIT = os.environ.get('OCR_EARLY_EXIT', '1') == '1'  # skip extra passes when the first finds every field
+
+    # Tesseract word confidences (0-100) of field candidates: the first pass is trusted on its own when every
+    # field reaches OCR_CONFIDENT_SCORE, candidates under OCR_MIN_CONFIDENCE only win when nothing better is found
+    OCR_CONFIDENT_SCORE = float(os.environ.get('OCR_CONFIDENT_SCORE', 80))
+    OCR_MIN_CONFIDENCE = float(os.environ.get('OCR_MIN_CONFIDENCE', 50))
+
+    # 'passes': full label OCR with every PSM pass, 'regions': one layout pass, then only the
+    # brand/ABV/net contents lines are re-read (single line mode, digit whitelists)
+    # 'adaptive': verification reads the label the cheapest way first and only escalates (see OCR_LADDER_*)
+    OCR_STRATEGY = os.environ.get('OCR_STRATEGY', 'passes')
+
+    # Adaptive OCR steps, tried in this order while a field fails validation or is read with low confidence.
+    # Budgets: how long to wait for each step, and no new step is started past the total (ms)
+    OCR_LADDER_STEPS = os.environ.get('OCR_LADDER_STEPS', 'fast,psm11,upscale,binarize,deskew').split(',')
+    OCR_LADDER_BUDGETS_MS = {'fast': 5000, 'psm11': 5000, 'upscale': 8000, 'binarize': 5000, 'deskew': 6000}
+    OCR_LADDER_TOTAL_BUDGET_MS = int(os.environ.get('OCR_LADDER_TOTAL_BUDGET_MS', 20000))
+
+    # Batch verification API (/api/verify/batch), labels are fanned out over one pool sized to the CPU count
+    BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', os.cpu_count() or 1))
+    BATCH_MAX_ITEMS = 100  # images per batch request
+
+    # JSON API (/api/verify, or /verify with Accept: application/json): responses at least this big are gzipped
+    # for clients sending Accept-Encoding: gzip
+    API_GZIP_MIN_BYTES = 1024
+
+    # Label sets: several images of one product (front, back, neck...) in one /verify submission, OCR'd side by side
+    LABEL_SET_MAX_IMAGES = 6
+
+    # Queued verifications (/verify?async=1), state is shared by all workers through a sqlite file
+    JOB_MAX_WORKERS = int(os.environ.get('JOB_MAX_WORKERS', os.cpu_count() or 1))
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join('cache', 'jobs.sqlite3'))
+    JOB_RESULT_TTL = 60 * 60  # seconds finished jobs can still be polled
+    JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 10 * 60))  # seconds, jobs running this long (from start) or still queued this long are failed
+    JOB_POLL_INTERVAL = 0.5  # seconds between status checks while streaming a job
+
+    # OCR result cache, keyed on image bytes + OCR settings (memory tier per worker, sqlite tier shared by workers)
+    OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', '1') == '1'
+    OCR_CACHE_PATH = os.environ.get('OCR_CACHE_PATH', os.path.join('cache', 'ocr_cache.sqlite3'))
+    OCR_CACHE_MEMORY_ENTRIES = 256  # labels kept in memory per worker
+    OCR_CACHE_MAX_ENTRIES = 20000  # labels kept on disk
+    OCR_CACHE_TTL = 7 * 24 * 60 * 60  # seconds (a week)
+
+    # Readiness (/health/ready): Tesseract is warmed up on a tiny built-in image when a worker starts, and a worker
+    # reports not ready while it is cold, has more label images in OCR than OCR_MAX_WORKERS * READINESS_MAX_UTILIZATION
+    # or more than READINESS_MAX_QUEUED jobs are waiting
+    READINESS_WARM_UP = os.environ.get('READINESS_WARM_UP', '1') == '1'
+    READINESS_MAX_UTILIZATION = float(os.environ.get('READINESS_MAX_UTILIZATION', 1.0))
+    READINESS_MAX_QUEUED = int(os.environ.get('READINESS_MAX_QUEUED', 50))
+    READINESS_LATENCY_WINDOW = 50  # latest verifications averaged into the reported latency
+
+    # Prometheus text metrics on /metrics (per worker process) and one JSON log line per request with stage timings
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_LOG_REQUESTS = os.environ.get('METRICS_LOG_REQUESTS', '1') == '1'
+
+    # Near duplicate hints: a perceptual hash (256 bit dHash of the preprocessed image) of every OCR'd label is kept,
+    # and a new upload within NEAR_DUPLICATE_MAX_DISTANCE bits of one is still read, but stops after the first pass
+    # when that pass reads the near duplicate's values (needs the OCR cache). Labels that only differ in small print
+    # (ABV, volume) hash alike, so another label's extraction is never returned
+    NEAR_DUPLICATE_ENABLED = os.environ.get('NEAR_DUPLICATE_ENABLED', '0') == '1'
+    NEAR_DUPLICATE_PATH = os.environ.get('NEAR_DUPLICATE_PATH', os.path.join('cache', 'near_duplicates.sqlite3'))
+    NEAR_DUPLICATE_MAX_DISTANCE = int(os.environ.get('NEAR_DUPLICATE_MAX_DISTANCE', 10))
+
     # thresholds for validation
+    # Government warning: OCR text is aligned against the full 27 CFR 16.21 statement clause by clause,
+    # a clause counts as present with at most this share of its characters misread (edit distance)
+    WARNING_MAX_ERROR_RATE = float(os.environ.get('WARNING_MAX_ERROR_RATE', 0.15))
     SIMILARITY_THRESHOLD = 0.85  # 85% similarity for fuzzy matching
-    ABV_TOLERANCE = 0.3  # Allows for 0.3% difference in alcohol content
\ No newline at end of file
+    BRAND_MATCH_SCORER = os.environ.get('BRAND_MATCH_SCORER', 'levenshtein')  # or 'jaro_winkler'
+    KNOWN_BRANDS_PATH = os.environ.get('KNOWN_BRANDS_PATH') or None  # optional text file, one registered brand per line
+    KNOWN_BRAND_THRESHOLD = 0.75  # OCR reads this close to one registered brand (and clearly closer than to any other) count as it
+    ABV_TOLERANCE = 0.3  # Allows for 0.3% difference in alcohol content
+    NET_CONTENTS_TOLERANCE = float(os.environ.get('NET_CONTENTS_TOLERANCE', 0.01))  # relative, net contents are compared as volumes (750 mL = 75 cl)
\ No newline at end of file
@@ -161,121 +161,126 @@ def create_label(filename, brand, product_type, abv, volume, include_warning=Tru
     print(f"  Created: {filename}")
     return filename
 
-# Create test images directory
-os.makedirs('test_images', exist_ok=True)
+def main():
+    """Write the ten labels described in testing_guide.md to test_images/"""
+    # Create test images directory
+    os.makedirs('test_images', exist_ok=True)
 
-print("\nGenerating test label images...")
-print("=" * 60)
+    print("\nGenerating test label images...")
+    print("=" * 60)
 
-# Test Case 1: Perfect Match - Bourbon
-print("\n[1/10] Creating bourbon label (perfect match scenario)...")
-create_label(
-    'test_images/01_bourbon_perfect_match.png',
-    brand='Old Tom Distillery',
-    product_type='Kentucky Straight Bourbon Whiskey',
-    abv='45',
-    volume='750 mL',
-    include_warning=True
-)
+    # Test Case 1: Perfect Match - Bourbon
+    print("\n[1/10] Creating bourbon label (perfect match scenario)...")
+    create_label(
+        'test_images/01_bourbon_perfect_match.png',
+        brand='Old Tom Distillery',
+        product_type='Kentucky Straight Bourbon Whiskey',
+        abv='45',
+        volume='750 mL',
+        include_warning=True
+    )
 
-# Test Case 2: Perfect Match - Vodka
-print("[2/10] Creating vodka label (perfect match scenario)...")
-create_label(
-    'test_images/02_vodka_perfect_match.png',
-    brand='Crystal Clear Vodka',
-    product_type='Premium Vodka',
-    abv='40',
-    volume='1 L',
-    include_warning=True
-)
+    # Test Case 2: Perfect Match - Vodka
+    print("[2/10] Creating vodka label (perfect match scenario)...")
+    create_label(
+        'test_images/02_vodka_perfect_match.png',
+        brand='Crystal Clear Vodka',
+        product_type='Premium Vodka',
+        abv='40',
+        volume='1 L',
+        include_warning=True
+    )
 
-# Test Case 3: Missing Government Warning
-print("[3/10] Creating gin label (missing warning scenario)...")
-create_label(
-    'test_images/03_gin_missing_warning.png',
-    brand='Rebel Spirits',
-    product_type='Craft Gin',
-    abv='42',
-    volume='750 mL',
-    include_warning=False
-)
+    # Test Case 3: Missing Government Warning
+    print("[3/10] Creating gin label (missing warning scenario)...")
+    create_label(
+        'test_images/03_gin_missing_warning.png',
+        brand='Rebel Spirits',
+        product_type='Craft Gin',
+        abv='42',
+        volume='750 mL',
+        include_warning=False
+    )
 
-# Test Case 4: Beer Label
-print("[4/10] Creating beer label (perfect match scenario)...")
-create_label(
-    'test_images/04_beer_ipa.png',
-    brand='Hoppy Hills Brewery',
-    product_type='India Pale Ale',
-    abv='6.5',
-    volume='12 fl oz',
-    include_warning=True
-)
+    # Test Case 4: Beer Label
+    print("[4/10] Creating beer label (perfect match scenario)...")
+    create_label(
+        'test_images/04_beer_ipa.png',
+        brand='Hoppy Hills Brewery',
+        product_type='India Pale Ale',
+        abv='6.5',
+        volume='12 fl oz',
+        include_warning=True
+    )
 
-# Test Case 5: Wine Label
-print("[5/10] Creating wine label (perfect match scenario)...")
-create_label(
-    'test_images/05_wine_cabernet.png',
-    brand='Sunset Vineyards',
-    product_type='Cabernet Sauvignon',
-    abv='13.5',
-    volume='750 mL',
-    include_warning=True
-)
+    # Test Case 5: Wine Label
+    print("[5/10] Creating wine label (perfect match scenario)...")
+    create_label(
+        'test_images/05_wine_cabernet.png',
+        brand='Sunset Vineyards',
+        product_type='Cabernet Sauvignon',
+        abv='13.5',
+        volume='750 mL',
+        include_warning=True
+    )
 
-# Test Case 6: High Proof Rum
-print("[6/10] Creating rum label (perfect match scenario)...")
-create_label(
-    'test_images/06_rum_spiced.png',
-    brand='Caribbean Gold',
-    product_type='Spiced Rum',
-    abv='47.5',
-    volume='1 L',
-    include_warning=True
-)
+    # Test Case 6: High Proof Rum
+    print("[6/10] Creating rum label (perfect match scenario)...")
+    create_label(
+        'test_images/06_rum_spiced.png',
+        brand='Caribbean Gold',
+        product_type='Spiced Rum',
+        abv='47.5',
+        volume='1 L',
+        include_warning=True
+    )
 
-# Test Case 7: Long Brand Name
-print("[7/10] Creating label with long brand name...")
-create_label(
-    'test_images/07_long_brand_name.png',
-    brand='Toms Old Distillery Premium Spirits Company',
-    product_type='Small Batch Tennessee Whiskey',
-    abv='43',
-    volume='750 mL',
-    include_warning=True
-)
+    # Test Case 7: Long Brand Name
+    print("[7/10] Creating label with long brand name...")
+    create_label(
+        'test_images/07_long_brand_name.png',
+        brand='Toms Old Distillery Premium Spirits Company',
+        product_type='Small Batch Tennessee Whiskey',
+        abv='43',
+        volume='750 mL',
+        include_warning=True
+    )
 
-# Test Case 8: Complex Product Type
-print("[8/10] Creating label with complex product type...")
-create_label(
-    'test_images/08_complex_product.png',
-    brand='Heritage Distillers',
-    product_type='Single Barrel Aged Kentucky Straight Bourbon Whiskey',
-    abv='50',
-    volume='750 mL',
-    include_warning=True
-)
+    # Test Case 8: Complex Product Type
+    print("[8/10] Creating label with complex product type...")
+    create_label(
+        'test_images/08_complex_product.png',
+        brand='Heritage Distillers',
+        product_type='Single Barrel Aged Kentucky Straight Bourbon Whiskey',
+        abv='50',
+        volume='750 mL',
+        include_warning=True
+    )
 
-# Test Case 9: Low ABV Beer
-print("[9/10] Creating low ABV beer label...")
-create_label(
-    'test_images/09_beer_light.png',
-    brand='Mountain Brew Co',
-    product_type='Light Lager',
-    abv='4.2',
-    volume='12 fl oz',
-    include_warning=True
-)
+    # Test Case 9: Low ABV Beer
+    print("[9/10] Creating low ABV beer label...")
+    create_label(
+        'test_images/09_beer_light.png',
+        brand='Mountain Brew Co',
+        product_type='Light Lager',
+        abv='4.2',
+        volume='12 fl oz',
+        include_warning=True
+    )
 
-# Test Case 10: High ABV Spirit
-print("[10/10] Creating high ABV spirit label...")
-create_label(
-    'test_images/10_whiskey_cask_strength.png',
-    brand='Barrel House Spirits',
-    product_type='Cask Strength Rye Whiskey',
-    abv='60',
-    volume='750 mL',
-    include_warning=True
-)
+    # Test Case 10: High ABV Spirit
+    print("[10/10] Creating high ABV spirit label...")
+    create_label(
+        'test_images/10_whiskey_cask_strength.png',
+        brand='Barrel House Spirits',
+        product_type='Cask Strength Rye Whiskey',
+        abv='60',
+        volume='750 mL',
+        include_warning=True
+    )
 
-print("All test images created successfully!")
-print("Images saved in: test_images/")
+    print("All test images created successfully!")
+    print("Images saved in: test_images/")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import io
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+from PIL import Image
+
+# Settings are read when config is imported, so these go in before anything from the app.
+# No Tesseract is needed: routes' OCRService gets a FakeEngine (see the client fixture)
+_state = tempfile.mkdtemp(prefix='label-verifier-tests-')
+os.environ.update({
+    'OCR_ENGINE': 'pytesseract',
+    'OCR_CACHE_ENABLED': '0',
+    'ORIENTATION_CHECK': 'off',
+    'READINESS_WARM_UP': '0',
+    'METRICS_LOG_REQUESTS': '0',
+    'JOB_STORE_PATH': os.path.join(_state, 'jobs.sqlite3'),
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LABEL = """OLD TOM DISTILLERY
+Kentucky Straight Bourbon Whiskey
+45% Alc./Vol.
+750 mL
+GOVERNMENT WARNING: (1) According to the Surgeon General, women should not drink alcoholic beverages during pregnancy because of the risk of birth defects. (2) Consumption of alcoholic beverages impairs your ability to drive a car or operate machinery, and may cause health problems.
+"""
+
+FORM = {
+    'brand_name': 'Old Tom Distillery',
+    'product_type': 'Kentucky Straight Bourbon Whiskey',
+    'alcohol_content': '45',
+    'net_contents': '750 mL',
+}
+
+class FakeEngine:
+    """OCR engine that 'reads' fixed text with one confidence for every word and records each call"""
+
+    name = 'fake'
+
+    def __init__(self, text=LABEL, conf=95.0):
+        self.text = text
+        self.conf = conf
+        self.calls = [] # (kind, config) of every call
+        self.threads = [] # name of the thread that made each call
+
+    def words(self, text=None, conf=None):
+        """Word dicts in the format of the real engines' image_to_data"""
+        words = []
+        for line_number, line in enumerate((text or self.text).split('\n'), 1):
+            for word_number, word in enumerate(line.split()):
+                words.append({
+                    'text': word, 'conf': self.conf if conf is None else conf,
+                    'left': 10 + word_number * 60, 'top': 10 + line_number * 40, 'width': 55, 'height': 30,
+                    'line': (1, 1, line_number),
+                })
+        return words
+
+    def image_to_data(self, img, config=''):
+        self.calls.append(('data', config))
+        self.threads.append(threading.current_thread().name)
+        return self.words()
+
+    def image_to_string(self, img, config=''):
+        self.calls.append(('text', config))
+        self.threads.append(threading.current_thread().name)
+        return self.text
+
+    def detect_orientation(self, img):
+        self.calls.append(('osd', '--psm 0'))
+        self.threads.append(threading.current_thread().name)
+        return {'rotate': 0, 'confidence': 10.0}
+
+def png_bytes(size=(600, 900)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'white').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+@pytest.fixture
+def engine(monkeypatch):
+    """FakeEngine plugged into the app's shared OCRService"""
+    from app import routes
+    fake = FakeEngine()
+    monkeypatch.setattr(routes.ocr_service, 'engine', fake)
+    return fake
+
+@pytest.fixture
+def client(engine):
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
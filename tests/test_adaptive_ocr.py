@@ -0,0 +1,27 @@
+from PIL import Image, ImageDraw
+
+from conftest import FORM, FakeEngine, png_bytes
+from config import Config
+from app.services import ocr_strategy
+from app.services.ocr_service import OCRService
+from app.services.ocr_strategy import AdaptiveOCR
+from app.services.validator import LabelValidator
+
+def test_confident_label_stops_after_first_step():
+    engine = FakeEngine()
+    ladder = AdaptiveOCR(OCRService(engine=engine), LabelValidator())
+    outcome = ladder.run(png_bytes(), FORM)
+    assert outcome['success'] and outcome['results']['overall_match']
+    assert [step['step'] for step in outcome['steps']] == ['fast']
+    assert len(engine.calls) == 1
+
+def test_deskew_step_uses_orientation_threshold(monkeypatch):
+    img = Image.new('L', (400, 300), 255)
+    draw = ImageDraw.Draw(img)
+    for y in range(40, 260, 20):
+        draw.text((20, y), 'LABEL TEXT LINE SAMPLE 750 ML', fill=0)
+    img = img.rotate(3, expand=True, fillcolor=255) # text lines tilted by 3 degrees
+    assert ocr_strategy._deskewed(img) is not None
+
+    monkeypatch.setattr(Config, 'ORIENTATION_MIN_SKEW', 10.0)
+    assert ocr_strategy._deskewed(img) is None
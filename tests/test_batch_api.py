@@ -0,0 +1,23 @@
+import gzip
+import io
+import json
+
+from conftest import FORM, png_bytes
+
+def post_batch(client, count, headers=None):
+    data = {'items': json.dumps([FORM] * count),
+            'label_images': [(io.BytesIO(png_bytes()), f'label{i}.png') for i in range(count)]}
+    return client.post('/api/verify/batch', data=data, content_type='multipart/form-data', headers=headers or {})
+
+def test_batch_response_is_gzipped_on_request(client):
+    response = post_batch(client, 2, {'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    batch = json.loads(gzip.decompress(response.data))
+    assert [item['success'] for item in batch['items']] == [True, True]
+
+def test_batch_errors_are_json(client):
+    response = client.post('/api/verify/batch', data={}, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'error': 'No image files provided'}
@@ -0,0 +1,38 @@
+from conftest import FakeEngine
+from app.services.layout import group_lines, text_with_spans
+from app.services.ocr_service import OCRService
+from app.services.validator import LabelValidator
+
+FORM = {'brand_name': 'Old Tom Distillery', 'product_type': 'Bourbon', 'alcohol_content': '5', 'net_contents': '750 mL'}
+
+def read(lines):
+    """OCR text and word spans of (text, confidence) lines"""
+    engine = FakeEngine()
+    words = []
+    for number, (text, conf) in enumerate(lines, 1):
+        words += [dict(word, line=(1, 1, number)) for word in engine.words(text, conf)]
+    return text_with_spans(group_lines(words))
+
+def test_low_confidence_candidate_does_not_win():
+    service = OCRService(engine=FakeEngine())
+    text, spans = read([('OLD TOM DISTILLERY', 95), ('5% alc', 20), ('45% vol', 95), ('750 mL', 95)])
+    fields = service.extract_fields(text, spans)
+    # "alc" outranks "vol", but not when it was read under OCR_MIN_CONFIDENCE
+    assert fields['alcohol_content'] == 45.0
+
+    results = LabelValidator().validate_all(FORM, {**fields, 'raw_text': text})
+    assert not results['field_checks']['alcohol_content']['matched']
+    assert results['ocr_data']['alcohol_content'] == 45.0
+
+def test_extracted_value_is_gated_too():
+    validator = LabelValidator()
+    candidates = [{'value': 45.0, 'confidence': 95.0}, {'value': 5.0, 'confidence': 20.0}]
+    ocr_data = {'alcohol_content': 5.0, 'candidates': {'alcohol_content': candidates}}
+    assert validator.candidate_values('alcohol_content', ocr_data) == [45.0]
+    assert validator.choose_candidates(FORM, ocr_data)['alcohol_content'] == 45.0
+    assert not validator.validate_all(FORM, ocr_data)['field_checks']['alcohol_content']['matched']
+
+def test_only_low_confidence_reads_are_still_used():
+    service = OCRService(engine=FakeEngine())
+    text, spans = read([('OLD TOM DISTILLERY', 95), ('5% alc', 20)])
+    assert service.extract_fields(text, spans)['alcohol_content'] == 5.0
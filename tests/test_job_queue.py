@@ -0,0 +1,53 @@
+import threading
+import time
+
+from app.services.job_queue import JobQueue
+
+def finished(queue, job_id):
+    job = queue.status(job_id)
+    while job['status'] not in JobQueue.FINISHED:
+        job = queue.wait(job_id, job['status'])
+    return job
+
+def test_abandoned_jobs_fail_and_expire(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / 'jobs.sqlite3'), max_workers=1, result_ttl=60, job_timeout=30)
+    now = time.time()
+    conn = queue._connection()
+    # left behind by a worker that was killed: one never started, one stopped mid run, one still fresh
+    conn.executemany('INSERT INTO jobs (id, status, created, started) VALUES (?, ?, ?, ?)', [
+        ('queued', JobQueue.QUEUED, now - 40, None),
+        ('running', JobQueue.RUNNING, now - 100, now - 40),
+        ('fresh', JobQueue.RUNNING, now - 100, now - 5),
+    ])
+    conn.commit()
+
+    stats = queue.stats()
+    assert (stats['queued'], stats['running'], stats['failed']) == (0, 1, 2)
+    assert queue.status('running')['status'] == JobQueue.FAILED
+    assert 'abandoned' in queue.status('queued')['error']
+
+    # then forgotten like any finished job
+    queue._purge(now + 61 + JobQueue.PURGE_INTERVAL)
+    assert queue.status('running') is None
+
+def test_timed_out_jobs_never_change_again(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / 'jobs.sqlite3'), max_workers=1, job_timeout=30)
+    release, ran = threading.Event(), []
+    busy = queue.submit(lambda: release.wait(5) and {'slow': True})
+    waiting = queue.submit(lambda: ran.append(True) or {'late': True})
+    while queue.status(busy)['status'] != JobQueue.RUNNING:
+        time.sleep(0.01)
+
+    # both past the timeout: one still running, one still waiting for the pool
+    queue._purge(time.time() + 31 + JobQueue.PURGE_INTERVAL)
+    assert queue.status(busy)['status'] == queue.status(waiting)['status'] == JobQueue.FAILED
+
+    release.set()
+    queue.executor.shutdown(wait=True)
+    assert 'result' not in queue.status(busy) and queue.status(busy)['status'] == JobQueue.FAILED
+    assert queue.status(waiting)['status'] == JobQueue.FAILED and not ran
+
+def test_jobs_run_and_finish(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / 'jobs.sqlite3'), max_workers=1)
+    job = finished(queue, queue.submit(lambda x: {'double': x * 2}, 21))
+    assert job['status'] == JobQueue.DONE and job['result'] == {'double': 42}
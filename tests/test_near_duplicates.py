@@ -0,0 +1,49 @@
+import io
+
+import pytest
+from PIL import Image
+
+from conftest import FORM, LABEL, FakeEngine
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.ocr_cache import OCRCache
+from app.services.ocr_service import OCRService
+from app.services.validator import LabelValidator
+from app.services.verification import VerificationService
+
+def label_png(marked=False):
+    """Blank label, the marked one has a dot of small print so it is a near duplicate with other bytes"""
+    img = Image.new('RGB', (600, 900), 'white')
+    if marked:
+        img.putpixel((300, 450), (0, 0, 0))
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+@pytest.fixture
+def service(tmp_path):
+    engine = FakeEngine()
+    ocr = OCRService(engine=engine, cache=OCRCache(db_path=str(tmp_path / 'ocr.sqlite3')),
+                     near_duplicates=NearDuplicateIndex(db_path=str(tmp_path / 'near.sqlite3')))
+    return VerificationService(ocr, LabelValidator()), engine
+
+def test_near_duplicate_with_other_abv_is_read(service):
+    verification, engine = service
+    assert verification.verify(label_png(), FORM)['results']['overall_match']
+
+    engine.text = LABEL.replace('45% Alc./Vol.', '40% Alc./Vol.') # only the small print changed
+    engine.calls.clear()
+    outcome = verification.verify(label_png(marked=True), FORM)
+    assert engine.calls # read for real, not answered from the first label's extraction
+    assert not outcome['results']['overall_match']
+    assert outcome['results']['ocr_data']['alcohol_content'] == 40
+
+def test_near_duplicate_with_same_values_stops_after_first_pass(service):
+    verification, engine = service
+    verification.verify(label_png(), FORM)
+
+    engine.conf = 60.0 # too low to skip the PSM 11 pass on its own
+    engine.calls.clear()
+    outcome = verification.verify(label_png(marked=True), FORM)
+    assert outcome['results']['overall_match']
+    assert outcome['results']['ocr_data']['near_duplicate']['distance'] <= 10
+    assert engine.calls == [('data', OCRService.PSM_CONFIGS[0])]
@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import FakeEngine
+from app.services.ocr_service import OCRService
+from app.services.validator import LabelValidator
+
+@pytest.fixture(scope='module')
+def service():
+    return OCRService(engine=FakeEngine())
+
+@pytest.mark.parametrize('text, value, ml', [
+    ('0,75 l', '0,75 l', 750),
+    ('1,5 L', '1,5 L', 1500),
+    ('750 mL', '750 mL', 750),
+    ('75 cl', '75 cl', 750),
+    ('1.75 Litres', '1.75 Litres', 1750),
+    ('12 FL. OZ.', '12 FL. OZ', 354.9),
+])
+def test_extract_fields_reads_volumes(service, text, value, ml):
+    fields = service.extract_fields(f'CHATEAU MARGAUX\n12,5% vol\n{text}\n')
+    assert fields['net_contents'] == value
+    assert fields['candidates']['net_contents'][0]['ml'] == pytest.approx(ml, abs=0.1)
+    assert fields['alcohol_content'] == 12.5
+
+@pytest.mark.parametrize('form, label, matched', [
+    ('750 mL', '0,75 l', True),
+    ('1.5 L', '1,5 L', True),
+    ('5 L', '1,5 L', False),
+    ('75 cl', '750 mL', True),
+    ('7', '750ml', False),
+    ('750', '750 mL', True),
+    ('25.4 fl oz', '750 mL', True),
+])
+def test_volumes_compared_across_units(form, label, matched):
+    assert LabelValidator().validate_net_contents(form, {'net_contents': label})['matched'] == matched
@@ -0,0 +1,56 @@
+import pytesseract
+import pytest
+from PIL import Image
+
+from conftest import FakeEngine
+from config import Config
+from app.services.ocr_engines import EngineUnavailable, PytesseractEngine
+from app.services.ocr_service import OCRService
+from app.services.orientation import OrientationCorrector
+
+class FailingOSD(FakeEngine):
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+    def detect_orientation(self, img):
+        super().detect_orientation(img)
+        raise self.error
+
+def osd_calls(engine):
+    return sum(kind == 'osd' for kind, _ in engine.calls)
+
+def test_failure_on_one_label_keeps_osd_on():
+    engine = FailingOSD(RuntimeError('Too few characters. Skipping this page'))
+    corrector = OrientationCorrector(engine, mode='auto')
+    for _ in range(2):
+        assert corrector.detect(Image.new('RGB', (200, 100), 'white'))['rotate'] == 0
+    assert osd_calls(engine) == 2
+
+def test_missing_osd_data_turns_osd_off():
+    engine = FailingOSD(EngineUnavailable('osd.traineddata not found'))
+    corrector = OrientationCorrector(engine, mode='auto')
+    for _ in range(2):
+        assert corrector.detect(Image.new('RGB', (200, 100), 'white'))['rotate'] == 0
+    assert osd_calls(engine) == 1
+
+@pytest.mark.parametrize('error, unavailable', [
+    (pytesseract.TesseractError(1, 'Too few characters. Skipping this page? OSD failed'), False),
+    (pytesseract.TesseractError(1, "Error opening data file /usr/share/tessdata/osd.traineddata\n"
+                                   "Failed loading language 'osd'"), True),
+    (pytesseract.TesseractNotFoundError(), True),
+])
+def test_pytesseract_osd_errors(monkeypatch, error, unavailable):
+    def image_to_osd(*args, **kwargs):
+        raise error
+    monkeypatch.setattr(pytesseract, 'image_to_osd', image_to_osd)
+    with pytest.raises(EngineUnavailable if unavailable else pytesseract.TesseractError) as raised:
+        PytesseractEngine().detect_orientation(Image.new('L', (10, 10)))
+    assert isinstance(raised.value, EngineUnavailable) == unavailable
+
+def test_osd_runs_on_the_ocr_pool(monkeypatch):
+    monkeypatch.setattr(Config, 'ORIENTATION_CHECK', 'auto')
+    engine = FakeEngine()
+    service = OCRService(engine=engine)
+    service.preprocess_image(Image.new('RGB', (200, 100), 'white'))
+    assert len(engine.threads) == 1 and engine.threads[0].startswith('ocr-pass')
@@ -0,0 +1,16 @@
+from app import routes
+
+def test_ready_without_warm_up(client):
+    # READINESS_WARM_UP=0 in conftest, so no warm-up was started
+    response = client.get('/health/ready')
+    assert response.status_code == 200
+    assert response.get_json()['ocr_engine']['status'] == 'disabled'
+
+def test_not_ready_until_warmed_up(client, monkeypatch):
+    monkeypatch.setattr(routes.ocr_service, 'warm_up_state', {'status': 'warming'})
+    response = client.get('/health/ready')
+    assert response.status_code == 503
+    assert response.get_json()['reasons'] == ['OCR engine warming']
+
+    assert routes.ocr_service.warm_up()['status'] == 'ready'
+    assert client.get('/health/ready').status_code == 200
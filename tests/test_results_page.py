@@ -0,0 +1,14 @@
+from flask import render_template
+
+from conftest import FORM
+
+def render(client, ocr_data):
+    results = {'overall_match': True, 'field_checks': {}, 'ocr_data': {'success': True, **ocr_data}}
+    with client.application.test_request_context():
+        return render_template('results.html', results=results, form_data=FORM)
+
+def test_cache_notes(client):
+    assert 'this exact image' in render(client, {'cache_hit': True})
+    page = render(client, {'cache_hit': False, 'near_duplicate': {'distance': 7}})
+    assert 'similar label' in page and '7 bits' in page and 'this exact image.' not in page
+    assert 'previous scan' not in render(client, {'cache_hit': False})
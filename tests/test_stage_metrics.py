@@ -0,0 +1,34 @@
+import io
+import time
+
+from conftest import FORM, png_bytes
+from app import routes
+from app.services.metrics import STAGE_SECONDS
+
+def verify(client):
+    data = {**FORM, 'label_image': (io.BytesIO(png_bytes()), 'label.png')}
+    response = client.post('/api/verify', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.get_json()
+
+def stage(name):
+    return STAGE_SECONDS.snapshot(stage=name)
+
+def test_one_extraction_per_label(client, engine):
+    before = stage('extraction')['count']
+    for _ in range(3):
+        assert verify(client)['ocr']['passes'] == 1 # the early exit check looked at the first pass
+    assert stage('extraction')['count'] - before == 3
+
+def test_ocr_stage_leaves_out_preprocessing(client, engine, monkeypatch):
+    process = routes.ocr_service.preprocessor.process
+    def slow_process(img):
+        time.sleep(0.2)
+        return process(img)
+    monkeypatch.setattr(routes.ocr_service.preprocessor, 'process', slow_process)
+
+    preprocess, ocr = stage('preprocess'), stage('ocr')
+    verify(client)
+    assert stage('preprocess')['sum'] - preprocess['sum'] >= 0.2
+    assert stage('ocr')['count'] - ocr['count'] == 1
+    assert stage('ocr')['sum'] - ocr['sum'] < 0.2
@@ -0,0 +1,33 @@
+import io
+
+from conftest import FORM, png_bytes
+from app import routes
+from app.services.ocr_service import OCRService
+
+def verify(client):
+    data = {**FORM, 'label_image': (io.BytesIO(png_bytes()), 'label.png')}
+    response = client.post('/api/verify', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_one_call_per_psm_config(client, engine, monkeypatch):
+    monkeypatch.setattr(routes.ocr_service, 'early_exit', False)
+    for _ in range(2):
+        engine.calls.clear()
+        verify(client)
+        assert sorted(engine.calls) == sorted(('data', config) for config in OCRService.PSM_CONFIGS)
+
+def test_low_confidence_runs_every_pass(client, engine):
+    engine.conf = 60.0 # under OCR_CONFIDENT_SCORE, the first pass alone is not trusted
+    verify(client)
+    assert sorted(engine.calls) == sorted(('data', config) for config in OCRService.PSM_CONFIGS)
+
+def test_early_exit_is_one_call(client, engine):
+    result = verify(client)
+    assert result['match'] and result['ocr']['passes'] == 1
+    assert engine.calls == [('data', OCRService.PSM_CONFIGS[0])]
+
+def test_region_reads_run_on_the_ocr_pool(client, engine, monkeypatch):
+    monkeypatch.setattr(routes.ocr_service, 'strategy', 'regions')
+    verify(client)
+    assert engine.threads and all(name.startswith('ocr-pass') for name in engine.threads)